@@ -0,0 +1,211 @@
+#!/usr/bin/env python
+#
+# SimNetBenchmark.py
+#
+# Times report ingestion, each report reader, and writeCombinedFile on
+# synthetic SimNet reports (see SimNetReportGenerator.py) of increasing size,
+# and records throughput and peak memory to a JSON results file that can be
+# compared across versions of the parser.
+#
+# Usage:
+#  SimNetBenchmark.py [--sizes 1000,10000,...] [--output results.json]
+#                     [--compare old-results.json]
+################################################################################
+
+
+import os
+import sys
+import csv
+import json
+import time
+import shutil
+import platform
+import tempfile
+import argparse
+import resource
+import multiprocessing
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+import simnetreport
+from SimNetReportGenerator import generateReports, studentsForRows
+
+DEFAULT_SIZES = [1000, 10000, 100000, 1000000]
+
+# Peak resident memory of this process so far, in MB.  (ru_maxrss is in KB
+# on Linux but in bytes on Mac OS X.)
+def peakMemoryMB():
+   peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+   if(sys.platform == 'darwin'):
+      return peak / (1024.0 * 1024.0)
+   return peak / 1024.0
+
+def loadAll(files):
+   return (simnetreport.readLessonFile(files['lesson'][0]),
+           simnetreport.readExamFile(files['exam'][0], streaming=True),
+           simnetreport.readProjectFile(files['project'][0]))
+
+# The benchmark steps.  Each returns (rows or students processed, seconds).
+def stepReadLesson(files):
+   start = time.time()
+   simnetreport.readLessonFile(files['lesson'][0])
+   return files['lesson'][1], time.time() - start
+
+def stepReadExam(files):
+   start = time.time()
+   simnetreport.readExamFile(files['exam'][0])
+   return files['exam'][1], time.time() - start
+
+def stepReadExamStreaming(files):
+   start = time.time()
+   simnetreport.readExamFile(files['exam'][0], streaming=True)
+   return files['exam'][1], time.time() - start
+
+def stepReadExamChunked(files):
+   start = time.time()
+   simnetreport.readExamFileChunked(files['exam'][0], streaming=True)
+   return files['exam'][1], time.time() - start
+
+def stepReadProject(files):
+   start = time.time()
+   simnetreport.readProjectFile(files['project'][0])
+   return files['project'][1], time.time() - start
+
+# Ingestion alone: every row of the exam report is read but not used.  The
+# Sniffer step is how the readers opened reports before ReportSource.
+def stepIngestSniffer(files):
+   start   = time.time()
+   csvfile = open(files['exam'][0], "rU")
+   dialect = csv.Sniffer().sniff(csvfile.read(2048))
+   csvfile.seek(0)
+   rows    = sum(1 for line in csv.reader(csvfile, dialect=dialect)) - 1
+   csvfile.close()
+   return rows, time.time() - start
+
+def stepIngestReportSource(files):
+   start  = time.time()
+   source = simnetreport.ReportSource(files['exam'][0])
+   rows   = sum(1 for line in source.rows()) - 1
+   source.close()
+   return rows, time.time() - start
+
+def writeStep(files, takeHighest, output='combined.csv', stats=None):
+   lessonInfo, examInfo, projectInfo = loadAll(files)
+   output = os.path.join(os.path.dirname(files['exam'][0]), output)
+   start  = time.time()
+   simnetreport.writeCombinedFile(output, lessonInfo, examInfo, projectInfo,
+         takeHighest, False, takeHighest, stats=stats)
+   return len(examInfo['students']), time.time() - start
+
+def stepWriteAllAttempts(files):
+   return writeStep(files, False)
+
+def stepWriteBestAttempt(files):
+   return writeStep(files, True)
+
+def stepWriteXlsx(files):
+   return writeStep(files, False, 'combined.xlsx')
+
+def stepWriteStatistics(files):
+   return writeStep(files, False, stats=simnetreport.ClassStatistics())
+
+def stepValidate(files):
+   lessonInfo, examInfo, projectInfo = loadAll(files)
+   start = time.time()
+   simnetreport.validateReports(lessonInfo, examInfo, projectInfo)
+   return files['lesson'][1] + files['exam'][1] + files['project'][1], time.time() - start
+
+# Merging two exports of the exam report that overlap completely, so every
+# attempt in the second is a duplicate.
+def stepMergeExports(files):
+   parts = [simnetreport.readReportPart('exam', files['exam'][0])] * 2
+   start = time.time()
+   simnetreport.mergeReportParts('exam', parts)
+   return 2 * files['exam'][1], time.time() - start
+
+STEPS = [('ingest(Sniffer)',            stepIngestSniffer,      'rows'),
+         ('ingest(ReportSource)',       stepIngestReportSource, 'rows'),
+         ('readLessonFile',             stepReadLesson,        'rows'),
+         ('readExamFile',               stepReadExam,          'rows'),
+         ('readExamFile(streaming)',    stepReadExamStreaming, 'rows'),
+         ('readExamFileChunked',        stepReadExamChunked,   'rows'),
+         ('readProjectFile',            stepReadProject,       'rows'),
+         ('mergeReportParts',           stepMergeExports,      'rows'),
+         ('writeCombinedFile(all)',     stepWriteAllAttempts,  'students'),
+         ('writeCombinedFile(best)',    stepWriteBestAttempt,  'students'),
+         ('writeCombinedFile(xlsx)',    stepWriteXlsx,         'students'),
+         ('writeCombinedFile(stats)',   stepWriteStatistics,   'students'),
+         ('validateReports',            stepValidate,          'rows')]
+
+# Runs one step in a fresh child process, so its peak memory is its own.
+def runStep(step, files, queue):
+   before = peakMemoryMB()
+   count, seconds = step(files)
+   queue.put((count, seconds, peakMemoryMB() - before))
+
+def measure(step, files):
+   queue   = multiprocessing.Queue()
+   process = multiprocessing.Process(target=runStep, args=(step, files, queue))
+   process.start()
+   result  = queue.get()
+   process.join()
+   return result
+
+def runBenchmarks(sizes, titles=10, maxAttempts=3, blankRate=0.02, workDir=None, out=sys.stdout):
+   if(workDir != None and not os.path.isdir(workDir)):
+      os.makedirs(workDir)
+   results = []
+   for size in sizes:
+      directory = tempfile.mkdtemp(prefix='snrbench', dir=workDir)
+      try:
+         students = studentsForRows(size, titles, maxAttempts)
+         files    = generateReports(directory, students, titles, maxAttempts, blankRate)
+         for name, step, unit in STEPS:
+            count, seconds, peak = measure(step, files)
+            result = {'size': size, 'step': name, 'unit': unit, 'count': count,
+                      'seconds': round(seconds, 4),
+                      'perSecond': round(count / seconds, 1) if seconds > 0 else None,
+                      'peakMemoryMB': round(peak, 1)}
+            results.append(result)
+            out.write("{size:>8} {step:<26} {count:>9} {unit:<8} {seconds:>9.3f}s "
+                      "{perSecond:>12} /s {peakMemoryMB:>8.1f} MB\n".format(**result))
+            out.flush()
+      finally:
+         shutil.rmtree(directory, ignore_errors=True)
+   return results
+
+# Prints how each step's time compares with an earlier results file.
+def compareResults(old, new, out=sys.stdout):
+   previous = dict(((r['size'], r['step']), r) for r in old['results'])
+   out.write("\n{0:>8} {1:<26} {2:>10} {3:>10} {4:>8}\n".format("size", "step", "old (s)", "new (s)", "speedup"))
+   for result in new['results']:
+      before = previous.get((result['size'], result['step']))
+      if(before == None or result['seconds'] == 0):
+         continue
+      out.write("{0:>8} {1:<26} {2:>10.3f} {3:>10.3f} {4:>7.2f}x\n".format(result['size'], result['step'],
+            before['seconds'], result['seconds'], before['seconds'] / result['seconds']))
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Benchmark the SimNet report parser.")
+   parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES),
+                       help="comma-separated approximate rows per report (default: %(default)s)")
+   parser.add_argument("--titles", type=int, default=10)
+   parser.add_argument("--max-attempts", type=int, default=3)
+   parser.add_argument("--blank-rate", type=float, default=0.02)
+   parser.add_argument("--work-dir", default=None, help="where to put the generated reports")
+   parser.add_argument("-o", "--output", default="benchmark-results.json")
+   parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+   args = parser.parse_args()
+
+   sizes   = [int(size) for size in args.sizes.split(',')]
+   results = {'parserVersion': simnetreport.PARSER_VERSION,
+              'python': platform.python_version(),
+              'platform': platform.platform(),
+              'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'numpy': simnetreport.loadNumpy() != None,
+              'results': runBenchmarks(sizes, args.titles, args.max_attempts, args.blank_rate, args.work_dir)}
+   with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+   print("Results written to " + args.output)
+   if(args.compare != None):
+      with open(args.compare) as f:
+         compareResults(json.load(f), results)
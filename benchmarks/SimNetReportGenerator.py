@@ -0,0 +1,161 @@
+#!/usr/bin/env python
+#
+# SimNetReportGenerator.py
+#
+# Generates synthetic SimNet lesson, exam, and project reports (.csv) with
+# the same layouts as real exports, for testing and benchmarking the parser.
+#
+# Usage:
+#  SimNetReportGenerator.py outputDir [--students N] [--titles N]
+#                           [--max-attempts N] [--blank-rate R] [--seed N]
+################################################################################
+
+
+import os
+import sys
+import csv
+import random
+import argparse
+
+LESSON_HEADERS  = ["StudentID", "LastName", "FirstName", "Title", "Minutes", "Date", "Date",
+                   "NumberComplete", "TotalTasks", "PercentComplete"]
+EXAM_HEADERS    = ["StudentID", "LastName", "FirstName", "Title", "Attempt", "Minutes", "Date",
+                   "ExamStarted", "ExamSpan(d.hh:mm:ss)", "ExamEnded", "NumberCorrect",
+                   "TotalQuestions", "PercentCorrect", "NumberPoints", "TotalPoints",
+                   "PercentPoints", "Status"]
+PROJECT_HEADERS = ["StudentID", "LastName", "FirstName", "Title", "Attempt", "Minutes", "Date",
+                   "Points", "TotalPoints", "Percent", "Status"]
+
+LAST_NAMES  = ["Smith", "Johnson", "Williams", "Brown", "Jones", "Garcia", "Miller", "Davis",
+               "Rodriguez", "Martinez", "Hernandez", "Lopez", "Gonzalez", "Wilson", "Anderson",
+               "Thomas", "Taylor", "Moore", "Jackson", "Martin", "Lee", "Perez", "Thompson",
+               "White", "Harris", "Sanchez", "Clark", "Ramirez", "Lewis", "Robinson"]
+FIRST_NAMES = ["James", "Mary", "John", "Patricia", "Robert", "Jennifer", "Michael", "Linda",
+               "William", "Elizabeth", "David", "Barbara", "Richard", "Susan", "Joseph", "Jessica",
+               "Thomas", "Sarah", "Charles", "Karen", "Daniel", "Nancy", "Matthew", "Lisa"]
+
+# Returns a list of (StudentID, LastName, FirstName) for n students.  Names
+# repeat (with a numeric suffix on the last name) once the lists run out.
+def makeStudents(n, rng):
+   students = []
+   for i in range(n):
+      last  = LAST_NAMES[rng.randrange(len(LAST_NAMES))]
+      first = FIRST_NAMES[rng.randrange(len(FIRST_NAMES))]
+      if(i >= len(LAST_NAMES) * len(FIRST_NAMES)):
+         last = last + str(i)
+      students.append(("{0:08d}".format(10000000 + i), last, first))
+   return students
+
+def makeDate(rng, day):
+   return "{0}/{1}/2016 {2}:{3:02d}:{4:02d} {5}".format(8 + day // 28, 1 + day % 28,
+         rng.randint(1, 12), rng.randint(0, 59), rng.randint(0, 59), rng.choice(["AM", "PM"]))
+
+# Writes a lesson report: one row per student per lesson title.  A blankRate
+# fraction of the rows have a blank score.
+def writeLessonReport(file, students, titles, blankRate=0.0, seed=0):
+   rng     = random.Random(seed)
+   csvfile = open(file, 'wb')
+   writer  = csv.writer(csvfile)
+   writer.writerow(LESSON_HEADERS)
+   rows = 0
+   for t in range(titles):
+      title = "Lesson {0}: Chapter {0} Skills".format(t + 1)
+      tasks = rng.randint(10, 40)
+      for SID, last, first in students:
+         date = makeDate(rng, t * 2)
+         done = rng.randint(0, tasks)
+         if(rng.random() < blankRate):
+            writer.writerow([SID, last, first, title, "", date, date, "", tasks, ""])
+         else:
+            writer.writerow([SID, last, first, title, rng.randint(5, 90), date, date,
+                             done, tasks, "{0:.2f}".format(100.0 * done / tasks)])
+         rows += 1
+   csvfile.close()
+   return rows
+
+# Writes an exam report: each student takes each exam 1 to maxAttempts
+# times.  Exams always have scores (SimNet only exports finished attempts).
+def writeExamReport(file, students, titles, maxAttempts=3, seed=0):
+   rng     = random.Random(seed)
+   csvfile = open(file, 'wb')
+   writer  = csv.writer(csvfile)
+   writer.writerow(EXAM_HEADERS)
+   rows = 0
+   for t in range(titles):
+      title     = "Chapter {0} Exam".format(t + 1)
+      questions = rng.choice([20, 25, 30, 50])
+      points    = questions * rng.choice([1, 2, 4])
+      for SID, last, first in students:
+         for attempt in range(1, rng.randint(1, maxAttempts) + 1):
+            correct = rng.randint(questions // 3, questions)
+            earned  = int(round(float(correct) / questions * points))
+            started = makeDate(rng, t * 3 + attempt)
+            writer.writerow([SID, last, first, title, attempt, rng.randint(5, 60), started,
+                             started, "0.00:{0:02d}:{1:02d}".format(rng.randint(5, 59), rng.randint(0, 59)),
+                             started, correct, questions,
+                             "{0:.2f}".format(100.0 * correct / questions), earned, points,
+                             "{0:.2f}".format(100.0 * earned / points), "Complete"])
+            rows += 1
+   csvfile.close()
+   return rows
+
+# Writes a project report: each student submits each project 1 to
+# maxAttempts times.  A blankRate fraction of the attempts have blank scores
+# (as for projects that have not been graded yet).
+def writeProjectReport(file, students, titles, maxAttempts=3, blankRate=0.0, seed=0):
+   rng     = random.Random(seed)
+   csvfile = open(file, 'wb')
+   writer  = csv.writer(csvfile)
+   writer.writerow(PROJECT_HEADERS)
+   rows = 0
+   for t in range(titles):
+      title  = "Project {0}".format(t + 1)
+      points = rng.choice([50, 100, 150])
+      for SID, last, first in students:
+         for attempt in range(1, rng.randint(1, maxAttempts) + 1):
+            date = makeDate(rng, t * 3 + attempt)
+            if(rng.random() < blankRate):
+               writer.writerow([SID, last, first, title, attempt, rng.randint(5, 90), date,
+                                "", points, "", "Pending"])
+            else:
+               earned = rng.randint(points // 2, points)
+               writer.writerow([SID, last, first, title, attempt, rng.randint(5, 90), date,
+                                earned, points, "{0:.2f}".format(100.0 * earned / points),
+                                "Complete"])
+            rows += 1
+   csvfile.close()
+   return rows
+
+# Returns the number of students that gives about `rows` rows in a report
+# with the given number of titles and attempts (1 to maxAttempts each).
+def studentsForRows(rows, titles, maxAttempts=1):
+   return max(1, int(round(rows / (titles * (1 + maxAttempts) / 2.0))))
+
+# Writes lesson.csv, exam.csv, and project.csv into outputDir.  Returns a
+# dict with the path and row count of each.
+def generateReports(outputDir, students=100, titles=10, maxAttempts=3, blankRate=0.02, seed=0):
+   if(not os.path.isdir(outputDir)):
+      os.makedirs(outputDir)
+   roster = makeStudents(students, random.Random(seed))
+   files  = {}
+   path   = os.path.join(outputDir, 'lesson.csv')
+   files['lesson']  = (path, writeLessonReport(path, roster, titles, blankRate, seed + 1))
+   path   = os.path.join(outputDir, 'exam.csv')
+   files['exam']    = (path, writeExamReport(path, roster, titles, maxAttempts, seed + 2))
+   path   = os.path.join(outputDir, 'project.csv')
+   files['project'] = (path, writeProjectReport(path, roster, titles, maxAttempts, blankRate, seed + 3))
+   return files
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Generate synthetic SimNet reports.")
+   parser.add_argument("outputDir")
+   parser.add_argument("--students", type=int, default=100)
+   parser.add_argument("--titles", type=int, default=10)
+   parser.add_argument("--max-attempts", type=int, default=3)
+   parser.add_argument("--blank-rate", type=float, default=0.02, help="fraction of lesson/project scores left blank")
+   parser.add_argument("--seed", type=int, default=0)
+   args = parser.parse_args()
+   files = generateReports(args.outputDir, args.students, args.titles, args.max_attempts,
+                           args.blank_rate, args.seed)
+   for kind in ('lesson', 'exam', 'project'):
+      print("{0:<8} {1:>9} rows  {2}".format(kind, files[kind][1], files[kind][0]))
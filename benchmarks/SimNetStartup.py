@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+#
+# SimNetStartup.py
+#
+# Times how long a fresh Python process takes to import each part of the
+# parser, which is what every new process-pool worker or script pays before
+# it does any work, and lists the heavy modules (Tk, NumPy, ...) each import
+# pulls in.  (Python 2 has no "python -X importtime", so each import is timed
+# from inside its own child interpreter instead; run that under Python 3.7+
+# for a per-module breakdown.)
+#
+# Usage:
+#  SimNetStartup.py [--repeat N] [--output results.json] [--compare old.json]
+################################################################################
+
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import subprocess
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+# What a process imports for each way of using the parser.
+TARGETS = [('python (no import)',  None),
+           ('simnetreport',        'simnetreport'),
+           ('simnetreport.batch',  'simnetreport.batch'),
+           ('simnetreport.watch',  'simnetreport.watch'),
+           ('simnetreport.service','simnetreport.service'),
+           ('simnetreport.gui',    'simnetreport.gui'),
+           ('SimNetReportParser',  'SimNetReportParser')]
+
+# Modules worth knowing about when they are loaded.
+HEAVY_MODULES = ['Tkinter', 'numpy', 'zstandard', 'sqlite3', 'BaseHTTPServer', 'ctypes']
+
+# Run in the child: imports the module and prints the import time and which
+# heavy modules are now loaded, as JSON.
+CHILD = '''
+import sys, time, json
+start = time.time()
+if(%(module)r != None):
+   __import__(%(module)r)
+print(json.dumps({'seconds': time.time() - start,
+                  'loaded': [name for name in %(heavy)r if name in sys.modules]}))
+'''
+
+# Starts a fresh interpreter that imports module (or nothing), returning
+# (seconds to import, seconds for the whole process, heavy modules loaded).
+def timeImport(module):
+   start   = time.time()
+   child   = subprocess.Popen([sys.executable, '-c', CHILD % {'module': module, 'heavy': HEAVY_MODULES}],
+                              cwd=ROOT, stdout=subprocess.PIPE)
+   output  = child.communicate()[0]
+   elapsed = time.time() - start
+   if(child.returncode != 0):
+      raise RuntimeError("importing {0} failed".format(module))
+   result  = json.loads(output)
+   return result['seconds'], elapsed, result['loaded']
+
+# Times each target repeat times and keeps the fastest run of each (the
+# least disturbed by whatever else the machine is doing).
+def runStartup(repeat=10, out=sys.stdout):
+   results = []
+   out.write("{0:<22} {1:>10} {2:>10}  {3}\n".format("import", "import ms", "process ms", "loads"))
+   for name, module in TARGETS:
+      runs    = [timeImport(module) for i in range(repeat)]
+      result  = {'target': name,
+                 'importMs': round(min(run[0] for run in runs) * 1000, 1),
+                 'processMs': round(min(run[1] for run in runs) * 1000, 1),
+                 'loaded': runs[0][2]}
+      results.append(result)
+      out.write("{target:<22} {importMs:>10.1f} {processMs:>10.1f}  ".format(**result) +
+                ", ".join(result['loaded']) + "\n")
+      out.flush()
+   return results
+
+# Prints how each import time compares with an earlier results file.
+def compareResults(old, new, out=sys.stdout):
+   previous = dict((r['target'], r) for r in old['results'])
+   out.write("\n{0:<22} {1:>10} {2:>10} {3:>8}\n".format("import", "old (ms)", "new (ms)", "speedup"))
+   for result in new['results']:
+      before = previous.get(result['target'])
+      if(before == None or result['processMs'] == 0):
+         continue
+      out.write("{0:<22} {1:>10.1f} {2:>10.1f} {3:>7.2f}x\n".format(result['target'],
+            before['processMs'], result['processMs'], before['processMs'] / result['processMs']))
+
+if __name__ == "__main__":
+   parser = argparse.ArgumentParser(description="Time how long the SimNet report parser takes to import.")
+   parser.add_argument("--repeat", type=int, default=10, help="runs per import (default: %(default)s)")
+   parser.add_argument("-o", "--output", default="startup-results.json")
+   parser.add_argument("--compare", default=None, help="earlier results file to compare against")
+   args = parser.parse_args()
+
+   results = {'python': platform.python_version(),
+              'platform': platform.platform(),
+              'date': time.strftime('%Y-%m-%d %H:%M:%S'),
+              'results': runStartup(args.repeat)}
+   with open(args.output, 'w') as f:
+      json.dump(results, f, indent=2, sort_keys=True)
+   print("Results written to " + args.output)
+   if(args.compare != None):
+      with open(args.compare) as f:
+         compareResults(json.load(f), results)
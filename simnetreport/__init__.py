@@ -0,0 +1,14 @@
+#
+# simnetreport
+#
+# The SimNet report parser as a library:
+#  import simnetreport
+#  lessonInfo = simnetreport.readLessonFile('lesson.csv')
+#  ...
+#  simnetreport.writeCombinedFile('combined.csv', lessonInfo, examInfo, projectInfo, ...)
+# Importing it loads only the parsing and combining core (simnetreport.core);
+# the batch, watch, and service modes and the Tk GUI are separate modules
+# that are imported when they are used.
+################################################################################
+
+from simnetreport.core import *
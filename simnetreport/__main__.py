@@ -0,0 +1,5 @@
+import sys
+
+from simnetreport.cli import main
+
+sys.exit(main())
@@ -0,0 +1,295 @@
+#
+# simnetreport/batch.py
+#
+# Headless modes: combining many sections from a manifest (batch) and the
+# term gradebook database (store).
+################################################################################
+
+
+import sys
+import csv
+import os.path
+import time
+import argparse
+import traceback
+import multiprocessing
+
+from simnetreport import core
+from simnetreport.core import (ATTEMPT_POLICY_CHOICES, REPORT_FILE_SEPARATOR, VALIDATION_FORMATS,
+      ClassStatistics, GradebookStore, Instrumentation, ParseCache, cleanKey, enableInstrumentation,
+      getAttemptPolicy, loadReports, peakMemoryMB, readExamFileIncremental, reportFiles, statisticsFileName,
+      validateReports, validationFileName, writeCombinedFile, writeStatisticsFile, writeValidationReport)
+
+# Reads a batch manifest (.csv) and returns a list of jobs, one per section.
+# The manifest must have a header row naming (at least) these columns:
+#  Section,Lesson,Exam,Project,Output
+# Any report column may be left blank, or list several exports of the same
+# kind separated by REPORT_FILE_SEPARATOR (or as a wildcard pattern) to be
+# merged (see loadReports).  Relative paths are taken relative to the
+# manifest's own directory.  If Output is blank, the combined file is
+# named after the section and placed in outputDir (or the manifest directory).
+def readBatchManifest(file, outputDir=''):
+   baseDir = os.path.dirname(os.path.abspath(file))
+   if(outputDir == ''):
+      outputDir = baseDir
+   jobs    = []
+   csvfile = open(file, "rU")
+   reader  = csv.DictReader(csvfile)
+   for line in reader:
+      # Normalize the header names so "section", " Section " etc. all work.
+      line = dict((cleanKey(str(k)), (v or '').strip()) for k, v in line.items() if k != None)
+      section = line.get('section', '')
+      if(section == ''):
+         continue
+      job = {'section': section}
+      for slot in ('lesson', 'exam', 'project'):
+         paths = [path.strip() for path in line.get(slot, '').split(REPORT_FILE_SEPARATOR)]
+         job[slot] = REPORT_FILE_SEPARATOR.join(os.path.join(baseDir, path) for path in paths if path != '')
+      output = line.get('output', '')
+      if(output == ''):
+         output = os.path.join(outputDir, section + '.csv')
+      elif(not os.path.isabs(output)):
+         output = os.path.join(baseDir, output)
+      job['output'] = output
+      jobs.append(job)
+   csvfile.close()
+   return jobs
+
+# Processes a single section (one lesson/exam/project trio) without any GUI.
+# This runs inside a pool worker, so it must never raise: the result is a
+# dict with the section name, wall time, and an error message (or None).
+def processSection(job):
+   start    = time.time()
+   error    = None
+   cache    = None
+   findings = None
+   duplicates = 0
+   # Validation needs every attempt, so the reports are then read without
+   # the attempt policies and the policies are applied as they are written.
+   validate      = job.get('validate')
+   examPolicy    = job['examPolicy'] if not validate else None
+   projectPolicy = job['projectPolicy'] if not validate else None
+   if(job.get('useCache', False)):
+      cache = ParseCache(job.get('cacheDir'))
+   if(job.get('profile', False)):
+      # A fresh record for each section; the parent adds them all up.
+      enableInstrumentation(job.get('profileDir'))
+   profiler = core.INSTRUMENTATION.startProfile()
+   try:
+      # Sections already run one per core, so read this section's reports
+      # one after another (pool workers cannot start pools of their own).
+      if(job.get('stateDir') and len(reportFiles(job['exam'])) == 1):
+         # Incremental mode: only the new part of a grown exam export is parsed.
+         lessonInfo, examInfo, projectInfo = loadReports(job['lesson'], '', job['project'],
+               None, projectPolicy, mode='serial', cache=cache)
+         examInfo = readExamFileIncremental(job['exam'],
+               os.path.join(job['stateDir'], job['section'] + '.exam-state'), examPolicy)[0]
+      else:
+         lessonInfo, examInfo, projectInfo = loadReports(job['lesson'], job['exam'], job['project'],
+               examPolicy, projectPolicy, mode='serial', cache=cache)
+      duplicates = examInfo.get('duplicates', 0) + projectInfo.get('duplicates', 0)
+      if(job.get('store')):
+         store = GradebookStore(job['store'])
+         try:
+            store.importReports(job['lesson'], job['exam'], job['project'], job['section'])
+         finally:
+            store.close()
+      stats = ClassStatistics() if job.get('stats') else None
+      if(not writeCombinedFile(job['output'], lessonInfo, examInfo, projectInfo,
+            job['examPolicy'] == 'best', job['usePctPoints'], job['projectPolicy'] == 'best',
+            job['missingScoreMark'], job['usePoints'],
+            examPolicy=job['examPolicy'], projectPolicy=job['projectPolicy'], stats=stats)):
+         error = "No output file specified."
+      else:
+         if(stats != None):
+            writeStatisticsFile(statisticsFileName(job['output']), stats)
+         if(validate):
+            findings = validateReports(lessonInfo, examInfo, projectInfo, job['usePctPoints'])
+            writeValidationReport(validationFileName(job['output'], validate), findings)
+   except Exception:
+      # Keep the whole traceback; the summary shows only its last line
+      # unless verbose output was requested.
+      error = traceback.format_exc()
+   core.INSTRUMENTATION.stopProfile(profiler, job['section'])
+   result = {'section': job['section'], 'output': job['output'],
+             'elapsed': time.time() - start, 'error': error,
+             'cacheHits': cache.hits if cache != None else 0,
+             'cacheMisses': cache.misses if cache != None else 0,
+             'findings': len(findings) if findings != None else None,
+             'duplicates': duplicates}
+   if(core.INSTRUMENTATION.enabled):
+      result['phases']     = core.INSTRUMENTATION.records()
+      result['peakMemory'] = peakMemoryMB()
+   return result
+
+# Runs every job in the list through a process pool (one worker per core by
+# default), printing a line as each section finishes.  Returns the list of
+# results in completion order.
+def runBatch(jobs, workers=None, out=sys.stdout):
+   if(workers == None or workers < 1):
+      workers = multiprocessing.cpu_count()
+   workers = min(workers, max(len(jobs), 1))
+   results = []
+   pool    = multiprocessing.Pool(processes=workers)
+   try:
+      for result in pool.imap_unordered(processSection, jobs):
+         status = "ok" if result['error'] == None else "FAILED"
+         if(result.get('findings')):
+            status += " ({0} validation finding(s))".format(result['findings'])
+         if(result.get('duplicates')):
+            status += " ({0} duplicate attempt(s) dropped)".format(result['duplicates'])
+         out.write("{0:<24} {1:>8.2f}s  {2}\n".format(result['section'], result['elapsed'], status))
+         out.flush()
+         results.append(result)
+      pool.close()
+   except:
+      pool.terminate()
+      raise
+   finally:
+      pool.join()
+   return results
+
+# Prints the failure summary for a finished batch.  Returns the number of
+# failed sections.
+def printBatchSummary(results, elapsed, verbose=False, out=sys.stdout):
+   failures = [r for r in results if r['error'] != None]
+   out.write("\n{0} section(s) processed in {1:.2f}s, {2} failed.\n".format(len(results), elapsed, len(failures)))
+   hits   = sum(r.get('cacheHits', 0) for r in results)
+   misses = sum(r.get('cacheMisses', 0) for r in results)
+   if(hits + misses > 0):
+      out.write("Parse cache: {0} hit(s), {1} miss(es).\n".format(hits, misses))
+   validated = [r for r in results if r.get('findings') != None]
+   if(len(validated) > 0):
+      out.write("Validation: {0} finding(s) in {1} section(s).\n".format(sum(r['findings'] for r in validated),
+            len([r for r in validated if r['findings'] > 0])))
+   for result in sorted(failures, key=lambda r: r['section']):
+      if(verbose):
+         message = result['error'].rstrip()
+      else:
+         message = result['error'].strip().splitlines()[-1]
+      out.write("  {0}: {1}\n".format(result['section'], message))
+   profiled = [r for r in results if 'phases' in r]
+   if(len(profiled) > 0):
+      # Phase times are summed over all sections (and workers):
+      instrumentation = Instrumentation()
+      for result in profiled:
+         instrumentation.merge(result['phases'])
+      peaks = [r['peakMemory'] for r in profiled if r['peakMemory'] != None]
+      instrumentation.report(out, max(peaks) if len(peaks) > 0 else None)
+   return len(failures)
+
+# Adds the options that control the combined output to a command line parser.
+def addOutputArguments(parser):
+   parser.add_argument("--best-exam", action="store_true", help="keep only the best exam attempt (same as --exam-policy best)")
+   parser.add_argument("--best-project", action="store_true", help="keep only the best project attempt (same as --project-policy best)")
+   parser.add_argument("--exam-policy", default=None, help="how to combine exam attempts: " + ", ".join(ATTEMPT_POLICY_CHOICES))
+   parser.add_argument("--project-policy", default=None, help="how to combine project attempts: " + ", ".join(ATTEMPT_POLICY_CHOICES))
+   parser.add_argument("--pct-points", action="store_true", help="use %% Points column not %% Correct (DANGER)")
+   parser.add_argument("--points", action="store_true", help="use points, not percents")
+   parser.add_argument("--missing", default='', help="value to insert for missing scores")
+   parser.add_argument("--validate", action="store_true", help="check every score and write the problems found next to the output (OUTPUT-validation.csv)")
+   parser.add_argument("--validation-format", choices=VALIDATION_FORMATS, default='csv', help="validation report format (default: %(default)s)")
+   parser.add_argument("--stats", action="store_true", help="also write per-title class statistics next to the output (OUTPUT-stats.csv)")
+
+# Returns the (examPolicy, projectPolicy) specs chosen by addOutputArguments'
+# options.
+def outputPolicies(parser, args):
+   examPolicy    = args.exam_policy or ('best' if args.best_exam else 'all')
+   projectPolicy = args.project_policy or ('best' if args.best_project else 'all')
+   try:
+      return getAttemptPolicy(examPolicy).spec, getAttemptPolicy(projectPolicy).spec
+   except ValueError as e:
+      parser.error(str(e))
+
+# Entry point for:  SimNetReportParser.py batch manifest.csv [options]
+def batchMain(argv):
+   parser = argparse.ArgumentParser(prog="SimNetReportParser.py batch",
+         description="Combine SimNet reports for many sections without the GUI.")
+   parser.add_argument("manifest", help="CSV with columns Section,Lesson,Exam,Project,Output")
+   parser.add_argument("-o", "--output-dir", default='', help="directory for outputs with no explicit Output column")
+   parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes (default: one per core)")
+   addOutputArguments(parser)
+   parser.add_argument("-v", "--verbose", action="store_true", help="print full tracebacks for failed sections")
+   parser.add_argument("--no-cache", action="store_true", help="always parse reports; don't use the parse cache")
+   parser.add_argument("--clear-cache", action="store_true", help="empty the parse cache before starting")
+   parser.add_argument("--cache-dir", default=None, help="parse cache directory (default: $SNR_CACHE_DIR or ~/.simnet-report-parser/cache)")
+   parser.add_argument("--state-dir", default=None, help="keep incremental exam state here and only parse new rows of grown exam exports")
+   parser.add_argument("--store", default=None, help="also import every section's reports into this gradebook database (see the store command)")
+   parser.add_argument("--profile", action="store_true", help="time each phase and print a summary at the end (or set SNR_PROFILE=1)")
+   parser.add_argument("--profile-dir", default=None, help="also run each section under cProfile and write .prof files here (implies --profile)")
+   args = parser.parse_args(argv)
+
+   if(args.state_dir != None and not os.path.isdir(args.state_dir)):
+      os.makedirs(args.state_dir)
+
+   useCache = not args.no_cache and not os.environ.get('SNR_NO_CACHE')
+   if(args.clear_cache):
+      ParseCache(args.cache_dir).clear()
+
+   examPolicy, projectPolicy = outputPolicies(parser, args)
+
+   jobs = readBatchManifest(args.manifest, args.output_dir)
+   for job in jobs:
+      job['examPolicy']         = examPolicy
+      job['usePctPoints']       = args.pct_points
+      job['projectPolicy']      = projectPolicy
+      job['missingScoreMark']   = args.missing
+      job['useCache']           = useCache
+      job['cacheDir']           = args.cache_dir
+      job['stateDir']           = args.state_dir
+      job['usePoints']          = args.points
+      job['store']              = args.store
+      job['validate']           = args.validation_format if args.validate else None
+      job['stats']              = args.stats
+      job['profile']            = args.profile or args.profile_dir != None or core.INSTRUMENTATION.enabled
+      job['profileDir']         = args.profile_dir or getattr(core.INSTRUMENTATION, 'profileDir', None)
+
+   start   = time.time()
+   results = runBatch(jobs, args.workers)
+   if(printBatchSummary(results, time.time() - start, args.verbose) > 0):
+      return 1
+   return 0
+
+# Entry point for:  SimNetReportParser.py store gradebook.db [options]
+def storeMain(argv):
+   parser = argparse.ArgumentParser(prog="SimNetReportParser.py store",
+         description="Keep a term's SimNet reports in a gradebook database and combine them from there.")
+   parser.add_argument("database", help="gradebook database file (created if needed)")
+   parser.add_argument("--import", dest="manifest", action="append", default=[],
+                       help="import every section's reports from this batch manifest (may be repeated)")
+   parser.add_argument("--section", action="append", default=None,
+                       help="only combine this section (may be repeated; default: all)")
+   parser.add_argument("-o", "--output", default=None, help="write the combined output here")
+   parser.add_argument("-l", "--list", action="store_true", help="list the sections in the database")
+   addOutputArguments(parser)
+   args = parser.parse_args(argv)
+   examPolicy, projectPolicy = outputPolicies(parser, args)
+
+   store = GradebookStore(args.database)
+   try:
+      for manifest in args.manifest:
+         for job in readBatchManifest(manifest):
+            start = time.time()
+            count = store.importReports(job['lesson'], job['exam'], job['project'], job['section'])
+            print("{0:<24} {1:>9} rows {2:>8.2f}s".format(job['section'], count, time.time() - start))
+      if(args.list):
+         for section, counts in sorted(store.sections().items()):
+            print("{0:<24} {1}".format(section, ", ".join("{0} {1}".format(counts[kind], kind)
+                  for kind in ('lesson', 'exam', 'project') if kind in counts)))
+      if(args.output != None):
+         if(args.validate):
+            lessonInfo, examInfo, projectInfo = store.read(args.section)
+         else:
+            lessonInfo, examInfo, projectInfo = store.read(args.section, examPolicy, projectPolicy)
+         stats = ClassStatistics() if args.stats else None
+         writeCombinedFile(args.output, lessonInfo, examInfo, projectInfo,
+               examPolicy == 'best', args.pct_points, projectPolicy == 'best', args.missing, args.points,
+               examPolicy=examPolicy, projectPolicy=projectPolicy, stats=stats)
+         if(stats != None):
+            writeStatisticsFile(statisticsFileName(args.output), stats)
+         if(args.validate):
+            findings = validateReports(lessonInfo, examInfo, projectInfo, args.pct_points)
+            writeValidationReport(validationFileName(args.output, args.validation_format), findings)
+            print("Validation: {0} finding(s).".format(len(findings)))
+   finally:
+      store.close()
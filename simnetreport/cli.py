@@ -0,0 +1,34 @@
+#
+# simnetreport/cli.py
+#
+# Command line entry point:
+#  python -m simnetreport                                (GUI)
+#  python -m simnetreport batch manifest.csv [options]   (headless)
+#  python -m simnetreport store gradebook.db [options]    (term database)
+#  python -m simnetreport watch directory [options]       (daemon)
+#  python -m simnetreport serve [--port N] [options]       (HTTP service)
+# Each mode's module is only imported when that mode is run, so the headless
+# modes never load Tk.
+################################################################################
+
+import sys
+
+def main(argv=None):
+   if(argv == None):
+      argv = sys.argv[1:]
+   command = argv[0] if len(argv) > 0 else None
+   if(command == 'batch'):
+      from simnetreport.batch import batchMain
+      return batchMain(argv[1:])
+   if(command == 'store'):
+      from simnetreport.batch import storeMain
+      return storeMain(argv[1:])
+   if(command == 'watch'):
+      from simnetreport.watch import watchMain
+      return watchMain(argv[1:])
+   if(command == 'serve'):
+      from simnetreport.service import serveMain
+      return serveMain(argv[1:])
+
+   from simnetreport.gui import guiMain
+   return guiMain()
@@ -0,0 +1,3004 @@
+#
+# simnetreport/core.py
+#
+# Reads SimNet lesson, exam, and project reports (.csv or .xlsx) and writes
+# the combined output, one row per student.  Nothing here needs Tk, so
+# scripts, batch workers, and the service can import it on a server with no
+# display.
+################################################################################
+
+
+import sys
+import csv
+import os.path
+import time
+import datetime
+import multiprocessing
+import multiprocessing.pool
+import warnings
+import heapq
+import threading
+import hashlib
+import errno
+import cPickle
+import mmap
+import operator
+import math
+import re
+import bisect
+import abc
+import array
+import sqlite3
+import gzip
+import contextlib
+import zipfile
+import tempfile
+import json
+import glob
+import xml.etree.cElementTree as ElementTree
+from xml.sax.saxutils import escape as xmlEscape
+import cProfile
+
+# resource (for peak memory) is only available on Unix-like systems.
+try:
+   import resource
+except ImportError:
+   resource = None
+
+# NumPy is optional; it only speeds up best-attempt selection in
+# writeCombinedFile (see bestScoresNumpy).  Importing it takes longer than
+# importing everything else here, so it is only imported (by loadNumpy) when
+# the writer first needs it.
+numpy         = None
+NUMPY_MISSING = False
+
+# Returns the numpy module, importing it the first time, or None if NumPy
+# isn't installed.
+def loadNumpy():
+   global numpy, NUMPY_MISSING
+   if(numpy == None and not NUMPY_MISSING):
+      try:
+         import numpy
+      except ImportError:
+         NUMPY_MISSING = True
+   return numpy
+
+# Students per block when the writer picks best attempts with NumPy.
+NUMPY_BLOCK = 4096
+
+# zstandard is only needed to write .zst output.
+try:
+   import zstandard
+except ImportError:
+   zstandard = None
+
+# Readers and the writer can report progress through a callback,
+#  progress(stage, count, total=None)
+# where stage is 'lesson', 'exam', 'project' (count = rows read so far) or
+# 'write' (count = students written out of total).  It is called every
+# PROGRESS_INTERVAL rows (or students) and once more at the end of a stage.
+# The callback may raise GenerationCancelled to stop the work.
+PROGRESS_INTERVAL = 500
+
+class GenerationCancelled(Exception):
+   pass
+
+# Instrumentation: records wall and CPU time for each phase of a run (sniffing
+# and parsing each report, sorting names, writing students), how many rows or
+# students each phase handled, and the peak memory of the process.  Phases are
+# timed with
+#  token = INSTRUMENTATION.start(name)
+#  ...
+#  INSTRUMENTATION.stop(token, count, unit)
+# When instrumentation is off (the default), INSTRUMENTATION is a
+# NullInstrumentation whose methods do nothing, so the cost is one method
+# call per phase -- never per row.  Turn it on with enableInstrumentation(),
+# or by setting SNR_PROFILE=1 (timing only) or SNR_PROFILE_DIR=<dir> (timing
+# plus cProfile .prof files written to <dir>) in the environment.  Since
+# enableInstrumentation() replaces INSTRUMENTATION, other modules use it as
+# core.INSTRUMENTATION rather than importing the name.
+class NullInstrumentation(object):
+   enabled = False
+
+   def start(self, name):
+      return None
+
+   def stop(self, token, count=None, unit=None):
+      pass
+
+   def startProfile(self):
+      return None
+
+   def stopProfile(self, profiler, name):
+      pass
+
+class Instrumentation(object):
+   enabled = True
+
+   def __init__(self, profileDir=None):
+      self.profileDir = profileDir
+      self.phases     = {}   # [calls, wall, cpu, count, unit] by phase name
+      self.order      = []   # Phase names in the order first seen
+      self.lock       = threading.Lock()
+
+   def start(self, name):
+      times = os.times()
+      return (name, time.time(), times[0] + times[1])
+
+   def stop(self, token, count=None, unit=None):
+      name, wall, cpu = token
+      times = os.times()
+      self.record(name, 1, time.time() - wall, times[0] + times[1] - cpu, count, unit)
+
+   def record(self, name, calls, wall, cpu, count=None, unit=None):
+      with self.lock:
+         if(not name in self.phases):
+            self.phases[name] = [0, 0.0, 0.0, None, unit]
+            self.order.append(name)
+         phase = self.phases[name]
+         phase[0] += calls
+         phase[1] += wall
+         phase[2] += cpu
+         if(count != None):
+            phase[3] = (phase[3] or 0) + count
+
+   # Adds the phases recorded by another Instrumentation (e.g. in a worker
+   # process; see records()).
+   def merge(self, records):
+      for name, calls, wall, cpu, count, unit in records:
+         self.record(name, calls, wall, cpu, count, unit)
+
+   def records(self):
+      return [tuple([name] + self.phases[name]) for name in self.order]
+
+   # Starts a cProfile run if a profile directory was given.
+   def startProfile(self):
+      if(self.profileDir == None):
+         return None
+      profiler = cProfile.Profile()
+      profiler.enable()
+      return profiler
+
+   # Stops a cProfile run and writes it to <profileDir>/<name>-<pid>.prof.
+   def stopProfile(self, profiler, name):
+      if(profiler == None):
+         return
+      profiler.disable()
+      if(not os.path.isdir(self.profileDir)):
+         try:
+            os.makedirs(self.profileDir)
+         except OSError:
+            pass   # Another worker made it first.
+      safeName = "".join(c if c.isalnum() or c in '-_.' else '_' for c in name)
+      profiler.dump_stats(os.path.join(self.profileDir, "{0}-{1}.prof".format(safeName, os.getpid())))
+
+   def report(self, out=sys.stdout, peakMemory=None):
+      out.write("\n{0:<28} {1:>6} {2:>10} {3:>10} {4:>12} {5:>16}\n".format(
+            "Phase", "Calls", "Wall (s)", "CPU (s)", "Count", "Rate"))
+      for name, calls, wall, cpu, count, unit in self.records():
+         rate = ''
+         if(count != None and wall > 0):
+            rate = "{0:.0f} {1}/s".format(count / wall, unit)
+         out.write("{0:<28} {1:>6} {2:>10.3f} {3:>10.3f} {4:>12} {5:>16}\n".format(
+               name, calls, wall, cpu, '' if count == None else count, rate))
+      if(peakMemory == None):
+         peakMemory = peakMemoryMB()
+      if(peakMemory != None):
+         out.write("Peak memory: {0:.1f} MB\n".format(peakMemory))
+
+# Peak resident memory of this process so far, in MB, or None if the
+# platform can't tell us.  (ru_maxrss is in KB on Linux, bytes on Mac OS X.)
+def peakMemoryMB():
+   if(resource == None):
+      return None
+   peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+   if(sys.platform == 'darwin'):
+      return peak / (1024.0 * 1024.0)
+   return peak / 1024.0
+
+INSTRUMENTATION = NullInstrumentation()
+
+def enableInstrumentation(profileDir=None):
+   global INSTRUMENTATION
+   INSTRUMENTATION = Instrumentation(profileDir)
+   return INSTRUMENTATION
+
+if(os.environ.get('SNR_PROFILE') or os.environ.get('SNR_PROFILE_DIR')):
+   enableInstrumentation(os.environ.get('SNR_PROFILE_DIR') or None)
+
+# Makes a good (easily sorted) key from a string by making it all lower-case,
+# removing whitespace, and removing periods.
+def cleanKey(key):
+   key = key.lower().lstrip().replace(' ', '').replace('.','')
+   return key
+
+# Positions of the score fields kept in each exam attempt cell of the score
+# matrix (see addAttemptScore).
+EXAM_PCT_CORRECT  = 0   # PercentCorrect  (column 12)
+EXAM_POINTS       = 1   # NumberPoints    (column 13)
+EXAM_PCT_POINTS   = 2   # PercentPoints   (column 15)
+EXAM_TOTAL_POINTS = 3   # TotalPoints     (column 14)
+
+# Positions of the score fields kept in each project attempt cell.
+PROJECT_PERCENT   = 0   # Percent         (column 9)
+PROJECT_POINTS    = 1   # Points          (column 7)
+
+# Stores one attempt's scores in the per-student score matrix while a report
+# is being read.  scores[SID] is a list indexed by title index (the order in
+# which titles were first seen, see titleIndex), and each entry is a list
+# indexed by attempt number - 1 holding the attempt's cell (a tuple of score
+# fields) or None for attempts the student never made.
+# If a (single-column) attempt policy is given, each entry is instead that
+# policy's reducer, fed as the rows stream in.
+def addAttemptScore(scores, titleIndex, SID, title_key, attempt, cell, policy=None):
+   index = titleIndex.get(title_key)
+   if(index == None):
+      index = len(titleIndex)
+      titleIndex[title_key] = index
+   if(attempt < 1):
+      return
+   row = scores.get(SID)
+   if(row == None):
+      row = scores[SID] = []
+   if(policy != None):
+      while(len(row) <= index):
+         row.append(None)
+      if(row[index] == None):
+         row[index] = policy.reducer()
+      row[index].add(attempt, cell)
+      return
+   while(len(row) <= index):
+      row.append([])
+   cells = row[index]
+   while(len(cells) < attempt):
+      cells.append(None)
+   cells[attempt - 1] = cell
+
+# Returns the list of attempt cells (or the reducer, if the report was read
+# with an attempt policy) for the given title index in one student's row of
+# the score matrix.  Returns None if the student (row None) has no attempts
+# for that title.
+def attemptCells(row, index):
+   if(row == None or index >= len(row)):
+      return None
+   return row[index]
+
+# Formats a computed (rather than copied) score for output: at most two
+# decimal places, with no trailing zeros.
+def formatScore(value):
+   return ('%.2f' % value).rstrip('0').rstrip('.')
+
+# Attempt-aggregation policies decide how a student's attempts at one exam or
+# project title become output column(s).  The original behavior, every
+# attempt in its own column (ALL_ATTEMPTS), is not a reducer: the writer
+# emits those columns straight from the score matrix.  Every other policy is
+# an incremental reducer: one instance is made per (student, title), add() is
+# called once per attempt cell (in any order), and result(col) returns the
+# output string for field `col` of the cells -- '' if every attempt was
+# blank, None if there were no attempts.  A repeated attempt (the same row
+# exported twice) counts once, as it does in the score matrix, so a report
+# gives the same output whether it was reduced while being read (see
+# addAttemptScore) or when it was written.  Reducers keep much less than the
+# attempt cells themselves: "best" and "latest" keep one cell, and the
+# averaging policies keep the scores of each attempt as floats (see
+# ScoreListReducer).  merge(other) adds in everything another reducer of the
+# same policy has seen, as if its cells had been added here afterwards, so
+# reducers for parts of a report can be combined (see readExamFileChunked).
+ATTEMPT_POLICIES = {}
+
+def registerAttemptPolicy(reducerClass):
+   ATTEMPT_POLICIES[reducerClass.name] = reducerClass
+   return reducerClass
+
+class AttemptReducer(object):
+   __metaclass__ = abc.ABCMeta
+   __slots__ = ('n',)
+   name      = ''
+   label     = ''
+   defaultN  = None    # Default count, for policies that take one.
+
+   def __init__(self, n=None):
+      self.n = n
+
+   @abc.abstractmethod
+   def add(self, attempt, cell):
+      pass
+
+   @abc.abstractmethod
+   def merge(self, other):
+      pass
+
+   @abc.abstractmethod
+   def result(self, col):
+      pass
+
+# The highest score, copied as-is.  Blank scores only win if no attempt has
+# a score at all; the earliest attempt wins ties (so a repeated attempt
+# changes nothing).  Only the best cell is kept, so an attempt re-exported
+# with a different score keeps the higher of the two.
+@registerAttemptPolicy
+class BestAttempt(AttemptReducer):
+   __slots__ = ('best', 'bestAttempt')
+   name      = 'best'
+   label     = 'Best attempt'
+
+   def __init__(self, n=None):
+      AttemptReducer.__init__(self, n)
+      self.best        = None
+      self.bestAttempt = None
+
+   def add(self, attempt, cell):
+      if(self.best == None):
+         self.best        = list(cell)
+         self.bestAttempt = [attempt] * len(cell)
+         return
+      for col, value in enumerate(cell):
+         self.keep(col, value, attempt)
+
+   def keep(self, col, value, attempt):
+      highest = self.best[col]
+      if(value == ''):
+         return
+      if(highest == '' or float(value) > float(highest) or
+            (float(value) == float(highest) and attempt < self.bestAttempt[col])):
+         self.best[col]        = value
+         self.bestAttempt[col] = attempt
+
+   def merge(self, other):
+      if(other.best == None):
+         return
+      if(self.best == None):
+         self.best        = list(other.best)
+         self.bestAttempt = list(other.bestAttempt)
+         return
+      for col, value in enumerate(other.best):
+         self.keep(col, value, other.bestAttempt[col])
+
+   def result(self, col):
+      if(self.best == None):
+         return None
+      return self.best[col]
+
+# The score of the highest-numbered attempt, copied as-is.  A repeated
+# attempt replaces the earlier copy.
+@registerAttemptPolicy
+class LatestAttempt(AttemptReducer):
+   __slots__ = ('latest', 'latestAttempt')
+   name      = 'latest'
+   label     = 'Latest attempt'
+
+   def __init__(self, n=None):
+      AttemptReducer.__init__(self, n)
+      self.latest        = None
+      self.latestAttempt = 0
+
+   def add(self, attempt, cell):
+      if(attempt >= self.latestAttempt):
+         self.latest        = cell
+         self.latestAttempt = attempt
+
+   def merge(self, other):
+      if(other.latest != None):
+         self.add(other.latestAttempt, other.latest)
+
+   def result(self, col):
+      if(self.latest == None):
+         return None
+      return self.latest[col]
+
+# Base of the policies that average some of the scores.  The scores of each
+# attempt are kept as floats (NaN for a blank) in one flat array, each
+# attempt's number followed by its fields, and a repeated attempt replaces
+# its earlier scores.  Subclasses implement reduce(scores), given the
+# scored values of one field as a non-empty list of floats.
+NAN = float('nan')
+
+class ScoreListReducer(AttemptReducer):
+   __slots__ = ('scores', 'width')
+
+   def __init__(self, n=None):
+      AttemptReducer.__init__(self, n)
+      self.scores = None
+      self.width  = 0
+
+   def add(self, attempt, cell):
+      self.store([float(attempt)] + [float(value) if value != '' else NAN for value in cell])
+
+   # Keeps one attempt's values, [attempt, field...], replacing any kept
+   # earlier for the same attempt.
+   def store(self, values):
+      if(self.scores == None):
+         self.scores = array.array('d')
+         self.width  = len(values)
+      for i in xrange(0, len(self.scores), self.width):
+         if(self.scores[i] == values[0]):
+            self.scores[i:i + self.width] = array.array('d', values)
+            return
+      self.scores.extend(values)
+
+   def merge(self, other):
+      if(other.scores == None):
+         return
+      for i in xrange(0, len(other.scores), other.width):
+         self.store(other.scores[i:i + other.width])
+
+   def result(self, col):
+      if(self.scores == None):
+         return None
+      scores = [value for value in self.scores[col + 1::self.width] if value == value]
+      if(len(scores) == 0):
+         return ''
+      return self.reduce(scores)
+
+   @abc.abstractmethod
+   def reduce(self, scores):
+      pass
+
+# The mean of all scored (non-blank) attempts.
+@registerAttemptPolicy
+class MeanOfAttempts(ScoreListReducer):
+   __slots__ = ()
+   name      = 'mean'
+   label     = 'Mean of attempts'
+
+   def reduce(self, scores):
+      return formatScore(sum(scores) / len(scores))
+
+# The mean of the n highest scored attempts (all of them, if fewer).
+@registerAttemptPolicy
+class BestNOfAttempts(ScoreListReducer):
+   __slots__ = ()
+   name      = 'best-n'
+   label     = 'Mean of best {n}'
+   defaultN  = 2
+
+   def reduce(self, scores):
+      highest = heapq.nlargest(self.n, scores)
+      return formatScore(sum(highest) / len(highest))
+
+# The mean of the scored attempts after dropping the n lowest.  If there are
+# n or fewer scored attempts, the highest one is used.
+@registerAttemptPolicy
+class DropLowestAttempts(ScoreListReducer):
+   __slots__ = ()
+   name      = 'drop-lowest'
+   label     = 'Drop lowest {n}'
+   defaultN  = 1
+
+   def reduce(self, scores):
+      if(len(scores) <= self.n):
+         return formatScore(max(scores))
+      kept = sorted(scores)[self.n:]
+      return formatScore(sum(kept) / len(kept))
+
+# A policy's result already worked out for every field of one (student,
+# title) -- by the gradebook store's query, see GradebookStore.aggregate --
+# standing in for the policy's reducer, so the writer reads it the same way.
+# It can't take any more attempts.
+class AggregatedAttempts(AttemptReducer):
+   __slots__ = ('cell',)
+
+   def __init__(self, cell):
+      AttemptReducer.__init__(self)
+      self.cell = cell
+
+   def add(self, attempt, cell):
+      raise ValueError("These attempts were aggregated by the gradebook store")
+
+   def merge(self, other):
+      raise ValueError("These attempts were aggregated by the gradebook store")
+
+   def result(self, col):
+      return self.cell[col]
+
+# Applies a policy to one (student, title): `cells` is what attemptCells
+# returned -- None, a list of attempt cells, or an already-fed reducer.
+# Returns the reducer's result for field `col`.
+def reduceAttempts(policy, cells, col):
+   if(cells == None):
+      return None
+   if(isinstance(cells, AttemptReducer)):
+      return cells.result(col)
+   reducer = policy.reducer()
+   for attempt, cell in enumerate(cells):
+      if(cell != None):
+         reducer.add(attempt + 1, cell)
+   return reducer.result(col)
+
+# The name of the "every attempt in its own column" output mode.
+ALL_ATTEMPTS = 'all'
+
+# A chosen policy: the reducer class plus its count (for policies that take
+# one), or no reducer class for ALL_ATTEMPTS, whose perAttempt is True.  Call
+# reducer() to get a fresh reducer for one (student, title).
+class AttemptPolicy(object):
+   def __init__(self, reducerClass=None, n=None):
+      if(reducerClass == None):
+         self.reducerClass = None
+         self.n            = None
+         self.perAttempt   = True
+         self.name         = ALL_ATTEMPTS
+         self.spec         = ALL_ATTEMPTS
+         self.label        = 'All attempts'
+         return
+      if(n == None):
+         n = reducerClass.defaultN
+      self.reducerClass = reducerClass
+      self.n            = n
+      self.perAttempt   = False
+      self.name         = reducerClass.name
+      self.spec         = self.name if n == None else "{0}:{1}".format(self.name, n)
+      self.label        = reducerClass.label.format(n=n)
+
+   def reducer(self):
+      if(self.perAttempt):
+         raise ValueError("'{0}' keeps every attempt; it has no reducer".format(self.spec))
+      return self.reducerClass(self.n)
+
+# Looks up a policy by its spec: ALL_ATTEMPTS or a registered name,
+# optionally followed by ":N" for policies that take a count (e.g. "best",
+# "best-n:3", "drop-lowest:1").  AttemptPolicy objects are passed through
+# unchanged.
+def getAttemptPolicy(spec):
+   if(isinstance(spec, AttemptPolicy)):
+      return spec
+   name, sep, n = str(spec).strip().lower().partition(':')
+   if(name == ALL_ATTEMPTS and sep == ''):
+      return AttemptPolicy()
+   if(not name in ATTEMPT_POLICIES):
+      raise ValueError("Unknown attempt policy '{0}' (choose from: {1})".format(spec,
+            ", ".join([ALL_ATTEMPTS] + sorted(ATTEMPT_POLICIES))))
+   reducerClass = ATTEMPT_POLICIES[name]
+   if(sep == ''):
+      return AttemptPolicy(reducerClass)
+   if(reducerClass.defaultN == None or not n.isdigit() or int(n) < 1):
+      raise ValueError("Bad attempt policy '{0}'".format(spec))
+   return AttemptPolicy(reducerClass, int(n))
+
+# The policies offered in the GUI, in menu order.
+ATTEMPT_POLICY_CHOICES = [ALL_ATTEMPTS, 'best', 'latest', 'mean', 'best-n:2', 'drop-lowest:1']
+
+# Vectorized version of the "best" policy, used when NumPy is available.
+# Takes field `col` of every attempt cell for the given students (a list of
+# their rows of the score matrix in output order; None for students missing
+# from this report) and titles (the (key, index, nAttempts) column list used
+# by the writer).  One pass over the cells that exist collects flat
+# (student, title, attempt) positions and scores, which are scattered into a
+# dense (students, titles, attempts) array with NaN for missing or blank
+# attempts, and nanmax picks the best attempt of every cell.  The writer
+# calls this for one block of students at a time (see NUMPY_BLOCK), so the
+# array stays small however many students there are.
+# Returns a list (per student) of lists (per title) of the best score's
+# original string, '' if all attempts were blank, or None if there were no
+# attempts -- exactly what BestAttempt.result would return.
+def bestScoresNumpy(rows, columns, col):
+   numpy     = loadNumpy()
+   nAttempts = max([1] + [n for key, index, n in columns])
+   present   = array.array('l')   # Flat (student, title) position of each cell with attempts
+   scored    = array.array('l')   # Flat (student, title, attempt) position of each scored attempt
+   scores    = array.array('d')
+   for s, row in enumerate(rows):
+      if(row == None):
+         continue
+      for t, (key, index, n) in enumerate(columns):
+         if(index >= len(row) or not row[index]):
+            continue
+         position = s * len(columns) + t
+         present.append(position)
+         for a, cell in enumerate(row[index]):
+            if(cell != None and cell[col] != ''):
+               scored.append(position * nAttempts + a)
+               scores.append(float(cell[col]))
+   values = numpy.empty(len(rows) * len(columns) * nAttempts)
+   values.fill(numpy.nan)
+   if(len(scored) > 0):   # (frombuffer refuses an empty buffer)
+      values[numpy.frombuffer(scored, dtype=numpy.int_)] = numpy.frombuffer(scores)
+   values = values.reshape((len(rows), len(columns), nAttempts))
+   hasAttempts = numpy.zeros(len(rows) * len(columns), dtype=bool)
+   if(len(present) > 0):
+      hasAttempts[numpy.frombuffer(present, dtype=numpy.int_)] = True
+   hasAttempts = hasAttempts.reshape((len(rows), len(columns)))
+   # All-NaN slices (no scored attempts) warn and give NaN; handled below.
+   with warnings.catch_warnings():
+      warnings.simplefilter("ignore", RuntimeWarning)
+      highest = numpy.nanmax(values, axis=2)
+   # The first attempt equal to the maximum wins ties, like BestAttempt.keep.
+   best     = (values == highest[:, :, numpy.newaxis]).argmax(axis=2)
+   hasScore = ~numpy.isnan(highest)
+
+   result = []
+   for s, row in enumerate(rows):
+      studentResult = []
+      for t, (key, index, n) in enumerate(columns):
+         if(hasScore[s, t]):
+            studentResult.append(row[index][best[s, t]][col])
+         elif(hasAttempts[s, t]):
+            studentResult.append('')
+         else:
+            studentResult.append(None)
+      result.append(studentResult)
+   return result
+
+# Bump this whenever the structures the readers return change, so that
+# stale entries in the parse cache are never used.
+PARSER_VERSION = 6
+
+# On-disk cache of parsed reports (lessonInfo/examInfo/projectInfo), keyed
+# by a hash of the report file's contents, the reader, its options, and
+# PARSER_VERSION -- so an unchanged export is never parsed twice.  Entries
+# are pickled (binary protocol) one per file.  When the cache grows past
+# maxBytes, the least recently used entries are removed.  hits and misses
+# count lookups made through this object.
+class ParseCache(object):
+   def __init__(self, directory=None, maxBytes=256 * 1024 * 1024):
+      if(directory == None):
+         directory = os.environ.get('SNR_CACHE_DIR') or \
+               os.path.join(os.path.expanduser('~'), '.simnet-report-parser', 'cache')
+      self.directory = directory
+      self.maxBytes  = maxBytes
+      self.hits      = 0
+      self.misses    = 0
+
+   def key(self, kind, file, options):
+      digest = hashlib.sha1()
+      digest.update("{0}\0{1}\0{2}\0".format(PARSER_VERSION, kind, repr(sorted(options.items()))))
+      with open(file, 'rb') as f:
+         for block in iter(lambda: f.read(1 << 20), ''):
+            digest.update(block)
+      return digest.hexdigest()
+
+   def path(self, key):
+      return os.path.join(self.directory, key + '.pickle')
+
+   # Returns (key, info) for the report, with info None on a miss.
+   def fetch(self, kind, file, **options):
+      key  = self.key(kind, file, options)
+      path = self.path(key)
+      try:
+         with open(path, 'rb') as f:
+            info = cPickle.load(f)
+      except Exception:
+         # Missing, unreadable, or from an incompatible version of the
+         # parser -- all are just misses.
+         self.misses += 1
+         return key, None
+      try:
+         os.utime(path, None)   # Mark it recently used.
+      except OSError:
+         pass
+      self.hits += 1
+      return key, info
+
+   # Caches info under key.  The cache is only an aid: if the entry can't be
+   # written, that is reported on stderr and the entry skipped.
+   def store(self, key, info):
+      path = self.path(key)
+      temp = "{0}.{1}.{2}.tmp".format(path, os.getpid(), threading.current_thread().ident)
+      try:
+         if(not os.path.isdir(self.directory)):
+            try:
+               os.makedirs(self.directory)
+            except OSError as e:
+               if(e.errno != errno.EEXIST or not os.path.isdir(self.directory)):
+                  raise
+               # Another worker made it first.
+         with open(temp, 'wb') as f:
+            cPickle.dump(info, f, cPickle.HIGHEST_PROTOCOL)
+         if(sys.platform == 'win32' and os.path.exists(path)):
+            try:
+               os.remove(path)   # Windows can't rename over a file.
+            except OSError as e:
+               if(e.errno != errno.ENOENT):
+                  raise
+               # Another worker stored the same entry first.
+         os.rename(temp, path)
+      except Exception as e:
+         sys.stderr.write("Skipped writing parse cache entry {0}: {1}\n".format(path, e))
+         try:
+            os.remove(temp)
+         except OSError:
+            pass
+         return
+      self.evict()
+
+   # Returns the cached info for the report, or calls read() to parse it
+   # (and caches the result).
+   def load(self, kind, file, read, **options):
+      key, info = self.fetch(kind, file, **options)
+      if(info == None):
+         info = read()
+         self.store(key, info)
+      return info
+
+   def entries(self):
+      if(not os.path.isdir(self.directory)):
+         return []
+      entries = []
+      for name in os.listdir(self.directory):
+         if(name.endswith('.pickle')):
+            path = os.path.join(self.directory, name)
+            try:
+               stat = os.stat(path)
+            except OSError:
+               continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+      return entries
+
+   # Removes least recently used entries until the cache fits in maxBytes.
+   def evict(self):
+      entries = sorted(self.entries())
+      total   = sum(size for mtime, size, path in entries)
+      while(total > self.maxBytes and len(entries) > 0):
+         mtime, size, path = entries.pop(0)
+         try:
+            os.remove(path)
+         except OSError:
+            pass
+         total -= size
+
+   def clear(self):
+      for mtime, size, path in self.entries():
+         try:
+            os.remove(path)
+         except OSError:
+            pass
+
+# Returns the parse cache the GUI and batch mode should use, or None if
+# caching was turned off by setting the SNR_NO_CACHE environment variable.
+def defaultParseCache():
+   if(os.environ.get('SNR_NO_CACHE')):
+      return None
+   return ParseCache()
+
+# The spec of an attempt policy as it affects what a reader returns: None
+# for no policy (or "all"), which keeps every attempt.
+def readerPolicySpec(policy):
+   if(policy == None):
+      return None
+   policy = getAttemptPolicy(policy)
+   if(policy.perAttempt):
+      return None
+   return policy.spec
+
+# Every SimNet report (lesson, exam, or project) starts with these columns.
+REPORT_HEADERS = ('StudentID', 'LastName', 'FirstName', 'Title')
+
+# Delimiters and quote characters we look for in a report's header row.
+REPORT_DELIMITERS = (',', '\t', ';', '|')
+REPORT_QUOTECHARS = ('"', "'")
+
+# Works out the CSV dialect of a report from its header row: the delimiter
+# and quote character are the ones that split the row into fields that
+# include the known SimNet column names.  This is much faster than
+# csv.Sniffer, and can't be fooled by long titles in the first few rows.
+# Falls back to csv.Sniffer on sample (the start of the file) if the header
+# isn't recognized, or to commas for an empty file.  Returns keyword
+# arguments for csv.reader.
+def detectDialect(header, sample=None):
+   header = (header.lstrip('\xef\xbb\xbf').splitlines() or [''])[0]   # Skip a UTF-8 BOM.
+   if((sample if sample != None else header).strip() == ''):
+      return dict(delimiter=',', quotechar='"', doublequote=True, skipinitialspace=False,
+                  quoting=csv.QUOTE_MINIMAL)
+   for quotechar in REPORT_QUOTECHARS:
+      for delimiter in REPORT_DELIMITERS:
+         if(not delimiter in header):
+            continue
+         fields = next(csv.reader([header], delimiter=delimiter, quotechar=quotechar), [])
+         if(set(REPORT_HEADERS) <= set(field.strip() for field in fields)):
+            return dict(delimiter=delimiter, quotechar=quotechar, doublequote=True,
+                        skipinitialspace=any(field[:1] == ' ' for field in fields),
+                        quoting=csv.QUOTE_MINIMAL)
+   sniffed = csv.Sniffer().sniff(sample if sample != None else header)
+   return dict(delimiter=sniffed.delimiter, quotechar=sniffed.quotechar,
+               doublequote=sniffed.doublequote, skipinitialspace=sniffed.skipinitialspace,
+               quoting=sniffed.quoting)
+
+# Buffer size for reports that can't be memory-mapped.
+REPORT_BUFFER_SIZE = 1 << 20
+
+# A report file opened for reading by the report readers.  The file is
+# memory-mapped (or, where that fails, read through a large buffer), its
+# dialect is found with detectDialect, and rows() gives its rows -- header
+# first -- straight from a csv.reader over the mapped lines, with no other
+# copies made.  Files with old Mac (bare CR) line endings are split in
+# memory instead.  close() when done.
+class ReportSource(object):
+   def __init__(self, file):
+      self.file = open(file, 'rb', REPORT_BUFFER_SIZE)
+      self.map  = None
+      try:
+         self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+      except (ValueError, EnvironmentError):
+         pass   # Empty files (and some file systems) can't be mapped.
+      source = self.map if self.map != None else self.file
+      header = source.readline()
+      sample = header + source.read(2048)
+      source.seek(0)
+      self.dialect = detectDialect(header, sample)
+      # A CR that isn't part of a CRLF means CR-only line endings:
+      self.oldMac  = '\r' in header.rstrip('\r\n') or (header[-1:] == '\r' and not '\n' in sample)
+
+   def lines(self):
+      if(self.oldMac):
+         text = self.map[:] if self.map != None else self.file.read()
+         return iter(text.splitlines(True))
+      source = self.map if self.map != None else self.file
+      return iter(source.readline, '')
+
+   def rows(self):
+      return csv.reader(self.lines(), **self.dialect)
+
+   def close(self):
+      if(self.map != None):
+         self.map.close()
+         self.map = None
+      self.file.close()
+
+# SpreadsheetML namespaces used in .xlsx files.
+XLSX_MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+XLSX_REL_NS  = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+XLSX_PKG_NS  = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+# Returns the 0-based column index of a cell reference such as "AB12".
+def xlsxColumn(ref):
+   col = 0
+   for ch in ref:
+      if(ch.isdigit()):
+         break
+      col = col * 26 + ord(ch.upper()) - ord('A') + 1
+   return col - 1
+
+# Formats a numeric cell value the way it would be saved to CSV in the
+# General format: whole numbers without a decimal point, others with up to
+# 15 significant digits.
+def xlsxNumber(value):
+   try:
+      number = float(value)
+   except ValueError:
+      return value
+   if(number == int(number) and abs(number) < 1e15):
+      return str(int(number))
+   return '%.15g' % number
+
+# Built-in number formats (by numFmtId) that show a date or a time; the
+# codes of custom formats are in the workbook's styles.
+XLSX_DATE_FORMATS = {14: 'm/d/yyyy', 15: 'd-mmm-yy', 16: 'd-mmm', 17: 'mmm-yy', 18: 'h:mm AM/PM',
+                     19: 'h:mm:ss AM/PM', 20: 'h:mm', 21: 'h:mm:ss', 22: 'm/d/yyyy h:mm', 45: 'mm:ss',
+                     46: '[h]:mm:ss', 47: 'mmss.0'}
+
+# Returns how a number format shows dates: None for a format that isn't a
+# date or time, else (date, time, seconds, AM/PM) flags for xlsxDate.
+# Quoted text, escaped characters, and [colors] aren't looked at.
+def xlsxDateStyle(code):
+   code = re.sub(r'"[^"]*"|\\.|\[(?![hms]+\])[^\]]*\]', '', code).lower()
+   date = 'd' in code or 'y' in code
+   time = 'h' in code or 's' in code
+   if(not date and not time):
+      return None
+   return (date, time, 's' in code, 'am/pm' in code or 'a/p' in code)
+
+# Formats a date cell's serial number the way SimNet's CSV exports show it:
+# dates as m/d/yyyy (such as "9/1/2016") and times as h:mm (such as
+# "9/1/2016 9:00"), with seconds and AM/PM if the cell's format has them.
+# date1904 is the workbook's date system.
+def xlsxDate(value, style, date1904=False):
+   showDate, showTime, seconds, twelveHour = style
+   epoch  = datetime.datetime(1904, 1, 1) if date1904 else datetime.datetime(1899, 12, 30)
+   moment = epoch + datetime.timedelta(seconds=int(round(float(value) * 86400)))
+   text   = []
+   if(showDate):
+      text.append("{0}/{1}/{2}".format(moment.month, moment.day, moment.year))
+   if(showTime):
+      hour = moment.hour
+      if(twelveHour):
+         hour = hour % 12 or 12
+      time = "{0}:{1:02d}".format(hour, moment.minute)
+      if(seconds):
+         time += ":{0:02d}".format(moment.second)
+      if(twelveHour):
+         time += " AM" if moment.hour < 12 else " PM"
+      text.append(time)
+   return " ".join(text)
+
+# The text of a shared string or inline string element (which may be split
+# into rich-text runs).
+def xlsxText(element):
+   return ''.join(t.text or '' for t in element.iter(XLSX_MAIN_NS + 't'))
+
+# A native SimNet .xlsx export opened for reading, with the same interface as
+# ReportSource: rows() gives the rows of the first worksheet -- header first
+# -- as lists of strings, just as they would be read from the export saved
+# as CSV (dates included; see xlsxDate).  The sheet XML is streamed out of the zip with iterparse and each
+# row is thrown away once read, so memory use doesn't grow with the size of
+# the sheet (only the workbook's table of distinct strings is kept).  Empty
+# rows are skipped and short rows are padded to the width of the header.
+class XlsxSource(object):
+   def __init__(self, file):
+      self.zip = zipfile.ZipFile(file)
+      try:
+         self.sheet   = self.firstSheet()
+         self.strings = self.sharedStrings()
+         self.dates   = self.dateStyles()
+      except:
+         self.zip.close()
+         raise
+
+   # The path in the zip of the workbook's first worksheet.
+   def firstSheet(self):
+      try:
+         workbook = ElementTree.fromstring(self.zip.read('xl/workbook.xml'))
+         sheet    = workbook.find(XLSX_MAIN_NS + 'sheets/' + XLSX_MAIN_NS + 'sheet')
+         rels     = ElementTree.fromstring(self.zip.read('xl/_rels/workbook.xml.rels'))
+         for rel in rels.findall(XLSX_PKG_NS + 'Relationship'):
+            if(rel.get('Id') == sheet.get(XLSX_REL_NS + 'id')):
+               target = rel.get('Target')
+               return target.lstrip('/') if target.startswith('/') else 'xl/' + target
+      except (KeyError, AttributeError):
+         pass
+      return 'xl/worksheets/sheet1.xml'
+
+   def sharedStrings(self):
+      strings = []
+      try:
+         stream = self.zip.open('xl/sharedStrings.xml')
+      except KeyError:
+         return strings   # No strings at all.
+      for event, element in ElementTree.iterparse(stream):
+         if(element.tag == XLSX_MAIN_NS + 'si'):
+            strings.append(xlsxText(element))
+            element.clear()
+      stream.close()
+      return strings
+
+   # The xlsxDateStyle of each cell style (by its index, a cell's s
+   # attribute), and whether the workbook counts days from 1904.
+   def dateStyles(self):
+      try:
+         workbook = ElementTree.fromstring(self.zip.read('xl/workbook.xml'))
+         pr       = workbook.find(XLSX_MAIN_NS + 'workbookPr')
+         self.date1904 = pr != None and pr.get('date1904', '').lower() in ('1', 'true')
+      except KeyError:
+         self.date1904 = False
+      try:
+         styles = ElementTree.fromstring(self.zip.read('xl/styles.xml'))
+      except KeyError:
+         return []   # Every cell in the General format.
+      codes = dict(XLSX_DATE_FORMATS)
+      for numFmt in styles.iter(XLSX_MAIN_NS + 'numFmt'):
+         codes[int(numFmt.get('numFmtId'))] = numFmt.get('formatCode', '')
+      cellXfs = styles.find(XLSX_MAIN_NS + 'cellXfs')
+      if(cellXfs == None):
+         return []
+      return [xlsxDateStyle(codes.get(int(xf.get('numFmtId', 0)), '')) for xf in cellXfs.findall(XLSX_MAIN_NS + 'xf')]
+
+   def rows(self):
+      stream    = self.zip.open(self.sheet)
+      width     = None
+      parent    = None
+      columns   = {}   # Column index by cell reference letters ("AB").
+      rowTag    = XLSX_MAIN_NS + 'row'
+      valueTag  = XLSX_MAIN_NS + 'v'
+      inlineTag = XLSX_MAIN_NS + 'is'
+      try:
+         for event, element in ElementTree.iterparse(stream, ('start', 'end')):
+            if(event == 'start'):
+               if(parent == None and element.tag == XLSX_MAIN_NS + 'sheetData'):
+                  parent = element
+               continue
+            if(element.tag != rowTag):
+               continue
+            row = []
+            for cell in element:
+               ref = cell.get('r')
+               if(ref != None):
+                  letters = ref.rstrip('0123456789')
+                  col     = columns.get(letters)
+                  if(col == None):
+                     col = columns[letters] = xlsxColumn(letters)
+                  if(col > len(row)):
+                     row.extend([''] * (col - len(row)))
+               value = ''
+               for child in cell:
+                  if(child.tag == valueTag):
+                     value = child.text or ''
+                  elif(child.tag == inlineTag):
+                     value = xlsxText(child)
+               kind = cell.get('t')
+               if(kind == None or kind == 'n'):
+                  style = cell.get('s')
+                  if(value == ''):
+                     pass
+                  elif(style != None and int(style) < len(self.dates) and self.dates[int(style)] != None):
+                     value = xlsxDate(value, self.dates[int(style)], self.date1904)
+                  else:
+                     value = xlsxNumber(value)
+               elif(kind == 's'):
+                  value = self.strings[int(value)]
+               elif(kind == 'b'):
+                  value = 'TRUE' if value == '1' else 'FALSE'
+               if(isinstance(value, unicode)):
+                  value = value.encode('utf-8')
+               row.append(value)
+            # Done with this row; drop it so the tree never grows.
+            element.clear()
+            if(parent != None):
+               parent.clear()
+            if(not any(row)):
+               continue
+            if(width == None):
+               width = len(row)
+            elif(len(row) < width):
+               row.extend([''] * (width - len(row)))
+            yield row
+      finally:
+         stream.close()
+
+   def close(self):
+      self.zip.close()
+
+# True if file names a report the readers can read: a .csv export (or any
+# name containing .csv, as the GUI has always allowed) or a native .xlsx one.
+def isReportFile(file):
+   return file != '' and (file.lower().rfind('.csv') != -1 or isXlsxFile(file))
+
+def isXlsxFile(file):
+   return file.lower().endswith('.xlsx')
+
+# Separates the files of one report slot given as a single string, e.g. in a
+# batch manifest.
+REPORT_FILE_SEPARATOR = ';'
+
+# Returns the list of files for one report slot (see loadReports): a list of
+# file names, or a string naming one file, several separated by
+# REPORT_FILE_SEPARATOR, or a wildcard pattern such as "exports/ENG101
+# exam*.csv", whose matches are taken in name order.  A blank slot gives an
+# empty list, and a file named twice is only read once.  Raises ValueError if
+# a pattern matches nothing.
+def reportFiles(spec):
+   if(isinstance(spec, basestring)):
+      spec = [spec] if os.path.exists(spec) else spec.split(REPORT_FILE_SEPARATOR)
+   files = []
+   for name in spec:
+      name = name.strip()
+      if(name == ''):
+         continue
+      if(glob.has_magic(name) and not os.path.exists(name)):
+         matches = sorted(glob.glob(name))
+         if(len(matches) == 0):
+            raise ValueError("No reports match '{0}'.".format(name))
+      else:
+         matches = [name]
+      files.extend(match for match in matches if not match in files)
+   return files
+
+# Opens a report for reading, as an XlsxSource or a ReportSource.
+def openReport(file):
+   if(isXlsxFile(file)):
+      return XlsxSource(file)
+   return ReportSource(file)
+
+# The standard layout of each kind of report, as SimNet exports it.  Used
+# when a report's header row isn't recognized.
+REPORT_LAYOUTS = {
+   'lesson':  ('StudentID', 'LastName', 'FirstName', 'Title', 'Minutes', 'Date', 'Date',
+               'NumberComplete', 'TotalTasks', 'PercentComplete'),
+   'exam':    ('StudentID', 'LastName', 'FirstName', 'Title', 'Attempt', 'Minutes', 'Date',
+               'ExamStarted', 'ExamSpan(d.hh:mm:ss)', 'ExamEnded', 'NumberCorrect',
+               'TotalQuestions', 'PercentCorrect', 'NumberPoints', 'TotalPoints',
+               'PercentPoints', 'Status'),
+   'project': ('StudentID', 'LastName', 'FirstName', 'Title', 'Attempt', 'Minutes', 'Date',
+               'Points', 'TotalPoints', 'Percent', 'Status')}
+
+# The columns each reader uses, in the order a ReportSchema extracts them:
+# student ID, names, title, attempt (exams and projects), points possible,
+# and then the scores in the order of a score matrix cell (see
+# EXAM_PCT_CORRECT etc.).
+REPORT_COLUMNS = {
+   'lesson':  ('StudentID', 'LastName', 'FirstName', 'Title',
+               'TotalTasks', 'PercentComplete', 'NumberComplete'),
+   'exam':    ('StudentID', 'LastName', 'FirstName', 'Title', 'Attempt',
+               'TotalQuestions', 'PercentCorrect', 'NumberPoints', 'PercentPoints', 'TotalPoints'),
+   'project': ('StudentID', 'LastName', 'FirstName', 'Title', 'Attempt',
+               'TotalPoints', 'Percent', 'Points')}
+
+# Where the columns a reader needs are in one particular report, found from
+# its header row, so reports with reordered or extra columns read correctly.
+# extract(row) returns just the needed fields (see REPORT_COLUMNS) in one
+# call.  Raises ValueError if a needed column is missing.  A header with no
+# StudentID column at all is assumed to be in the standard layout.  date is
+# the position of the (first) Date column, or None if there isn't one.
+class ReportSchema(object):
+   def __init__(self, kind, header):
+      self.kind   = kind
+      self.header = list(header)
+      positions   = {}
+      for i, name in enumerate(header):
+         name = name.lstrip('\xef\xbb\xbf').strip()   # Skip a UTF-8 BOM.
+         if(not name in positions):
+            positions[name] = i
+      if(not 'StudentID' in positions):
+         positions = dict((name, i) for i, name in reversed(list(enumerate(REPORT_LAYOUTS[kind]))))
+      missing = [name for name in REPORT_COLUMNS[kind] if not name in positions]
+      if(len(missing) > 0):
+         raise ValueError("The {0} report has no {1} column{2}.".format(kind, ", ".join(missing),
+               "s" if len(missing) > 1 else ""))
+      self.positions = tuple(positions[name] for name in REPORT_COLUMNS[kind])
+      self.extract   = operator.itemgetter(*self.positions)
+      self.date      = positions.get('Date')
+
+# Returns a new, empty lessonInfo for addLessonRow to fill.  Without
+# records, the full rows are not kept (see readExamFile's streaming mode).
+def newLessonInfo(streaming=False):
+   lessonInfo = {}
+   if(not streaming):
+      lessonInfo['records'] = {}  # Full record for each item
+   lessonInfo['titles']   = {}    # The titles themselves, keyed by a cleaned version.
+   lessonInfo['possible'] = {}    # Total tasks by title
+   lessonInfo['earned']   = {}    # Points earned by title and student ID.
+   lessonInfo['percent']  = {}    # Stores percent by title and student ID.
+   lessonInfo['students'] = {}    # [ID, LastName, FirstName] by student ID
+   return lessonInfo
+
+# Adds one (non-header) row of a lesson report to lessonInfo.  extract is the
+# report's ReportSchema('lesson', header).extract.
+def addLessonRow(lessonInfo, line, extract):
+   SID, lastName, firstName, title, tasks, pctComplete, complete = extract(line)
+   titles   = lessonInfo['titles']
+   percent  = lessonInfo['percent']
+   earned   = lessonInfo['earned']
+   possible = lessonInfo['possible']
+   students = lessonInfo['students']
+   # Add this line to the proper student's record (by ID).
+   if('records' in lessonInfo):
+      records = lessonInfo['records']
+      if(not SID in records):
+         records[SID] = []
+      records[SID].append(line)
+   if(not SID in students):
+      students[SID] = [SID, lastName, firstName]
+   # Add this lesson title to the lesson's record:
+   # Lessons only have one attempt...
+   key = cleanKey(title)
+   if(not key in titles):
+      titles[key] = {}
+   titles[key]['title'] = title
+   if(not SID in percent):
+      percent[SID] = {}
+   percent[SID][key] = pctComplete   # Store percent by ID and title.
+   if(not SID in earned):
+      earned[SID] = {}
+   earned[SID][key] = complete       # Store earned by ID and title.
+   if(not key in possible):
+      possible[key] = tasks          # Store possible    by title
+
+# If a ParseCache is given, an unchanged file is loaded from it instead of
+# being parsed again.
+def readLessonFile(file, progress=None, cache=None):
+   if(cache != None and isReportFile(file)):
+      return cache.load('lesson', file, lambda: readLessonFile(file, progress))
+   lessonInfo = {}
+   # If we got a filename (with a .csv extension), process it.
+   if(isReportFile(file)):
+      token = INSTRUMENTATION.start('lesson: sniff')
+      csvfile = openReport(file)
+      INSTRUMENTATION.stop(token)
+      token = INSTRUMENTATION.start('lesson: parse')
+
+      reader     = csvfile.rows()
+      lineNo     = 0   # Count lines
+      lessonInfo = newLessonInfo()
+
+      # We need to watch for each new lesson name.  This info will be used
+      # in creating the output table later.
+      for line in reader:
+         # Ignore header line and put lines in a dict:
+         if lineNo > 0:
+            addLessonRow(lessonInfo, line, extract)
+         else:
+            # The first line is headers; find the columns we need.
+            headers = line
+            extract = ReportSchema('lesson', headers).extract
+         lineNo = lineNo + 1
+         if(progress != None and lineNo % PROGRESS_INTERVAL == 0):
+            progress('lesson', lineNo - 1)
+
+      csvfile.close()  # We're done with this file.
+      INSTRUMENTATION.stop(token, max(lineNo - 1, 0), 'rows')
+      if(progress != None):
+         progress('lesson', max(lineNo - 1, 0))
+   return lessonInfo
+
+# Returns a new, empty examInfo for addExamRow to fill.  See readExamFile
+# for the meaning of policy and streaming.
+def newExamInfo(policy=None, streaming=False):
+   examInfo = {}
+   if(not streaming):
+      examInfo['records'] = {}  # Full record for each item
+   examInfo['attempts'] = {}    # To keep track of highest value of attempts per title
+   examInfo['attemptCounts'] = {}  # Number of attempts (rows), by title
+   examInfo['titles']   = {}    # The titles themselves, keyed by a cleaned version.
+   examInfo['possible'] = {}    # Points possible, by exam
+   examInfo['students'] = {}    # [ID, LastName, FirstName] by student ID
+   examInfo['titleIndex'] = {}  # Title index (for the score matrix) by title key
+   examInfo['scores']   = {}    # Score matrix by student ID (see addAttemptScore)
+   if(policy != None):
+      examInfo['policy'] = policy
+   return examInfo
+
+# Adds one (non-header) row of an exam report to examInfo.  extract is the
+# report's ReportSchema('exam', header).extract.
+def addExamRow(examInfo, line, extract):
+   fields = extract(line)
+   SID, lastName, firstName, title, attempt, questions = fields[:6]
+   attempt = int(attempt)
+
+   # For now we ignore the "status"... it seems better to give students the
+   # points they've "partially" earned instead of a zero...
+   attempts  = examInfo['attempts']
+   titles    = examInfo['titles']
+   possible  = examInfo['possible']
+   students  = examInfo['students']
+   streaming = not 'records' in examInfo
+
+   # Add this line to the proper student's record (by ID).
+   if(not streaming):
+      records = examInfo['records']
+      if(not SID in records):
+         records[SID] = []
+      records[SID].append(line)
+   # Add this exam title to the exam's record:
+   title_key = cleanKey(title)
+   if(not title_key in titles):
+      attempts[title_key] = 1
+      titles[title_key] = title
+   # If we see a new highest attempt number, that is the new max
+   # value stored at attempts[examname].
+   if(attempt > attempts[title_key]):
+      attempts[title_key] = attempt
+   counts = examInfo['attemptCounts']
+   counts[title_key] = counts.get(title_key, 0) + 1
+   if(not title_key in possible):
+      possible[title_key] = questions
+   if(streaming):
+      # Keep just the needed fields; everything else in the row is
+      # garbage as soon as we move on to the next one.
+      if(not SID in students):
+         students[SID] = (intern(SID), lastName, firstName)
+      cell = tuple(map(intern, fields[6:]))
+   else:
+      if(not SID in students):
+         students[SID] = [SID, lastName, firstName]
+      cell = fields[6:]
+   addAttemptScore(examInfo['scores'], examInfo['titleIndex'], SID, title_key, attempt,
+         cell, examInfo.get('policy'))
+
+# If an attempt policy (see getAttemptPolicy) other than "all" is given, it
+# is applied while the file is read and only its reducers are kept; the
+# result can then only be written with that policy.
+# In streaming mode, only the columns writeCombinedFile needs (ID, names,
+# title, attempt, and the score columns) are kept as each row is read: no
+# 'records' entry is produced, students are stored as (ID, LastName,
+# FirstName) tuples, and repeated score strings are shared between cells.
+# On a 100,000-row export this cuts peak memory by about 85%.
+# See readLessonFile for the meaning of cache.  If workers is more than 1,
+# the report is read in parallel chunks by that many processes (see
+# readExamFileChunked).
+def readExamFile(file, policy=None, streaming=False, progress=None, cache=None, workers=None):
+   if(cache != None and isReportFile(file)):
+      return cache.load('exam', file, lambda: readExamFile(file, policy, streaming, progress, workers=workers),
+            policy=readerPolicySpec(policy), streaming=streaming)
+   if(workers != None and workers > 1 and isReportFile(file) and not isXlsxFile(file)):
+      return readExamFileChunked(file, policy, workers, streaming, progress)
+   examInfo = {}
+   if(policy != None):
+      policy = getAttemptPolicy(policy)
+      if(policy.perAttempt):
+         policy = None
+   # If we got a filename (with a .csv extension), process it.
+   if(isReportFile(file)):
+      token = INSTRUMENTATION.start('exam: sniff')
+      csvfile = openReport(file)
+      INSTRUMENTATION.stop(token)
+      token = INSTRUMENTATION.start('exam: parse')
+
+      reader   = csvfile.rows()
+      lineNo   = 0   # Count lines
+      examInfo = newExamInfo(policy, streaming)
+
+      # We need to watch for each new exam name and also find the largest
+      # number of attempts for each.  This info will be used in creating the
+      # output table later.
+      for line in reader:
+         # Ignore header line and put lines in a dict:
+         if lineNo > 0:
+            addExamRow(examInfo, line, extract)
+         else:
+            # The first line is headers; find the columns we need.
+            headers = line
+            extract = ReportSchema('exam', headers).extract
+         lineNo = lineNo + 1
+         if(progress != None and lineNo % PROGRESS_INTERVAL == 0):
+            progress('exam', lineNo - 1)
+
+      csvfile.close()  # We're done with this file.
+      INSTRUMENTATION.stop(token, max(lineNo - 1, 0), 'rows')
+      if(progress != None):
+         progress('exam', max(lineNo - 1, 0))
+   return examInfo
+
+# Exam reports at least this big are split into chunks and read on every
+# core (see readExamFileChunked and examReadWorkers).
+CHUNKED_EXAM_BYTES = 64 << 20
+
+# Returns the number of processes to read an exam report with: one per core
+# for a report of CHUNKED_EXAM_BYTES or more, else None (read it serially).
+# Always None inside a pool worker, which can't start a pool of its own, and
+# for .xlsx reports, which can't be split into byte ranges.
+def examReadWorkers(file):
+   if(multiprocessing.cpu_count() < 2 or multiprocessing.current_process().daemon or isXlsxFile(file)):
+      return None
+   try:
+      if(os.path.getsize(file) < CHUNKED_EXAM_BYTES):
+         return None
+   except OSError:
+      return None   # Let the reader report a missing file.
+   return multiprocessing.cpu_count()
+
+# Pool task for readExamFileChunked: parses the rows in bytes [start, end) of
+# an exam report into a partial examInfo.  The result comes back pickled,
+# since reducers can only be pickled with the newer protocols.
+def readExamChunk(task):
+   file, start, end, dialect, header, policy, streaming = task
+   extract  = ReportSchema('exam', header).extract
+   examInfo = newExamInfo(getAttemptPolicy(policy) if policy != None else None, streaming)
+   with open(file, 'rb') as f:
+      f.seek(start)
+      text = f.read(end - start)
+   rows = 0
+   for line in csvRows(text, dialect):
+      addExamRow(examInfo, line, extract)
+      rows += 1
+   return rows, cPickle.dumps(examInfo, cPickle.HIGHEST_PROTOCOL)
+
+# Adds a partial examInfo for a later part of the same report into examInfo,
+# giving the same result as if all of its rows had been added there with
+# addExamRow.  Partials must be merged in file order.
+def mergeExamInfo(examInfo, partial):
+   attempts = examInfo['attempts']
+   for key, attempt in partial['attempts'].iteritems():
+      if(attempt > attempts.get(key, 0)):
+         attempts[key] = attempt
+   counts = examInfo['attemptCounts']
+   for key, count in partial['attemptCounts'].iteritems():
+      counts[key] = counts.get(key, 0) + count
+   for field in ('titles', 'possible', 'students'):
+      # The first row seen wins.
+      merged = examInfo[field]
+      for key, value in partial[field].iteritems():
+         if(not key in merged):
+            merged[key] = value
+   if('records' in examInfo):
+      records = examInfo['records']
+      for SID, lines in partial['records'].iteritems():
+         if(SID in records):
+            records[SID].extend(lines)
+         else:
+            records[SID] = lines
+   # Titles are numbered in the order they are first seen; renumber the
+   # partial's titles to match.
+   titleIndex = examInfo['titleIndex']
+   renumber   = {}
+   for key, index in sorted(partial['titleIndex'].iteritems(), key=lambda item: item[1]):
+      if(not key in titleIndex):
+         titleIndex[key] = len(titleIndex)
+      renumber[index] = titleIndex[key]
+   scores = examInfo['scores']
+   policy = 'policy' in examInfo
+   for SID, partialRow in partial['scores'].iteritems():
+      row = scores.get(SID)
+      if(row == None):
+         row = scores[SID] = []
+      for index, cells in enumerate(partialRow):
+         if(not cells):
+            continue   # No attempts at this title in the partial.
+         index = renumber[index]
+         while(len(row) <= index):
+            row.append(None if policy else [])
+         if(policy):
+            if(row[index] == None):
+               row[index] = cells
+            else:
+               row[index].merge(cells)
+         else:
+            merged = row[index]
+            while(len(merged) < len(cells)):
+               merged.append(None)
+            for attempt, cell in enumerate(cells):
+               if(cell != None):
+                  merged[attempt] = cell
+
+# Reads an exam report like readExamFile, but splits it into byte ranges on
+# row boundaries and parses them on `workers` processes (default: one per
+# core), then merges the partial results in file order with mergeExamInfo.
+# chunkBytes is the approximate size of each range (default: enough for
+# about four per worker, and at least 1 MB).
+# The result is the same as readExamFile's.  Rows must not contain quoted
+# line breaks (SimNet exports never do); reports with old Mac line endings
+# are read serially.
+def readExamFileChunked(file, policy=None, workers=None, streaming=False, progress=None, chunkBytes=None):
+   if(workers == None or workers < 1):
+      workers = multiprocessing.cpu_count()
+   spec   = readerPolicySpec(policy)
+   policy = getAttemptPolicy(spec) if spec != None else None
+   token  = INSTRUMENTATION.start('exam: chunk')
+   source = ReportSource(file)
+   try:
+      if(source.oldMac or source.map == None):
+         INSTRUMENTATION.stop(token)
+         return readExamFile(file, policy, streaming, progress)
+      header = next(source.rows(), [])
+      ReportSchema('exam', header)   # Check the columns before starting.
+      start  = source.map.tell()
+      size   = source.map.size()
+      # A few chunks per worker, so the workers finish at about the same time:
+      if(chunkBytes == None):
+         chunkBytes = max(size // (workers * 4), 1 << 20)
+      tasks  = []
+      while(start < size):
+         end = source.map.find('\n', min(start + chunkBytes, size - 1))
+         end = size if end == -1 else end + 1
+         tasks.append((file, start, end, source.dialect, header, spec, streaming))
+         start = end
+   finally:
+      source.close()
+   INSTRUMENTATION.stop(token, len(tasks), 'chunks')
+
+   token    = INSTRUMENTATION.start('exam: parse')
+   examInfo = newExamInfo(policy, streaming)
+   rows     = 0
+   pool     = multiprocessing.Pool(min(workers, max(len(tasks), 1)))
+   try:
+      for count, partial in pool.imap(readExamChunk, tasks):
+         mergeExamInfo(examInfo, cPickle.loads(partial))
+         rows += count
+         if(progress != None):
+            progress('exam', rows)
+      pool.close()
+   except:
+      pool.terminate()
+      raise
+   finally:
+      pool.join()
+   INSTRUMENTATION.stop(token, rows, 'rows')
+   return examInfo
+
+# Returns a fingerprint of one parsed report row, used by incremental mode to
+# recognize rows it has already seen.
+def rowFingerprint(line):
+   return hashlib.sha1('\x1f'.join(line)).digest()[:12]
+
+# Reads the rows of a report from (bytes) text, skipping blank lines.
+def csvRows(text, dialect):
+   return (line for line in csv.reader(text.splitlines(), **dialect) if len(line) > 0)
+
+# Incremental version of readExamFile for an export that grows over the term
+# (each re-export has all the earlier attempts plus some new ones).  What was
+# parsed last time is kept in stateFile, along with the length and hash of
+# the file as it was then and a fingerprint of each row:
+#  * If the new file starts with exactly the bytes parsed last time, only the
+#    rest of the file is parsed and added.
+#  * Otherwise, all rows are parsed but only rows with unseen fingerprints
+#    are added -- unless some earlier row is gone or changed, in which case
+#    the whole file is read again from scratch.
+# The state is then updated.  Returns (examInfo, mode), where mode is
+# 'append', 'merge', or 'full' according to which of these happened.
+# Only whole lines are parsed into the state: an export read while it is
+# still being written may end in part of a row, so anything after the last
+# line break is left to be read next time.  It is added to the examInfo
+# returned (but not to the state) if it holds a whole row, as a last row with
+# no line break after it does.
+# Rows must not contain quoted line breaks (SimNet exports never do).  An
+# .xlsx export is always read in full (mode 'full'), since a workbook can't
+# be appended to; no state is kept for it.
+def readExamFileIncremental(file, stateFile, policy=None):
+   if(isXlsxFile(file)):
+      return readExamFile(file, policy, streaming=True), 'full'
+   spec   = readerPolicySpec(policy)
+   policy = getAttemptPolicy(spec) if spec != None else None
+   state  = None
+   if(os.path.exists(stateFile)):
+      try:
+         with open(stateFile, 'rb') as f:
+            state = cPickle.load(f)
+         if(state['version'] != PARSER_VERSION or state['policy'] != spec):
+            state = None
+      except Exception:
+         state = None
+
+   with open(file, 'rb') as f:
+      digest = hashlib.sha1()
+      mode   = 'full'
+      if(state != None and os.path.getsize(file) >= state['length']):
+         remaining = state['length']
+         while(remaining > 0):
+            block = f.read(min(remaining, 1 << 20))
+            if(block == ''):
+               break
+            digest.update(block)
+            remaining -= len(block)
+         if(digest.hexdigest() == state['digest']):
+            mode = 'append'
+         else:
+            mode = 'merge'
+      if(mode != 'append'):
+         f.seek(0)
+         digest = hashlib.sha1()
+      text = f.read()
+   end = text.rfind('\n') + 1
+   if(end == 0 and mode != 'append'):
+      end = len(text)   # Just a header row.
+   text, tail = text[:end], text[end:]
+   digest.update(text)
+
+   if(mode == 'append'):
+      examInfo = state['examInfo']
+      seen     = state['seen']
+      dialect  = state['dialect']
+      header   = state['header']
+      extract  = ReportSchema('exam', header).extract
+      for line in csvRows(text, dialect):
+         addExamRow(examInfo, line, extract)
+         seen.add(rowFingerprint(line))
+   else:
+      dialect = detectDialect(text[:text.find('\n') + 1], text[:2048])
+      rows    = csvRows(text, dialect)
+      header  = next(rows, [])   # The first line is headers.
+      extract = ReportSchema('exam', header).extract
+      if(mode == 'merge'):
+         rows    = list(rows)
+         current = set(rowFingerprint(line) for line in rows)
+         if(state['seen'] <= current):
+            examInfo = state['examInfo']
+            seen     = state['seen']
+            rows     = [line for line in rows if not rowFingerprint(line) in seen]
+         else:
+            mode = 'full'
+      if(mode == 'full'):
+         examInfo = newExamInfo(policy, streaming=True)
+         seen     = set()
+      for line in rows:
+         addExamRow(examInfo, line, extract)
+         seen.add(rowFingerprint(line))
+      state = {'version': PARSER_VERSION, 'policy': spec, 'dialect': dialect, 'header': header}
+
+   state['length']   = len(text) + (state['length'] if mode == 'append' else 0)
+   state['digest']   = digest.hexdigest()
+   state['examInfo'] = examInfo
+   state['seen']     = seen
+   temp = stateFile + '.tmp'
+   with open(temp, 'wb') as f:
+      cPickle.dump(state, f, cPickle.HIGHEST_PROTOCOL)
+   if(os.path.exists(stateFile)):
+      os.remove(stateFile)
+   os.rename(temp, stateFile)
+   for line in csvRows(tail, dialect):
+      if(len(line) >= len(header)):
+         addExamRow(examInfo, line, extract)
+   return examInfo, mode
+
+# Returns a new, empty projectInfo for addProjectRow to fill.  See
+# readExamFile for the meaning of policy and newLessonInfo for streaming.
+def newProjectInfo(policy=None, streaming=False):
+   projectInfo = {}
+   if(not streaming):
+      projectInfo['records'] = {}  # Full record for each item
+   projectInfo['attempts'] = {}    # To keep track of highest value of attempts per title
+   projectInfo['attemptCounts'] = {}  # Number of attempts (rows), by title
+   projectInfo['titles']   = {}    # The titles themselves, keyed by a cleaned version.
+   projectInfo['percent']  = {}    # Stores percent by title and student ID.
+   projectInfo['possible'] = {}    # Points possible
+   projectInfo['students'] = {}    # [ID, LastName, FirstName] by student ID
+   projectInfo['titleIndex'] = {}  # Title index (for the score matrix) by title key
+   projectInfo['scores']   = {}    # Score matrix by student ID (see addAttemptScore)
+   if(policy != None):
+      projectInfo['policy'] = policy
+   return projectInfo
+
+# Adds one (non-header) row of a project report to projectInfo.  extract is
+# the report's ReportSchema('project', header).extract.
+def addProjectRow(projectInfo, line, extract):
+   fields = extract(line)
+   SID, lastName, firstName, title, attempt, totalPoints = fields[:6]
+   attempt  = int(attempt)
+   attempts = projectInfo['attempts']
+   titles   = projectInfo['titles']
+   percent  = projectInfo['percent']
+   possible = projectInfo['possible']
+   students = projectInfo['students']
+   # Add this line to the proper student's record (by ID).
+   if('records' in projectInfo):
+      records = projectInfo['records']
+      if(not SID in records):
+         records[SID] = []
+      records[SID].append(line)
+   # Add this project title to the project's record:
+   title_key = cleanKey(title)
+   if(not title_key in titles):
+      attempts[title_key] = 1
+      titles[title_key]   = title
+   # If we see a new highest attempt number, that is the new max
+   # value stored at attempts[projectname].
+   if(attempt > attempts[title_key]):
+      attempts[title_key] = attempt
+   counts = projectInfo['attemptCounts']
+   counts[title_key] = counts.get(title_key, 0) + 1
+   if(not SID in percent):
+      percent[SID] = {}
+   percent[SID][title_key] = fields[6]  # Store percent by ID and title.
+   if(not title_key in possible):
+      possible[title_key] = totalPoints  # Store possible points by title.
+   if(not SID in students):
+      students[SID] = [SID, lastName, firstName]
+   addAttemptScore(projectInfo['scores'], projectInfo['titleIndex'], SID, title_key, attempt,
+         fields[6:], projectInfo.get('policy'))
+
+# See readExamFile for the meaning of policy and readLessonFile for cache.
+def readProjectFile(file, policy=None, progress=None, cache=None):
+   if(cache != None and isReportFile(file)):
+      return cache.load('project', file, lambda: readProjectFile(file, policy, progress),
+            policy=readerPolicySpec(policy))
+   projectInfo = {}
+   if(policy != None):
+      policy = getAttemptPolicy(policy)
+      if(policy.perAttempt):
+         policy = None
+   # If we got a filename (with a .csv extension), process it.
+   if(isReportFile(file)):
+      token = INSTRUMENTATION.start('project: sniff')
+      csvfile = openReport(file)
+      INSTRUMENTATION.stop(token)
+      token = INSTRUMENTATION.start('project: parse')
+
+      reader      = csvfile.rows()
+      lineNo      = 0   # Count lines
+      projectInfo = newProjectInfo(policy)
+
+      # We need to watch for each new project name and also find the largest
+      # number of attempts for each.  This info will be used in creating the
+      # output table later.
+      for line in reader:
+         # Ignore header line and put lines in a dict:
+         if lineNo > 0:
+            addProjectRow(projectInfo, line, extract)
+         else:
+            # The first line is headers; find the columns we need.
+            headers = line
+            extract = ReportSchema('project', headers).extract
+         lineNo = lineNo + 1
+         if(progress != None and lineNo % PROGRESS_INTERVAL == 0):
+            progress('project', lineNo - 1)
+
+      csvfile.close()  # We're done with this file.
+      INSTRUMENTATION.stop(token, max(lineNo - 1, 0), 'rows')
+      if(progress != None):
+         progress('project', max(lineNo - 1, 0))
+   return projectInfo
+
+# Reads one of several exports that fill the same report slot (see
+# loadReports), as a part for mergeReportParts: every attempt is kept (no
+# attempt policy), and the Date of each one is recorded in 'attemptDates',
+# keyed by (student ID, title key, attempt).  Lesson reports have no attempts
+# and are read as usual.  See readLessonFile for the meaning of cache.
+def readReportPart(kind, file, progress=None, cache=None):
+   if(kind == 'lesson'):
+      return readLessonFile(file, progress, cache)
+   if(cache != None and isReportFile(file)):
+      return cache.load(kind, file, lambda: readReportPart(kind, file, progress), part=True)
+   info = {}
+   # If we got a filename (with a .csv extension), process it.
+   if(isReportFile(file)):
+      token = INSTRUMENTATION.start(kind + ': sniff')
+      csvfile = openReport(file)
+      INSTRUMENTATION.stop(token)
+      token = INSTRUMENTATION.start(kind + ': parse')
+
+      reader = csvfile.rows()
+      lineNo = 0   # Count lines
+      if(kind == 'exam'):
+         info, addRow = newExamInfo(streaming=True), addExamRow
+      else:
+         info, addRow = newProjectInfo(streaming=True), addProjectRow
+      dates = info['attemptDates'] = {}
+
+      for line in reader:
+         # Ignore header line and put lines in a dict:
+         if lineNo > 0:
+            addRow(info, line, extract)
+            dates[(line[sid], cleanKey(line[title]), int(line[attempt]))] = line[date] if date != None else ''
+         else:
+            # The first line is headers; find the columns we need.
+            schema  = ReportSchema(kind, line)
+            extract = schema.extract
+            sid, title, attempt = schema.positions[0], schema.positions[3], schema.positions[4]
+            date    = schema.date
+         lineNo = lineNo + 1
+         if(progress != None and lineNo % PROGRESS_INTERVAL == 0):
+            progress(kind, lineNo - 1)
+
+      csvfile.close()  # We're done with this file.
+      INSTRUMENTATION.stop(token, max(lineNo - 1, 0), 'rows')
+      if(progress != None):
+         progress(kind, max(lineNo - 1, 0))
+   return info
+
+# Merges the parts read by readReportPart from several exports of the same
+# kind of report, in the order given, into one info dict like a reader's
+# (without 'records').  Exports that overlap (by date range or section) hold
+# the same attempts more than once, so every attempt kept is entered in one
+# hash table keyed by (student ID, title key, attempt) with its date: an
+# attempt seen again with the same date is a duplicate and is dropped, and
+# one with a different date replaces the earlier one, as a later re-export
+# would.  Each part's rows are looked at once, so merging costs about the
+# same however many exports there are and however much they overlap.  The
+# number of duplicates dropped is left in 'duplicates'.  The attempt policy
+# (see readExamFile) is applied once everything is merged.  Lesson reports
+# have one row per student and title, so a later export's row simply
+# replaces an earlier one (see mergeLessonParts).
+def mergeReportParts(kind, parts, policy=None):
+   if(kind == 'lesson'):
+      return mergeLessonParts(parts)
+   if(policy != None):
+      policy = getAttemptPolicy(policy)
+      if(policy.perAttempt):
+         policy = None
+   if(kind == 'exam'):
+      info = newExamInfo(streaming=True)
+   else:
+      info = newProjectInfo(streaming=True)
+   attempts   = info['attempts']
+   counts     = info['attemptCounts']
+   titleIndex = info['titleIndex']
+   scores     = info['scores']
+   percent    = info.get('percent')
+   kept       = {}   # Date of each attempt kept, by (student ID, title key, attempt)
+   duplicates = 0
+   for part in parts:
+      if(len(part) == 0):
+         continue   # Not a report file.
+      for field in ('titles', 'possible', 'students'):
+         # The first row seen wins.
+         merged = info[field]
+         for key, value in part[field].iteritems():
+            if(not key in merged):
+               merged[key] = value
+      for key, attempt in part['attempts'].iteritems():
+         if(attempt > attempts.get(key, 0)):
+            attempts[key] = attempt
+      # Titles are numbered in the order they are first seen.
+      titleKeys = {}
+      for key, index in sorted(part['titleIndex'].iteritems(), key=lambda item: item[1]):
+         if(not key in titleIndex):
+            titleIndex[key] = len(titleIndex)
+         titleKeys[index] = key
+      dates = part['attemptDates']
+      for SID, partRow in part['scores'].iteritems():
+         row = scores.get(SID)
+         if(row == None):
+            row = scores[SID] = []
+         for index, cells in enumerate(partRow):
+            if(not cells):
+               continue   # No attempts at this title in the part.
+            key   = titleKeys[index]
+            index = titleIndex[key]
+            while(len(row) <= index):
+               row.append([])
+            merged = row[index]
+            while(len(merged) < len(cells)):
+               merged.append(None)
+            for attempt, cell in enumerate(cells):
+               if(cell == None):
+                  continue
+               slot = (SID, key, attempt + 1)
+               date = dates.get(slot, '')
+               seen = kept.get(slot)
+               if(seen == date):
+                  duplicates += 1
+                  continue
+               if(seen == None):
+                  counts[key] = counts.get(key, 0) + 1
+               kept[slot] = date
+               merged[attempt] = cell
+               if(percent != None):
+                  percent.setdefault(SID, {})[key] = cell[PROJECT_PERCENT]
+   if(policy != None):
+      for row in scores.itervalues():
+         for index, cells in enumerate(row):
+            reducer = None
+            for attempt, cell in enumerate(cells, 1):
+               if(cell != None):
+                  if(reducer == None):
+                     reducer = policy.reducer()
+                  reducer.add(attempt, cell)
+            row[index] = reducer
+      info['policy'] = policy
+   info['duplicates'] = duplicates
+   return info
+
+# Merges lessonInfos from several exports, in order, into one (see
+# mergeReportParts).
+def mergeLessonParts(parts):
+   lessonInfo = newLessonInfo(streaming=True)
+   titles     = lessonInfo['titles']
+   for part in parts:
+      if(len(part) == 0):
+         continue   # Not a report file.
+      for key, title in part['titles'].iteritems():
+         titles.setdefault(key, {})['title'] = title['title']
+      for field in ('possible', 'students'):
+         # The first row seen wins.
+         merged = lessonInfo[field]
+         for key, value in part[field].iteritems():
+            if(not key in merged):
+               merged[key] = value
+      for field in ('percent', 'earned'):
+         merged = lessonInfo[field]
+         for SID, values in part[field].iteritems():
+            if(SID in merged):
+               merged[SID].update(values)
+            else:
+               merged[SID] = dict(values)
+   return lessonInfo
+
+# Progress callback for readReport in process-pool workers; set by the pool
+# initializer (initReportWorker) so progress can be sent back to the parent.
+workerProgress = None
+
+def initReportWorker(queue):
+   global workerProgress
+   def progress(stage, count, total=None):
+      queue.put((stage, count, total))
+   workerProgress = progress
+
+# Reads one report; kind is 'lesson', 'exam', or 'project'.  Used as the
+# pool task in loadReports, so it takes a single (kind, file, policy, part)
+# tuple; part is True for one of several files of the same report slot,
+# which is read with readReportPart (and policy is then ignored).
+def readReport(task, progress=None, cache=None):
+   kind, file, policy, part = task
+   if(progress == None):
+      progress = workerProgress
+   if(part):
+      return readReportPart(kind, file, progress, cache)
+   if(kind == 'lesson'):
+      return readLessonFile(file, progress, cache)
+   elif(kind == 'exam'):
+      return readExamFile(file, policy, streaming=True, progress=progress, cache=cache,
+            workers=examReadWorkers(file))
+   else:
+      return readProjectFile(file, policy, progress, cache)
+
+# Looks up a loadReports task in the parse cache the same way readReport's
+# reader would.  Returns (key, info), with info None on a miss.
+def fetchReport(task, cache):
+   kind, file, policy, part = task
+   if(kind == 'lesson'):
+      return cache.fetch(kind, file)
+   elif(part):
+      return cache.fetch(kind, file, part=True)
+   elif(kind == 'exam'):
+      return cache.fetch(kind, file, policy=readerPolicySpec(policy), streaming=True)
+   else:
+      return cache.fetch(kind, file, policy=readerPolicySpec(policy))
+
+# How loadReports reads the reports by default: 'process' (a process pool,
+# so the reads really run in parallel), 'thread' (a thread pool; cheaper to
+# start, but the reads share the GIL), or 'serial'.
+LOAD_MODE = 'process'
+
+# Reads the lesson, exam, and project reports concurrently and returns
+# (lessonInfo, examInfo, projectInfo), so the total load time is about that
+# of the slowest report rather than the sum of all three.  Blank file names
+# give empty info dicts, as with the individual readers.  Each report may
+# also be several exports of the same kind (see reportFiles); each export is
+# then read on its own, concurrently with the rest, and they are merged in
+# order with mergeReportParts, which drops the attempts found in more than
+# one of them.  The progress callback is always called in this process; in
+# process mode the workers' progress is relayed back through a queue while
+# we wait for them.  With a ParseCache, reports found in the cache are not
+# read at all.  While instrumentation is on, the reports are read serially
+# so that each phase is timed on its own (and recorded in this process).
+def loadReports(lessonFile, examFile, projectFile, examPolicy=None, projectPolicy=None, mode=None, progress=None, cache=None):
+   if(mode == None):
+      mode = LOAD_MODE
+   if(INSTRUMENTATION.enabled):
+      mode = 'serial'
+   slots = [('lesson', reportFiles(lessonFile), None), ('exam', reportFiles(examFile), examPolicy),
+            ('project', reportFiles(projectFile), projectPolicy)]
+   tasks = []
+   for kind, files, policy in slots:
+      part = len(files) > 1
+      tasks.extend((kind, file, policy if not part else None, part) for file in files)
+   # A very large exam report is read on all the cores by itself (see
+   # examReadWorkers), so read the reports one after another:
+   if(any(task[0] == 'exam' and not task[3] and examReadWorkers(task[1]) != None for task in tasks)):
+      mode = 'serial'
+   # Only hand real work to the pool:
+   busy   = [task for task in tasks if isReportFile(task[1])]
+   loaded = {}
+   if(mode == 'serial' or len(busy) < 2):
+      for task in tasks:
+         loaded[task] = readReport(task, progress, cache)
+      return mergeLoadedReports(slots, loaded)
+   # Check the cache here, so only misses go to the pool (and the cache's
+   # counters stay in this process):
+   keys = {}
+   if(cache != None):
+      for task in busy:
+         keys[task], info = fetchReport(task, cache)
+         if(info != None):
+            loaded[task] = info
+      busy = [task for task in busy if not task in loaded]
+      if(len(busy) < 2):
+         for task in busy:
+            loaded[task] = readReport(task, progress)
+            cache.store(keys[task], loaded[task])
+         return mergeLoadedReports(slots, loaded)
+   queue   = None
+   workers = min(len(busy), multiprocessing.cpu_count())
+   if(mode == 'thread'):
+      pool = multiprocessing.pool.ThreadPool(workers)
+   elif(mode == 'process'):
+      if(progress != None):
+         queue = multiprocessing.Queue()
+         pool  = multiprocessing.Pool(workers, initReportWorker, (queue,))
+      else:
+         pool  = multiprocessing.Pool(workers)
+   else:
+      raise ValueError("Unknown load mode '{0}'".format(mode))
+   try:
+      if(mode == 'thread' and progress != None):
+         result = pool.map_async(lambda task: readReport(task, progress), busy)
+      else:
+         result = pool.map_async(readReport, busy)
+      # Relay the workers' progress while we wait:
+      while(not result.ready()):
+         result.wait(0.1)
+         while(queue != None and not queue.empty()):
+            progress(*queue.get())
+      for task, info in zip(busy, result.get()):
+         loaded[task] = info
+         if(cache != None):
+            cache.store(keys[task], info)
+      pool.close()
+      while(queue != None and not queue.empty()):
+         progress(*queue.get())
+   except:
+      pool.terminate()
+      raise
+   finally:
+      pool.join()
+   return mergeLoadedReports(slots, loaded)
+
+# Returns (lessonInfo, examInfo, projectInfo) from the infos loadReports read
+# for each of its tasks: the info itself for a slot with one file, the
+# merged parts for a slot with several, and an empty dict for a blank slot.
+def mergeLoadedReports(slots, loaded):
+   infos = []
+   for kind, files, policy in slots:
+      if(len(files) > 1):
+         infos.append(mergeReportParts(kind, [loaded.get((kind, file, None, True), {}) for file in files], policy))
+      elif(len(files) == 1):
+         infos.append(loaded.get((kind, files[0], policy, False), {}))
+      else:
+         infos.append({})
+   return tuple(infos)
+
+# The store's table for each kind of report.
+STORE_TABLES = {'lesson': 'lessons', 'exam': 'exams', 'project': 'projects'}
+
+# How GradebookStore.aggregate applies an attempt policy to one score field
+# ({field}) of a (student, title)'s rows, with a plain GROUP BY: {value} is
+# the field as a number (NULL if blank) and m{i} its highest value.  Fields
+# are picked by the lowest or highest zero-padded attempt number prefixed
+# to them, so the earliest best and the latest attempt come back as typed;
+# averages are formatted as formatScore does.  The other policies rank the
+# attempts, which SQLite only does with window functions that sort the
+# rows once per field -- slower than reducing the rows in Python, which
+# GradebookStore.fill does for them instead.
+STORE_POLICY_SQL = {
+   'best':   "SUBSTR(MIN(CASE WHEN {value} = g.m{i} OR g.m{i} IS NULL THEN printf('%010d', t.Attempt) || t.{field} END), 11)",
+   'latest': "SUBSTR(MAX(printf('%010d', t.Attempt) || t.{field}), 11)",
+   'mean':   "AVG({value})"}
+
+# A term gradebook: the lesson, exam, and project rows of any number of
+# exports (and sections) kept in a local SQLite database, so the whole term
+# can be combined with one indexed query per report type instead of
+# reparsing every export.  Columns are named as in the reports (see
+# REPORT_COLUMNS).  Rows are keyed by (StudentID, title[, Attempt]), so
+# importing an export again, or a later re-export of it, just replaces the
+# rows already there: imports are idempotent.
+class GradebookStore(object):
+   def __init__(self, file, timeout=60.0):
+      self.file = file
+      self.db   = sqlite3.connect(file, timeout=timeout)
+      self.db.text_factory = str
+      self.db.execute("PRAGMA journal_mode=WAL")   # Readers don't block the writer.
+      self.db.execute("PRAGMA synchronous=NORMAL")
+      with self.db:
+         self.db.execute("CREATE TABLE IF NOT EXISTS students (StudentID TEXT PRIMARY KEY, "
+                         "LastName TEXT, FirstName TEXT)")
+         for kind, table in STORE_TABLES.items():
+            key = self.keyColumns(kind)
+            self.db.execute("CREATE TABLE IF NOT EXISTS {0} ({1}, Section TEXT, PRIMARY KEY ({2}))".format(
+                  table, ", ".join(name + (" INTEGER" if name == 'Attempt' else " TEXT")
+                                   for name in self.columns(kind)), ", ".join(key)))
+            self.db.execute("CREATE INDEX IF NOT EXISTS {0}BySection ON {0} (Section)".format(table))
+
+   # The columns of a kind's table: the report columns (less the names,
+   # which are in the students table) plus a title key for grouping.
+   def columns(self, kind):
+      return ('StudentID', 'TitleKey') + REPORT_COLUMNS[kind][3:]
+
+   def keyColumns(self, kind):
+      if('Attempt' in REPORT_COLUMNS[kind]):
+         return ('StudentID', 'TitleKey', 'Attempt')
+      return ('StudentID', 'TitleKey')
+
+   # Adds (or replaces) rows given as tuples of REPORT_COLUMNS[kind] fields,
+   # in batches.  Returns the number of rows.
+   def importRows(self, kind, rows, section='', batchSize=10000):
+      table     = STORE_TABLES[kind]
+      columns   = self.columns(kind)
+      attempted = 'Attempt' in REPORT_COLUMNS[kind]
+      insert    = "INSERT OR REPLACE INTO {0} ({1}, Section) VALUES ({2})".format(table,
+            ", ".join(columns), ", ".join("?" * (len(columns) + 1)))
+      count     = 0
+      with self.db:   # All or nothing.
+         batch    = []
+         students = {}
+         for fields in rows:
+            if(attempted):
+               batch.append((fields[0], cleanKey(fields[3]), fields[3], int(fields[4])) + fields[5:] + (section,))
+            else:
+               batch.append((fields[0], cleanKey(fields[3])) + fields[3:] + (section,))
+            students[fields[0]] = fields[:3]
+            if(len(batch) >= batchSize):
+               count += self.flush(insert, batch, students)
+         count += self.flush(insert, batch, students)
+      return count
+
+   def flush(self, insert, batch, students):
+      self.db.executemany(insert, batch)
+      self.db.executemany("INSERT OR REPLACE INTO students VALUES (?, ?, ?)", students.itervalues())
+      count = len(batch)
+      del batch[:]
+      students.clear()
+      return count
+
+   # Imports one report file (kind is 'lesson', 'exam', or 'project') for a
+   # section.  Returns the number of rows.
+   def importReport(self, kind, file, section=''):
+      source = openReport(file)
+      try:
+         rows    = source.rows()
+         extract = ReportSchema(kind, next(rows, [])).extract
+         return self.importRows(kind, (extract(line) for line in rows if len(line) > 0), section)
+      finally:
+         source.close()
+
+   # Imports a section's reports (blank file names are skipped; each may name
+   # several exports, see reportFiles).  Returns the total number of rows.
+   def importReports(self, lessonFile, examFile, projectFile, section=''):
+      count = 0
+      for kind, files in (('lesson', lessonFile), ('exam', examFile), ('project', projectFile)):
+         for file in reportFiles(files):
+            if(isReportFile(file)):
+               count += self.importReport(kind, file, section)
+      return count
+
+   # Returns {section: {kind: rows}} for everything in the store.
+   def sections(self):
+      sections = {}
+      for kind, table in STORE_TABLES.items():
+         for section, count in self.db.execute("SELECT Section, COUNT(*) FROM {0} GROUP BY Section".format(table)):
+            sections.setdefault(section, {})[kind] = count
+      return sections
+
+   # Rows of one kind, shaped like REPORT_COLUMNS[kind], for the given
+   # sections (default: all of them), in key order.
+   def rows(self, kind, sections=None):
+      columns = REPORT_COLUMNS[kind]
+      query   = "SELECT {0} FROM {1} t JOIN students s ON s.StudentID = t.StudentID".format(
+            ", ".join(('s.' if name in ('LastName', 'FirstName') else 't.') + name for name in columns),
+            STORE_TABLES[kind])
+      args    = ()
+      if(sections != None):
+         query += " WHERE t.Section IN ({0})".format(", ".join("?" * len(sections)))
+         args   = tuple(sections)
+      query += " ORDER BY " + ", ".join("t." + name for name in self.keyColumns(kind))
+      return self.db.execute(query, args)
+
+   # Returns (lessonInfo, examInfo, projectInfo) for the given sections
+   # (default: all), ready for writeCombinedFile -- the same as reading one
+   # export holding all of their rows.  See readExamFile for the policies.
+   def read(self, sections=None, examPolicy=None, projectPolicy=None):
+      examPolicy    = readerPolicySpec(examPolicy)
+      examPolicy    = getAttemptPolicy(examPolicy) if examPolicy != None else None
+      projectPolicy = readerPolicySpec(projectPolicy)
+      projectPolicy = getAttemptPolicy(projectPolicy) if projectPolicy != None else None
+      return (self.fill('lesson', sections, newLessonInfo(streaming=True), addLessonRow),
+              self.fill('exam', sections, newExamInfo(examPolicy, streaming=True), addExamRow),
+              self.fill('project', sections, newProjectInfo(projectPolicy, streaming=True), addProjectRow))
+
+   # Adds the rows of one kind to info with addRow.  Returns info, or {} if
+   # there were no rows (as the readers do for a missing report).  The
+   # policies in STORE_POLICY_SQL are applied by the query instead (see
+   # aggregate).
+   def fill(self, kind, sections, info, addRow):
+      policy = info.get('policy')
+      if(policy != None and policy.name in STORE_POLICY_SQL):
+         return self.aggregate(kind, sections, info)
+      count = 0
+      for fields in self.rows(kind, sections):
+         addRow(info, fields, tuple)   # The rows are already in column order.
+         count += 1
+      return info if count > 0 else {}
+
+   # Fills exam or project info for its policy with one grouped query, so
+   # only one row per (student, title) comes back, holding the policy's
+   # result for each score field (see STORE_POLICY_SQL).  Titles, attempt
+   # counts, and points possible come out as addExamRow and addProjectRow
+   # would record them reading the rows in key order.
+   def aggregate(self, kind, sections, info):
+      columns = REPORT_COLUMNS[kind]
+      scores  = columns[6:]
+      policy  = STORE_POLICY_SQL[info['policy'].name]
+      values  = ["CASE WHEN t.{0} != '' THEN CAST(t.{0} AS REAL) END".format(name) for name in scores]
+      where   = ''
+      args    = ()
+      if(sections != None):
+         where = " WHERE t.Section IN ({0})".format(", ".join("?" * len(sections)))
+         args  = tuple(sections)
+      table   = STORE_TABLES[kind]
+      source  = table + " t"
+      if('g.m' in policy):   # Join the highest value of each field.
+         source += (" JOIN (SELECT t.StudentID, t.TitleKey, {0} FROM {1} t{2} GROUP BY t.StudentID, t.TitleKey) g "
+                    "ON g.StudentID = t.StudentID AND g.TitleKey = t.TitleKey").format(
+               ", ".join("MAX({0}) AS m{1}".format(value, i) for i, value in enumerate(values)), table, where)
+         args  = args * 2
+      query   = ("SELECT t.StudentID, s.LastName, s.FirstName, t.TitleKey, "
+                 "SUBSTR(MIN(printf('%010d', t.Attempt) || t.Title), 11), "
+                 "SUBSTR(MIN(printf('%010d', t.Attempt) || t.{0}), 11), MAX(t.Attempt), COUNT(*), "
+                 "SUBSTR(MAX(printf('%010d', t.Attempt) || t.{1}), 11), {2} "
+                 "FROM {3} JOIN students s ON s.StudentID = t.StudentID{4} "
+                 "GROUP BY t.StudentID, t.TitleKey ORDER BY t.StudentID, t.TitleKey").format(
+            columns[5], scores[0], ", ".join(policy.format(field=name, value=value, i=i)
+                                             for i, (name, value) in enumerate(zip(scores, values))),
+            source, where)
+      count   = 0
+      for row in self.db.execute(query, args):
+         SID, lastName, firstName, title_key, title, possible, attempts, rows, latest = row[:9]
+         if(not title_key in info['titles']):
+            info['titles'][title_key]   = title
+            info['possible'][title_key] = possible
+            info['attempts'][title_key] = 1
+         info['attempts'][title_key]      = max(info['attempts'][title_key], attempts)
+         info['attemptCounts'][title_key] = info['attemptCounts'].get(title_key, 0) + rows
+         if(not SID in info['students']):
+            info['students'][SID] = (intern(SID), lastName, firstName)
+         if(kind == 'project'):
+            info['percent'].setdefault(SID, {})[title_key] = latest   # As addProjectRow leaves it.
+         cell  = tuple('' if value == None else formatScore(value) if isinstance(value, float) else value
+                       for value in row[9:])
+         index    = info['titleIndex'].setdefault(title_key, len(info['titleIndex']))
+         scoreRow = info['scores'].setdefault(SID, [])
+         while(len(scoreRow) <= index):
+            scoreRow.append(None)
+         scoreRow[index] = AggregatedAttempts(cell)
+         count += 1
+      return info if count > 0 else {}
+
+   def close(self):
+      self.db.close()
+
+# One student of a StudentIndex: their [ID, LastName, FirstName], the key
+# their row is sorted by, and their own per-title scores from each report
+# (None for a report they aren't in): lessonPercent and lessonEarned by
+# title key, and their rows of the project and exam score matrices.
+class StudentEntry(object):
+   __slots__ = ('SID', 'student', 'sortKey', 'lessonPercent', 'lessonEarned', 'projectScores', 'examScores')
+
+   def __init__(self, student):
+      self.SID           = student[0]
+      self.student       = student
+      # Clean names sort alphabetically; the ID keeps namesakes apart.
+      self.sortKey       = (cleanKey(student[1] + student[2]), student[0])
+      self.lessonPercent = None
+      self.lessonEarned  = None
+      self.projectScores = None
+      self.examScores    = None
+
+# Every student in the lesson, exam, and project data, keyed by student ID,
+# so two students with the same name get a row each.  A student's ID and
+# names come from the exam report if they are in it, else the project
+# report, else the lesson report.  Iterating gives the StudentEntry objects
+# in output order.
+class StudentIndex(object):
+   def __init__(self, lessonInfo, examInfo, projectInfo):
+      entries = {}
+      for info in (examInfo, projectInfo, lessonInfo):
+         for SID, student in info.get('students', {}).iteritems():
+            if(not SID in entries):
+               entries[SID] = StudentEntry(student)
+      for SID, scores in lessonInfo.get('percent', {}).iteritems():
+         entries[SID].lessonPercent = scores
+      for SID, scores in lessonInfo.get('earned', {}).iteritems():
+         entries[SID].lessonEarned = scores
+      for SID, row in projectInfo.get('scores', {}).iteritems():
+         entries[SID].projectScores = row
+      for SID, row in examInfo.get('scores', {}).iteritems():
+         entries[SID].examScores = row
+      self.entries = entries
+      self.order   = sorted(entries.itervalues(), key=operator.attrgetter('sortKey'))
+
+   def __len__(self):
+      return len(self.order)
+
+   def __iter__(self):
+      return iter(self.order)
+
+   def __contains__(self, SID):
+      return SID in self.entries
+
+   # Returns the StudentEntry for a student ID, or None.
+   def get(self, SID):
+      return self.entries.get(SID)
+
+# Running median with the P-square algorithm (Jain and Chlamtac, 1985).  The
+# first P2_EXACT_LIMIT values are kept (sorted), so the median of a class is
+# exact; after that five markers, started from those values, are moved along
+# with the data and give an estimate, so the memory used stays the same
+# however many values are added.
+P2_EXACT_LIMIT = 1000
+
+class P2Median(object):
+   __slots__ = ('heights', 'positions')
+
+   def __init__(self):
+      self.heights   = []
+      self.positions = None
+
+   def add(self, x):
+      q = self.heights
+      n = self.positions
+      if(n == None):
+         bisect.insort(q, x)
+         if(len(q) > P2_EXACT_LIMIT):
+            # Switch to the five markers: the min, quartiles, and max.
+            last           = len(q) - 1
+            self.positions = [int(round(1 + last * p)) for p in (0.0, 0.25, 0.5, 0.75, 1.0)]
+            self.heights   = [q[i - 1] for i in self.positions]
+         return
+      # Count x in the cell it falls in, widening the end markers if need be:
+      if(x < q[1]):
+         if(x < q[0]):
+            q[0] = x
+         n[1] += 1
+         n[2] += 1
+         n[3] += 1
+      elif(x < q[2]):
+         n[2] += 1
+         n[3] += 1
+      elif(x < q[3]):
+         n[3] += 1
+      elif(x > q[4]):
+         q[4] = x
+      n[4] += 1
+      # Move the middle markers toward their desired positions (the last
+      # marker's position is the number of values):
+      last = n[4] - 1
+      for i, p in ((1, 0.25), (2, 0.5), (3, 0.75)):
+         d = 1 + last * p - n[i]
+         if((d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1)):
+            d = 1 if d > 0 else -1
+            height = q[i] + float(d) / (n[i + 1] - n[i - 1]) * \
+                  ((n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i]) +
+                   (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1]))
+            if(not q[i - 1] < height < q[i + 1]):
+               height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+            q[i]  = height
+            n[i] += d
+
+   def result(self):
+      q = self.heights
+      if(self.positions != None):
+         return q[2]
+      if(len(q) == 0):
+         return None
+      middle = len(q) // 2
+      if(len(q) % 2 == 1):
+         return q[middle]
+      return (q[middle - 1] + q[middle]) / 2.0
+
+# Statistics of one column of the combined output, updated one score at a
+# time: count, mean and variance (Welford's method), min, max, and median
+# (P2Median).  Scores that are blank or not numbers are only counted in
+# blanks.
+class ColumnStatistics(object):
+   __slots__ = ('kind', 'key', 'title', 'header', 'count', 'blanks', 'mean', 'm2', 'low', 'high', 'median')
+
+   def __init__(self, kind, key, title, header):
+      self.kind   = kind      # 'lesson', 'project', or 'exam'
+      self.key    = key       # Title key
+      self.title  = title
+      self.header = header    # Output column header
+      self.count  = 0
+      self.blanks = 0
+      self.mean   = 0.0
+      self.m2     = 0.0
+      self.low    = None
+      self.high   = None
+      self.median = P2Median()
+
+   def add(self, text):
+      try:
+         x = float(text)
+      except ValueError:
+         self.blanks += 1
+         return
+      self.count += 1
+      delta       = x - self.mean
+      self.mean  += delta / self.count
+      self.m2    += delta * (x - self.mean)
+      if(self.low == None or x < self.low):
+         self.low  = x
+      if(self.high == None or x > self.high):
+         self.high = x
+      self.median.add(x)
+
+   # Sample standard deviation (as Excel's STDEV), or None for fewer than
+   # two scores.
+   def stdev(self):
+      if(self.count < 2):
+         return None
+      return math.sqrt(self.m2 / (self.count - 1))
+
+# Per-title statistics of the combined output, filled in by combinedRows as
+# it generates the rows when passed as its stats argument; write them out
+# with writeStatisticsFile.  columns has a ColumnStatistics for every score
+# column, in output order.  attempts[kind][key] is the number of attempts at
+# each exam and project title in the reports, and attempted[kind][key] the
+# number of students who made at least one.
+class ClassStatistics(object):
+   def __init__(self):
+      self.columns   = []
+      self.students  = 0
+      self.attempts  = {'project': {}, 'exam': {}}
+      self.attempted = {'project': {}, 'exam': {}}
+
+# Generates the rows of the combined output, one at a time: the headers,
+# then (for points-based output) the points possible, then one row per
+# student in name order (see StudentIndex).  Only the student index and the
+# sorted title lists are built up front, so any output format can consume the rows without the whole table
+# ever being in memory.  examPolicy and projectPolicy choose how
+# multiple attempts are combined (see getAttemptPolicy); if not given, they
+# are "best" or "all" according to takeHighestExam / takeHighestProject.  A
+# report that was read with a policy is always written with that policy.
+# If useNumpy is True (the default) and NumPy is installed, best attempts
+# are selected with bestScoresNumpy, a block of students at a time; the
+# output is identical either way.
+# If a ClassStatistics is given as stats, it is filled in as the rows are
+# generated.
+def combinedRows(lessonInfo, examInfo, projectInfo, takeHighestExam, selectPointsOrCorrect, takeHighestProject, missingScoreMark = "", usePoints=False, useNumpy=True, examPolicy=None, projectPolicy=None, progress=None, stats=None):
+   # PRE-PROCESS:  Index the students and sort the title lists.
+   #First make sure we have the 'titles' key in examInfo, lessonInfo, and projectInfo:
+   for info in (lessonInfo, examInfo, projectInfo):
+      if(not 'titles' in info):
+         info['titles'] = {}
+   token = INSTRUMENTATION.start('write: index students')
+   students            = StudentIndex(lessonInfo, examInfo, projectInfo)
+   sortedExamTitles    = sorted(examInfo['titles'])
+   sortedLessonTitles  = sorted(lessonInfo['titles'])
+   sortedProjectTitles = sorted(projectInfo['titles'])
+   INSTRUMENTATION.stop(token, len(students), 'students')
+
+   # Settle on the attempt policy for each report type:
+   if('policy' in examInfo):
+      examPolicy    = examInfo['policy']
+   elif(examPolicy == None):
+      examPolicy    = 'best' if takeHighestExam else ALL_ATTEMPTS
+   examPolicy       = getAttemptPolicy(examPolicy)
+   if('policy' in projectInfo):
+      projectPolicy = projectInfo['policy']
+   elif(projectPolicy == None):
+      projectPolicy = 'best' if takeHighestProject else ALL_ATTEMPTS
+   projectPolicy    = getAttemptPolicy(projectPolicy)
+   # Single-column policies other than "best" say so in the header:
+   examSuffix    = '' if examPolicy.name in (ALL_ATTEMPTS, 'best') else ' [' + examPolicy.label + ']'
+   projectSuffix = '' if projectPolicy.name in (ALL_ATTEMPTS, 'best') else ' [' + projectPolicy.label + ']'
+
+   # BEGIN OUTPUT PHASE:
+   # Exam and project scores are in the score matrices (see
+   # addAttemptScore); data for lessons is all in lesson structure:
+   # titles, names, percent
+   # percent is stored by [ID][titleKey]
+   examPctCol = EXAM_PCT_CORRECT  # Use "percent correct" by default (instructor can edit this one)
+   if(selectPointsOrCorrect == True):
+      examPctCol = EXAM_PCT_POINTS  # Use "percent points" instead (instructor CANNOT edit this field)
+   # Output to a new CSV file such that each student (by ID) has a single
+   # row.  Each row has:
+   # StudentID,LastName,FirstName,Lesson1....LessonN,Exam1attempt1...attamptN,...ExamNAttempt1...attemptN
+
+   # The first line will be headers.  Build them.  The headers will
+   # Depend on the lessons, exams, and number of attempts for each exam.
+   outputHeaders    = []
+   columnTitles     = []   # (kind, key, title) of each score column
+   outputHeaders.append("Student ID")
+   outputHeaders.append("Last Name")
+   outputHeaders.append("First Name")
+
+   # Lessons first
+   for key in sortedLessonTitles:
+      outputHeaders.append(str(lessonInfo['titles'][key]['title']))
+      columnTitles.append(('lesson', key, lessonInfo['titles'][key]['title']))
+   # Then projects
+   for key in sortedProjectTitles:
+      nAttempts = projectInfo['attempts'][key]
+      currentAttempt = 0
+      if(nAttempts > 1 and projectPolicy.perAttempt):
+         while(currentAttempt < nAttempts):
+            outputHeaders.append(str(projectInfo['titles'][key]) + str(" [Attempt ") \
+                               + str(currentAttempt + 1) + "]")
+            columnTitles.append(('project', key, projectInfo['titles'][key]))
+            currentAttempt += 1
+      else:
+         outputHeaders.append(str(projectInfo['titles'][key]) + projectSuffix)
+         columnTitles.append(('project', key, projectInfo['titles'][key]))
+   # Then exams
+   for key in sortedExamTitles:
+      nAttempts = examInfo['attempts'][key]
+      currentAttempt = 0
+      if(nAttempts > 1 and examPolicy.perAttempt):
+         while(currentAttempt < nAttempts):
+            outputHeaders.append(str(examInfo['titles'][key]) + str(" [Attempt ") \
+                               + str(currentAttempt + 1) + "]")
+            columnTitles.append(('exam', key, examInfo['titles'][key]))
+            currentAttempt += 1
+      else:
+         outputHeaders.append(str(examInfo['titles'][key]) + examSuffix)
+         columnTitles.append(('exam', key, examInfo['titles'][key]))
+
+   yield outputHeaders
+
+   # If we want points-based output, we need a row for max points for each assignment:
+   if usePoints:
+      maxPtsRow = []
+      maxPtsRow.append("Pts. Possible") # SID (use as label)
+      maxPtsRow.append("") # Last Name  (empty cell)
+      maxPtsRow.append("") # First Name (empty cell)
+
+      # Lessons first
+      for key in sortedLessonTitles:
+         maxPtsRow.append(str(lessonInfo['possible'][key]))
+      # Then projects
+      for key in sortedProjectTitles:
+         nAttempts = projectInfo['attempts'][key]
+         currentAttempt = 0
+         if(nAttempts > 1 and projectPolicy.perAttempt):
+            while(currentAttempt < nAttempts):
+               maxPtsRow.append(str(projectInfo['possible'][key]))
+               currentAttempt += 1
+         else:
+            maxPtsRow.append(str(projectInfo['possible'][key]))
+      # Then exams
+      for key in sortedExamTitles:
+         nAttempts = examInfo['attempts'][key]
+         currentAttempt = 0
+         if(nAttempts > 1 and examPolicy.perAttempt):
+            while(currentAttempt < nAttempts):
+               maxPtsRow.append(str(examInfo['possible'][key]))
+               currentAttempt += 1
+         else:
+            maxPtsRow.append(str(examInfo['possible'][key]))
+
+      yield maxPtsRow
+
+
+   # Pre-compute, for each project and exam title in output order, its
+   # key, its index in the score matrix, and the number of attempts.
+   if(len(projectInfo['titles']) > 0):
+      projectColumns = [(key, projectInfo['titleIndex'][key], projectInfo['attempts'][key]) for key in sortedProjectTitles]
+   if(len(examInfo['titles']) > 0):
+      examColumns    = [(key, examInfo['titleIndex'][key], examInfo['attempts'][key]) for key in sortedExamTitles]
+   projectScoreCol = PROJECT_PERCENT if not usePoints else PROJECT_POINTS
+   examScoreCol    = examPctCol if not usePoints else EXAM_POINTS
+
+   # With NumPy, the best attempts are found for one block of students at a
+   # time, as the loop below reaches each block, so rows still stream out:
+   projectNumpy = (useNumpy and projectPolicy.name == 'best' and not 'policy' in projectInfo and
+                   len(projectInfo['titles']) > 0 and loadNumpy() != None)
+   examNumpy    = (useNumpy and examPolicy.name == 'best' and not 'policy' in examInfo and
+                   len(examInfo['titles']) > 0 and loadNumpy() != None)
+   projectBest  = None
+   examBest     = None
+
+   # With statistics, missing scores are marked with a placeholder (so they
+   # can be told apart from scores that look the same) until each row's
+   # scores have been added to the statistics.
+   missing = missingScoreMark
+   if(stats != None):
+      missing = object()
+      stats.students = len(students)
+      stats.columns  = [ColumnStatistics(kind, key, title, header)
+                        for (kind, key, title), header in zip(columnTitles, outputHeaders[3:])]
+      stats.attempts = {'project': dict(projectInfo.get('attemptCounts', {})),
+                        'exam': dict(examInfo.get('attemptCounts', {}))}
+      attempted      = stats.attempted = {'project': dict.fromkeys(sortedProjectTitles, 0),
+                                          'exam': dict.fromkeys(sortedExamTitles, 0)}
+      columnStats    = [None, None, None] + stats.columns
+
+   # For each student (in sorted order), create exactly 1 row:
+   token = INSTRUMENTATION.start('write: students')
+   for studentNo, student in enumerate(students):
+      if(studentNo % NUMPY_BLOCK == 0 and (projectNumpy or examNumpy)):
+         numpyToken = INSTRUMENTATION.start('write: numpy best')
+         block      = students.order[studentNo:studentNo + NUMPY_BLOCK]
+         if(projectNumpy):
+            projectBest = bestScoresNumpy([blockStudent.projectScores for blockStudent in block], projectColumns, projectScoreCol)
+         if(examNumpy):
+            examBest    = bestScoresNumpy([blockStudent.examScores for blockStudent in block], examColumns, examScoreCol)
+         INSTRUMENTATION.stop(numpyToken)
+      # Each row has:
+      # StudentID,LastName,FirstName,Lesson1...LessonN,Project1attempt1..attemptN...ProjectNattempt1,...attemptN,Exam1attempt1...attamptN,...ExamNAttempt1...attemptN
+      outputrow = list(student.student)
+
+      # For each lesson, output its percent points (or points):
+      lessonScores = student.lessonPercent if not usePoints else student.lessonEarned
+      for key in sortedLessonTitles:
+         if(lessonScores != None and key in lessonScores):
+            outputrow.append(lessonScores[key])
+         else:
+            outputrow.append(missing)
+
+      # Output the Percent (or Points) field for each project title:
+      if(len(projectInfo['titles']) > 0):
+         for titleNo, (key, index, nAttempts) in enumerate(projectColumns):
+            cells = attemptCells(student.projectScores, index)
+            if(stats != None and cells):
+               attempted['project'][key] += 1
+            if(projectPolicy.perAttempt):
+               for attempt in range(nAttempts):
+                  if(cells != None and attempt < len(cells) and cells[attempt] != None):
+                     outputrow.append(cells[attempt][projectScoreCol])
+                  else:
+                     outputrow.append(missing)
+            else:
+               if(projectBest != None):
+                  highest = projectBest[studentNo % NUMPY_BLOCK][titleNo]
+               else:
+                  highest = reduceAttempts(projectPolicy, cells, projectScoreCol)
+               if(highest != None):
+                  outputrow.append(highest)
+               else:
+                  outputrow.append(missing)
+
+      # Output the PercentPoints (or Points) field for each exam title:
+      if(len(examInfo['titles']) > 0):
+         for titleNo, (key, index, nAttempts) in enumerate(examColumns):
+            cells = attemptCells(student.examScores, index)
+            if(stats != None and cells):
+               attempted['exam'][key] += 1
+            if(examPolicy.perAttempt):
+               for attempt in range(nAttempts):
+                  if(cells != None and attempt < len(cells) and cells[attempt] != None):
+                     outputrow.append(cells[attempt][examScoreCol])
+                  else:
+                     outputrow.append(missing)
+            else:
+               if(examBest != None):
+                  highest = examBest[studentNo % NUMPY_BLOCK][titleNo]
+               else:
+                  highest = reduceAttempts(examPolicy, cells, examScoreCol)
+               if(highest != None):
+                  outputrow.append(highest)
+               else:
+                  outputrow.append(missing)
+
+      if(stats != None):
+         for col in xrange(3, len(outputrow)):
+            if(outputrow[col] is missing):
+               outputrow[col] = missingScoreMark
+            else:
+               columnStats[col].add(outputrow[col])
+
+      yield outputrow
+      if(progress != None and (studentNo + 1) % PROGRESS_INTERVAL == 0):
+         progress('write', studentNo + 1, len(students))
+
+   INSTRUMENTATION.stop(token, len(students), 'students')
+   if(progress != None):
+      progress('write', len(students), len(students))
+
+# Buffer size for output files.
+OUTPUT_BUFFER_SIZE = 1 << 20
+
+# Extensions of the compressed output formats.
+OUTPUT_COMPRESSION = ('.gz', '.zst')
+
+# Returns the name to write combined output to: the name given, with a .csv
+# extension added if it has none (before any compression extension).  A
+# name ending in .xlsx is kept as it is.
+def outputFileName(file):
+   root, ext = os.path.splitext(file)
+   if(not ext in OUTPUT_COMPRESSION):
+      root, ext = file, ''
+   if(isXlsxFile(root)):
+      if(ext != ''):
+         raise ValueError(".xlsx output is already compressed; leave off the " + ext + ".")
+      return root
+   if(root.rfind('.csv') == -1):
+      root = root + '.csv'
+   return root + ext
+
+# Opens an output file for writing (as a context manager), through a large
+# buffer and -- for a name ending in .gz or .zst -- compressing on the fly.
+# The file is always flushed and closed on leaving the with block.  name is
+# the file name recorded in a .gz file's header (default: file's).
+@contextlib.contextmanager
+def openOutput(file, bufferSize=OUTPUT_BUFFER_SIZE, name=None):
+   if(file.endswith('.zst') and zstandard == None):
+      raise ValueError("Writing .zst files needs the zstandard package.")
+   raw = open(file, 'wb', bufferSize)
+   try:
+      if(file.endswith('.gz')):
+         with gzip.GzipFile(os.path.basename((name or file)[:-3]), 'wb', 6, raw) as out:
+            yield out
+      elif(file.endswith('.zst')):
+         with zstandard.ZstdCompressor().stream_writer(raw) as out:
+            yield out
+      else:
+         yield raw
+   finally:
+      raw.close()
+
+# The fixed parts of a one-sheet .xlsx workbook written by writeXlsxFile.
+XLSX_PARTS = [
+   ('[Content_Types].xml',
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+    '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+    '<Default Extension="xml" ContentType="application/xml"/>'
+    '<Override PartName="/xl/workbook.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+    '<Override PartName="/xl/worksheets/sheet1.xml" ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+    '</Types>'),
+   ('_rels/.rels',
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="xl/workbook.xml"/>'
+    '</Relationships>'),
+   ('xl/workbook.xml',
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+    'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+    '<sheets><sheet name="Grades" sheetId="1" r:id="rId1"/></sheets></workbook>'),
+   ('xl/_rels/workbook.xml.rels',
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    '<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+    '<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" Target="worksheets/sheet1.xml"/>'
+    '</Relationships>')]
+
+# Columns of the combined output that are always text (SID and the names);
+# score cells after them that hold numbers are written to .xlsx as numbers.
+XLSX_TEXT_COLUMNS = 3
+
+# Returns the letters of a 0-based column index (0 -> "A", 27 -> "AB").
+def xlsxColumnName(col):
+   name = ''
+   col += 1
+   while(col > 0):
+      col, rem = divmod(col - 1, 26)
+      name = chr(ord('A') + rem) + name
+   return name
+
+# Returns value as the text of a numeric cell, or None if it isn't a
+# (finite) number.
+def xlsxNumberText(value):
+   try:
+      number = float(value)
+   except (TypeError, ValueError):
+      return None
+   if(number != number or number in (float('inf'), float('-inf'))):
+      return None
+   if(isinstance(value, float)):
+      return repr(value)
+   return str(value).strip()
+
+# Returns the <row> element for one row of the combined output.  Cells of
+# the header row are always text.
+def xlsxRow(rowNo, row, columns, header):
+   cells = []
+   for col, value in enumerate(row):
+      if(value == None or value == ''):
+         continue
+      while(col >= len(columns)):
+         columns.append(xlsxColumnName(len(columns)))
+      ref    = columns[col] + rowNo
+      number = None
+      if(not header and col >= XLSX_TEXT_COLUMNS):
+         number = xlsxNumberText(value)
+      if(number != None):
+         cells.append('<c r="' + ref + '"><v>' + number + '</v></c>')
+      else:
+         if(isinstance(value, unicode)):
+            value = value.encode('utf-8')
+         text  = xmlEscape(str(value))
+         space = ' xml:space="preserve"' if text != text.strip() else ''
+         cells.append('<c r="' + ref + '" t="inlineStr"><is><t' + space + '>' + text + '</t></is></c>')
+   return '<row r="' + rowNo + '">' + ''.join(cells) + '</row>'
+
+# Writes rows (an iterable, such as combinedRows gives) to file as a one-sheet
+# .xlsx workbook.  The first row is the header and is written as text; it
+# and the rest of the first frozenRows rows (the "Pts. Possible" row) are
+# frozen, along with the SID and name columns, so they stay in view when
+# scrolling.  Strings are written inline (not to a shared table) and the
+# sheet XML goes to a temporary file a row at a time before being deflated
+# into the workbook, so memory use doesn't grow with the number of students.
+def writeXlsxFile(file, rows, frozenRows=1):
+   fd, sheetFile = tempfile.mkstemp(suffix='.xml', dir=os.path.dirname(os.path.abspath(file)))
+   try:
+      with os.fdopen(fd, 'wb', OUTPUT_BUFFER_SIZE) as sheet:
+         sheet.write('<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+                     '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+                     '<sheetViews><sheetView workbookViewId="0">'
+                     '<pane xSplit="{0}" ySplit="{1}" topLeftCell="{2}{3}" activePane="bottomRight" state="frozen"/>'
+                     '<selection pane="bottomRight"/>'
+                     '</sheetView></sheetViews><sheetData>'.format(XLSX_TEXT_COLUMNS, frozenRows,
+                     xlsxColumnName(XLSX_TEXT_COLUMNS), frozenRows + 1))
+         columns = []
+         for rowNo, row in enumerate(rows):
+            sheet.write(xlsxRow(str(rowNo + 1), row, columns, rowNo == 0))
+         sheet.write('</sheetData></worksheet>')
+      with contextlib.closing(zipfile.ZipFile(file, 'w', zipfile.ZIP_DEFLATED, True)) as workbook:
+         for name, data in XLSX_PARTS:
+            workbook.writestr(name, data)
+         workbook.write(sheetFile, 'xl/worksheets/sheet1.xml')
+   finally:
+      os.remove(sheetFile)
+
+# The temporary file an output file is written to before it is renamed into
+# place: in the same directory (so the rename never crosses file systems)
+# and ending in the same name (so it is written the same way).
+def temporaryOutputName(file):
+   directory, name = os.path.split(os.path.abspath(file))
+   return os.path.join(directory, ".{0}.{1}.{2}".format(os.getpid(), threading.current_thread().ident, name))
+
+# Writes the combined output file (see combinedRows for the options).  A name
+# ending in .gz or .zst gives compressed output, and one ending in .xlsx an
+# Excel workbook with numeric scores and the header (and "Pts. Possible")
+# rows frozen.  Returns False if no file name was given.  The output is
+# written to a temporary file that only replaces file once it is complete,
+# so a cancelled (see GenerationCancelled) or failed write leaves any earlier
+# output as it was.
+def writeCombinedFile(file, lessonInfo, examInfo, projectInfo, takeHighestExam, selectPointsOrCorrect, takeHighestProject, missingScoreMark = "", usePoints=False, useNumpy=True, examPolicy=None, projectPolicy=None, progress=None, stats=None):
+   # If the user doesn't choose an output file, we can't continue.
+   if(file == ''):
+      return False
+   rows = combinedRows(lessonInfo, examInfo, projectInfo, takeHighestExam, selectPointsOrCorrect,
+         takeHighestProject, missingScoreMark, usePoints, useNumpy, examPolicy, projectPolicy, progress, stats)
+   file = outputFileName(file)
+   temp = temporaryOutputName(file)
+   try:
+      if(isXlsxFile(file)):
+         writeXlsxFile(temp, rows, 2 if usePoints else 1)
+      else:
+         with openOutput(temp, name=file) as out:
+            csv.writer(out, quoting=csv.QUOTE_ALL).writerows(rows)
+   except:
+      if(os.path.exists(temp)):
+         os.remove(temp)
+      raise
+   if(sys.platform == 'win32' and os.path.exists(file)):
+      os.remove(file)   # Windows can't rename over a file.
+   os.rename(temp, file)
+   return True
+
+# Score checks.  validateReports looks over every score in the reports in a
+# pass of its own (the writer doesn't check anything), and returns what it
+# finds as a list of dicts with these keys, which are also the columns of a
+# .csv validation report:
+#  report     'lesson', 'project', or 'exam'
+#  check      what is wrong (see below)
+#  studentID, title, attempt  where it is (attempt is '' for lessons)
+#  value      the value in the report
+#  expected   what it should have been, if known
+# The checks are:
+#  blank score      an attempt (or lesson) with no score
+#  bad score        a score, points, or total that isn't a number
+#  points           points more than POINTS_TOLERANCE away from what the
+#                   percent gives (e.g. a score edited by hand)
+#  attempt gap      an attempt number missing before a student's last attempt
+#  possible points  an exam attempt whose TotalPoints differs from most
+#                   attempts at that exam
+VALIDATION_FIELDS  = ('report', 'check', 'studentID', 'title', 'attempt', 'value', 'expected')
+VALIDATION_FORMATS = ('csv', 'json')
+
+# Percents in the reports are rounded, so points within this much (of
+# points, or of tasks for lessons) of what the percent gives are fine.
+POINTS_TOLERANCE = 0.5
+
+def newFinding(report, check, SID, title, attempt, value, expected=''):
+   return {'report': report, 'check': check, 'studentID': SID, 'title': title,
+           'attempt': attempt, 'value': value, 'expected': expected}
+
+# Parses a score field for validateReports; None if it isn't a number.
+def scoreValue(text):
+   try:
+      return float(text)
+   except ValueError:
+      return None
+
+# Yields (SID, title key, attempt, cell) for every attempt in a report's score
+# matrix (see addAttemptScore), adding an "attempt gap" finding for each
+# attempt a student skipped.
+def scoreCells(report, info, findings):
+   keys = dict((index, key) for key, index in info['titleIndex'].iteritems())
+   for SID, row in info['scores'].iteritems():
+      for index, cells in enumerate(row):
+         for attempt, cell in enumerate(cells):
+            if(cell == None):
+               findings.append(newFinding(report, 'attempt gap', SID, info['titles'][keys[index]], attempt + 1, ''))
+            else:
+               yield SID, keys[index], attempt + 1, cell
+
+# Returns (index, expected points) for each score in the parallel lists
+# whose points are more than POINTS_TOLERANCE from percent / 100 * total,
+# computed for all of them at once (with NumPy, if it is installed).
+def pointsMismatches(percents, totals, points):
+   numpy = loadNumpy()
+   if(numpy != None and len(points) > 0):
+      expected = numpy.array(percents) / 100.0 * numpy.array(totals)
+      bad      = numpy.flatnonzero(numpy.abs(expected - numpy.array(points)) > POINTS_TOLERANCE)
+      return [(i, float(expected[i])) for i in bad.tolist()]
+   mismatches = []
+   for i in xrange(len(points)):
+      expected = percents[i] / 100.0 * totals[i]
+      if(abs(expected - points[i]) > POINTS_TOLERANCE):
+         mismatches.append((i, expected))
+   return mismatches
+
+# Checks every score in the reports (see VALIDATION_FIELDS) and returns the
+# findings, sorted by report, title, student, and attempt.  The exam and
+# project reports must have been read without an attempt policy, so that
+# every attempt is still there to check.  selectPointsOrCorrect picks the
+# exam percent column checked, as for combinedRows.
+def validateReports(lessonInfo, examInfo, projectInfo, selectPointsOrCorrect=False):
+   token = INSTRUMENTATION.start('validate')
+   for kind, info in (('exam', examInfo), ('project', projectInfo)):
+      if('policy' in info):
+         raise ValueError("The {0} report was read with an attempt policy; read it without one to validate it.".format(kind))
+   examPctCol = EXAM_PCT_POINTS if selectPointsOrCorrect else EXAM_PCT_CORRECT
+   findings   = []
+   # Scores to check against their percents, gathered from all three
+   # reports and checked together at the end:
+   where    = []   # (report, SID, title, attempt, points text) of each
+   percents = []
+   totals   = []
+   points   = []
+   def addScore(report, SID, title, attempt, percent, total, earned):
+      values = (scoreValue(percent), scoreValue(total), scoreValue(earned))
+      if(None in values):
+         bad = [text for text, value in zip((percent, total, earned), values) if value == None][0]
+         findings.append(newFinding(report, 'bad score', SID, title, attempt, bad))
+      else:
+         where.append((report, SID, title, attempt, earned))
+         percents.append(values[0])
+         totals.append(values[1])
+         points.append(values[2])
+
+   if('percent' in lessonInfo):
+      for SID, percent in lessonInfo['percent'].iteritems():
+         for key, value in percent.iteritems():
+            title = lessonInfo['titles'][key]['title']
+            if(value == ''):
+               findings.append(newFinding('lesson', 'blank score', SID, title, '', value))
+            else:
+               addScore('lesson', SID, title, '', value, lessonInfo['possible'][key], lessonInfo['earned'][SID][key])
+
+   if('scores' in projectInfo):
+      for SID, key, attempt, cell in scoreCells('project', projectInfo, findings):
+         title = projectInfo['titles'][key]
+         if(cell[PROJECT_PERCENT] == ''):
+            findings.append(newFinding('project', 'blank score', SID, title, attempt, ''))
+         else:
+            addScore('project', SID, title, attempt, cell[PROJECT_PERCENT], projectInfo['possible'][key],
+                  cell[PROJECT_POINTS])
+
+   if('scores' in examInfo):
+      attemptTotals = []   # (SID, title key, attempt, TotalPoints) of each attempt
+      totalCounts   = {}   # How many attempts have each TotalPoints, by title key
+      for SID, key, attempt, cell in scoreCells('exam', examInfo, findings):
+         title = examInfo['titles'][key]
+         total = cell[EXAM_TOTAL_POINTS]
+         attemptTotals.append((SID, key, attempt, total))
+         counts = totalCounts.setdefault(key, {})
+         counts[total] = counts.get(total, 0) + 1
+         if(cell[examPctCol] == ''):
+            findings.append(newFinding('exam', 'blank score', SID, title, attempt, ''))
+         else:
+            addScore('exam', SID, title, attempt, cell[examPctCol], total, cell[EXAM_POINTS])
+      usual = dict((key, max(counts, key=lambda total: (counts[total], total)))
+                   for key, counts in totalCounts.iteritems() if len(counts) > 1)
+      for SID, key, attempt, total in attemptTotals:
+         if(key in usual and total != usual[key]):
+            findings.append(newFinding('exam', 'possible points', SID, examInfo['titles'][key], attempt,
+                  total, usual[key]))
+
+   for i, expected in pointsMismatches(percents, totals, points):
+      report, SID, title, attempt, earned = where[i]
+      findings.append(newFinding(report, 'points', SID, title, attempt, earned, formatScore(expected)))
+
+   order = {'lesson': 0, 'project': 1, 'exam': 2}
+   findings.sort(key=lambda f: (order[f['report']], f['title'], f['studentID'], f['attempt'], f['check']))
+   INSTRUMENTATION.stop(token, len(percents), 'scores')
+   return findings
+
+# The name of a file written next to a combined output file: the output's
+# name without its extensions, plus suffix.
+def companionFileName(file, suffix):
+   root, ext = os.path.splitext(outputFileName(file))
+   if(ext in OUTPUT_COMPRESSION):
+      root = os.path.splitext(root)[0]
+   return root + suffix
+
+# The validation report's file name for a combined output file:
+# "grades.csv.gz" gives "grades-validation.csv" (or .json).
+def validationFileName(file, format='csv'):
+   return companionFileName(file, '-validation.' + format)
+
+# Writes validateReports' findings to file: JSON (the findings and a count of
+# each check) for a name ending in .json, otherwise CSV with a header row of
+# VALIDATION_FIELDS.
+def writeValidationReport(file, findings):
+   if(file.lower().endswith('.json')):
+      counts = {}
+      for finding in findings:
+         counts[finding['check']] = counts.get(finding['check'], 0) + 1
+      with open(file, 'w') as out:
+         json.dump({'counts': counts, 'findings': findings}, out, indent=1, sort_keys=True)
+      return
+   with openOutput(file) as out:
+      writer = csv.DictWriter(out, VALIDATION_FIELDS, quoting=csv.QUOTE_ALL)
+      writer.writeheader()
+      writer.writerows(findings)
+
+# The statistics file's name for a combined output file: "grades.xlsx"
+# gives "grades-stats.csv".
+def statisticsFileName(file):
+   return companionFileName(file, '-stats.csv')
+
+STATISTICS_HEADERS = ("Type", "Title", "Column", "Students", "Scored", "Completion (%)", "Mean",
+                      "Std. Dev.", "Median", "Min", "Max", "Attempts", "Students Attempting",
+                      "Attempts per Student")
+
+# Writes the ClassStatistics that combinedRows filled in to a CSV file, one
+# row per score column of the combined output.  Completion is the percent of
+# students with a score in the column; the median is an estimate (see
+# P2Median) for columns with more than P2_EXACT_LIMIT scores.
+def writeStatisticsFile(file, stats):
+   def number(value):
+      return '' if value == None else formatScore(value)
+   with openOutput(file) as out:
+      writer = csv.writer(out, quoting=csv.QUOTE_ALL)
+      writer.writerow(STATISTICS_HEADERS)
+      for column in stats.columns:
+         row = [column.kind.capitalize(), column.title, column.header, stats.students, column.count,
+                number(100.0 * column.count / stats.students if stats.students > 0 else None),
+                number(column.mean if column.count > 0 else None), number(column.stdev()),
+                number(column.median.result()), number(column.low), number(column.high)]
+         if(column.kind in stats.attempts):
+            attempts  = stats.attempts[column.kind].get(column.key, 0)
+            attempted = stats.attempted[column.kind].get(column.key, 0)
+            row.extend([attempts, attempted, number(float(attempts) / attempted if attempted > 0 else None)])
+         else:
+            row.extend(['', '', ''])
+         writer.writerow(row)
@@ -0,0 +1,319 @@
+#
+# simnetreport/gui.py
+#
+# The Tk window for combining one section's reports.  Only this module
+# imports Tk; it is loaded when the GUI is started.
+################################################################################
+
+
+import os.path
+import threading
+import Queue
+import traceback
+
+from Tkinter import *
+import ttk
+import tkMessageBox
+from tkColorChooser import askcolor
+from tkFileDialog   import askopenfilenames, asksaveasfilename
+
+from simnetreport import core
+from simnetreport.core import (ATTEMPT_POLICY_CHOICES, REPORT_FILE_SEPARATOR, ClassStatistics, GenerationCancelled,
+      defaultParseCache, enableInstrumentation, getAttemptPolicy, loadReports, statisticsFileName,
+      validateReports, validationFileName, writeCombinedFile, writeStatisticsFile, writeValidationReport)
+
+# getInputFile will show a "File Open" dialog, returning the filename
+# of the .csv (or .xlsx) file.  Several exports of the same report may be
+# chosen at once; they are returned separated by REPORT_FILE_SEPARATOR, to be
+# merged by loadReports.
+def getInputFile(master, prompt):
+   print 'Please use the "Open" dialog to choose the input file(s).'
+   print "NOTE:  The dialog may appear behind this terminal window."
+   print
+   mask = [('SimNet Reports', ('.csv', '.xlsx')), ('CSV Files', '.csv'), ('Excel Workbooks', '.xlsx')]
+   prompt = "Choose SimNet " + prompt
+   filenames = askopenfilenames(title=prompt, filetypes=mask)
+   # Some versions of Tk return the names as one Tcl list.
+   return REPORT_FILE_SEPARATOR.join(master.tk.splitlist(filenames))
+
+# The names of the files getInputFile chose, to show in the window.
+def inputFileNames(filename):
+   return ", ".join(os.path.basename(name) for name in filename.split(REPORT_FILE_SEPARATOR))
+
+# getOutputFile will show a "File Save" dialog, returning the filename
+# of the .csv (or .xlsx) file.
+def getOutputFile():
+   print 'Please use the "Save As" dialog to choose the output file.'
+   print "NOTE:  The dialog may appear behind this terminal window."
+   print
+   mask = [('CSV Files', '.csv'), ('Excel Workbooks', '.xlsx')]
+   filename = asksaveasfilename(title="Save Output File As", filetypes=mask)
+   return filename
+
+class SNRParser(Frame):
+   def __init__(self, master=None):
+      self.lessonFileName  = ""
+      self.examFileName    = ""
+      self.projectFileName = ""
+      Frame.__init__(self, master)
+      self.grid()
+      self.createWidgets()
+
+   def reInit(self):
+      self.lessonFileName  = ""
+      self.examFileName    = ""
+      self.projectFileName = ""
+      self.examNameBox.delete(0,END)
+      self.lessonNameBox.delete(0,END)
+      self.projectNameBox.delete(0,END)
+      self.goButton.configure(state=DISABLED)
+      self.cancelButton.configure(state=DISABLED)
+      self.progressBar.configure(mode='determinate', value=0)
+      self.statusText.set("")
+
+   def createWidgets(self):
+      instText = "Choose Exam, Lesson, and/or Project reports below\n"
+      instText += "then, click \"Generate!\" to create the output\n"
+      instText += "workbook.  Choose several exports of a report\n"
+      instText += "to merge them.\n"
+
+      self.lessonFileName  = ""
+      self.examFileName    = ""
+      self.projectFileName = ""
+
+      # Attempt policies offered in the menus, by their menu label:
+      self.policies     = dict((getAttemptPolicy(spec).label, spec) for spec in ATTEMPT_POLICY_CHOICES)
+      self.policyLabels = [getAttemptPolicy(spec).label for spec in ATTEMPT_POLICY_CHOICES]
+
+      self.instructions = Label(self, text=instText, justify=LEFT)
+      self.instructions.grid(columnspan=3, row=0)
+
+      self.examNameLabel = Label(self, text="Exam Report:")
+      self.examNameLabel.grid(column=0,row=1,sticky=W)
+      self.examNameBox = Entry(self)
+      self.examNameBox.grid(column=1,row=1)
+      self.getExamNameButton = Button(self, text="Browse", command=self.getExamName)
+      self.getExamNameButton.grid(column=2, row=1)
+
+      self.examPolicyLabel = Label(self, text="Exam attempts:")
+      self.examPolicyLabel.grid(column=0,row=2,sticky=W,padx=25)
+      self.examPolicy = StringVar()
+      self.examPolicy.set(self.policyLabels[0])
+      self.examPolicyMenu = OptionMenu(self, self.examPolicy, *self.policyLabels)
+      self.examPolicyMenu.grid(column=1,row=2,sticky=W, columnspan=2)
+
+      self.usePctPoints = BooleanVar()
+      self.examUsePctPointsCheckbox = Checkbutton(self, text="Use % Points column not % Correct (DANGER).", variable=self.usePctPoints, command=self.warnPctPoints)
+      self.examUsePctPointsCheckbox.grid(column=0,row=3,sticky=W,padx=25, columnspan=3)
+      
+      self.lessonNameLabel = Label(self, text="Lesson Report:")
+      self.lessonNameLabel.grid(column=0,row=4,sticky=W)
+      self.lessonNameBox = Entry(self)
+      self.lessonNameBox.grid(column=1,row=4)
+      self.getLessonNameButton = Button(self, text="Browse", command=self.getLessonName)
+      self.getLessonNameButton.grid(column=2,row=4)
+
+      self.projectNameLabel = Label(self, text="Project Report:")
+      self.projectNameLabel.grid(column=0,row=5,sticky=W)
+      self.projectNameBox = Entry(self)
+      self.projectNameBox.grid(column=1,row=5)
+      self.getProjectNameButton = Button(self, text="Browse", command=self.getProjectName)
+      self.getProjectNameButton.grid(column=2, row=5)
+
+      self.projectPolicyLabel = Label(self, text="Project attempts:")
+      self.projectPolicyLabel.grid(column=0,row=6,sticky=W,padx=25)
+      self.projectPolicy = StringVar()
+      self.projectPolicy.set(self.policyLabels[0])
+      self.projectPolicyMenu = OptionMenu(self, self.projectPolicy, *self.policyLabels)
+      self.projectPolicyMenu.grid(column=1,row=6,sticky=W, columnspan=2)
+
+      self.usePoints = BooleanVar()
+      self.usePointsCheckbox = Checkbutton(self, text="Use points, not percents.", variable=self.usePoints)
+      self.usePointsCheckbox.grid(column=0,row=7,sticky=W, columnspan=3)
+
+      self.missingScoreValueBox = Entry(self, width=10)
+      self.missingScoreValueBox.grid(column=2,row=8, sticky=W)
+      self.missingScoreLabel = Label(self, text="Insert this value for missing scores:")
+      self.missingScoreLabel.grid(column=0,row=8,sticky=W, columnspan=2)
+
+      self.validate = BooleanVar()
+      self.validateCheckbox = Checkbutton(self, text="Check scores and save the problems found with the output.", variable=self.validate)
+      self.validateCheckbox.grid(column=0,row=9,sticky=W, columnspan=3)
+
+      self.writeStats = BooleanVar()
+      self.writeStatsCheckbox = Checkbutton(self, text="Save class statistics for each assignment with the output.", variable=self.writeStats)
+      self.writeStatsCheckbox.grid(column=0,row=10,sticky=W, columnspan=3)
+
+      self.goButton = Button ( self, text="Generate!",command=self.generate, state=DISABLED)
+      self.goButton.grid(columnspan=3, row=11, rowspan=2, sticky=S, pady=15)
+
+      self.progressBar = ttk.Progressbar(self, orient=HORIZONTAL, mode='determinate')
+      self.progressBar.grid(column=0,row=13,sticky=W+E, columnspan=2, padx=5)
+      self.cancelButton = Button(self, text="Cancel", command=self.cancel, state=DISABLED)
+      self.cancelButton.grid(column=2,row=13)
+      self.statusText = StringVar()
+      self.statusLabel = Label(self, textvariable=self.statusText, justify=LEFT)
+      self.statusLabel.grid(column=0,row=14,sticky=W, columnspan=3)
+
+   def warnPctPoints(self):
+      if(self.usePctPoints.get() == True):
+         tkMessageBox.showinfo("Percent Points Warning", "Due to a SimNet bug, using the \"Percent Points\" column may cause manually entered scores not to appear in the final report.")
+
+   def getExamName(self):
+      self.examFileName = getInputFile(self, "Exam Report")
+      if(self.examFileName != ''):
+         self.goButton.configure(state=NORMAL)
+         self.examNameBox.insert(0,inputFileNames(self.examFileName))
+      else:
+         self.examNameBox.delete(0,END)
+      self.examNameBox.update()
+
+   def getLessonName(self):
+      self.lessonFileName = getInputFile(self, "Lesson Report")
+      if(self.lessonFileName != ''):
+         self.goButton.configure(state=NORMAL)
+         self.lessonNameBox.insert(0, inputFileNames(self.lessonFileName))
+      else:
+         self.lessonNameBox.delete(0, END)
+      self.lessonNameBox.update()
+
+   def getProjectName(self):
+      self.projectFileName = getInputFile(self, "Project Report")
+      if(self.projectFileName != ''):
+         self.goButton.configure(state=NORMAL)
+         self.projectNameBox.insert(0, inputFileNames(self.projectFileName))
+      else:
+         self.projectNameBox.delete(0, END)
+      self.projectNameBox.update()
+
+   # Starts generating the output on a worker thread (runGeneration); the
+   # worker reports back through self.progressQueue, which pollProgress
+   # checks from the Tk main loop.  Tk itself is only touched from here.
+   def generate(self):
+      examPolicy     = self.policies[self.examPolicy.get()]
+      projectPolicy  = self.policies[self.projectPolicy.get()]
+      outputFileName = getOutputFile()
+      if(outputFileName == ''):
+         self.finishGeneration('done', False)
+         return
+      options = (examPolicy, projectPolicy, self.usePctPoints.get(),
+                 self.missingScoreValueBox.get(), self.usePoints.get(), self.validate.get(),
+                 self.writeStats.get())
+
+      self.goButton.configure(state=DISABLED)
+      self.cancelButton.configure(state=NORMAL)
+      self.rowsRead = {}
+      self.statusText.set("Reading reports...")
+      self.progressBar.configure(mode='indeterminate')
+      self.progressBar.start(20)
+      self.cancelEvent   = threading.Event()
+      self.progressQueue = Queue.Queue()
+      self.worker = threading.Thread(target=self.runGeneration, args=(outputFileName, options))
+      self.worker.daemon = True
+      self.worker.start()
+      self.after(100, self.pollProgress)
+
+   # Runs on the worker thread: reads the reports and writes the output.
+   def runGeneration(self, outputFileName, options):
+      examPolicy, projectPolicy, usePctPoints, missingScoreMark, usePoints, validate, writeStats = options
+      if(core.INSTRUMENTATION.enabled):
+         enableInstrumentation(core.INSTRUMENTATION.profileDir)   # Fresh numbers for each run.
+      profiler = core.INSTRUMENTATION.startProfile()
+      self.validation = None
+      try:
+         # Validation needs every attempt, so then the policies are only
+         # applied as the output is written.
+         lessonInfo, examInfo, projectInfo = loadReports(self.lessonFileName, self.examFileName,
+               self.projectFileName, examPolicy if not validate else None,
+               projectPolicy if not validate else None, progress=self.reportProgress,
+               cache=defaultParseCache())
+         stats = ClassStatistics() if writeStats else None
+         ok = writeCombinedFile(outputFileName, lessonInfo, examInfo, projectInfo,
+               examPolicy == 'best', usePctPoints, projectPolicy == 'best',
+               missingScoreMark, usePoints,
+               examPolicy=examPolicy, projectPolicy=projectPolicy, progress=self.reportProgress,
+               stats=stats)
+         if(ok and stats != None):
+            writeStatisticsFile(statisticsFileName(outputFileName), stats)
+         if(ok and validate):
+            findings = validateReports(lessonInfo, examInfo, projectInfo, usePctPoints)
+            self.validation = (len(findings), validationFileName(outputFileName))
+            writeValidationReport(self.validation[1], findings)
+         self.progressQueue.put(('done', ok))
+      except GenerationCancelled:
+         self.progressQueue.put(('cancelled', None))
+      except Exception:
+         self.progressQueue.put(('error', traceback.format_exc()))
+      core.INSTRUMENTATION.stopProfile(profiler, 'generate')
+      if(core.INSTRUMENTATION.enabled):
+         core.INSTRUMENTATION.report()
+
+   # Progress callback for the readers and writer (on the worker thread).
+   def reportProgress(self, stage, count, total=None):
+      if(self.cancelEvent.is_set()):
+         raise GenerationCancelled()
+      self.progressQueue.put(('progress', (stage, count, total)))
+
+   # Called from the Tk main loop every 100ms while the worker is running.
+   def pollProgress(self):
+      finished = None
+      try:
+         while(True):
+            event, value = self.progressQueue.get_nowait()
+            if(event == 'progress'):
+               self.showProgress(*value)
+            else:
+               finished = (event, value)
+      except Queue.Empty:
+         pass
+      if(finished == None):
+         self.after(100, self.pollProgress)
+      else:
+         self.progressBar.stop()
+         self.finishGeneration(*finished)
+
+   def showProgress(self, stage, count, total):
+      if(stage == 'write'):
+         if(self.progressBar.cget('mode') != 'determinate'):
+            self.progressBar.stop()
+            self.progressBar.configure(mode='determinate')
+         self.progressBar.configure(maximum=max(total, 1), value=count)
+         self.statusText.set("Writing: {0} of {1} students".format(count, total))
+      else:
+         self.rowsRead[stage] = count
+         self.statusText.set("Read: " + ", ".join("{0} {1} rows".format(self.rowsRead[kind], kind)
+               for kind in ('exam', 'lesson', 'project') if kind in self.rowsRead))
+
+   def cancel(self):
+      self.cancelEvent.set()
+      self.cancelButton.configure(state=DISABLED)
+      self.statusText.set("Cancelling...")
+
+   def finishGeneration(self, event, value):
+      self.cancelButton.configure(state=DISABLED)
+      if(event == 'done' and value):
+         self.msg = Message(self,text="Finished.  Output file generated OK.")
+         if(self.validation != None):
+            self.statusText.set("{0} validation finding(s) saved to {1}".format(self.validation[0],
+                  os.path.basename(self.validation[1])))
+         #self.msg.grid()
+      elif(event == 'done'):
+         self.msg = Message(self,text="No output file specified.  Cannot continue.")
+         #self.msg.grid()
+      elif(event == 'cancelled'):
+         self.statusText.set("Cancelled.  The output file was not written.")
+      else:
+         self.statusText.set("Failed.")
+         tkMessageBox.showerror("Error", "Could not generate the output file:\n\n" + value.strip().splitlines()[-1])
+      if(not tkMessageBox.askyesno("Finished", "Would you like to convert another file set?")):
+         self.destroy()
+         exit(0)
+      else:
+         self.reInit()
+
+# Opens the window and runs the Tk main loop until it is closed.
+def guiMain():
+   app = SNRParser()
+   app.master.title("SimNet Report Parser")
+   app.mainloop()
+   return 0
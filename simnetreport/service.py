@@ -0,0 +1,436 @@
+#
+# simnetreport/service.py
+#
+# A local HTTP service that combines uploaded reports in a pool of worker
+# processes.
+################################################################################
+
+
+import sys
+import os.path
+import time
+import hashlib
+import json
+import shutil
+import tempfile
+import threading
+import argparse
+import multiprocessing
+import signal
+import Queue
+import cgi
+import urlparse
+import BaseHTTPServer
+import SocketServer
+
+from simnetreport.core import (ATTEMPT_POLICY_CHOICES, OUTPUT_BUFFER_SIZE, PARSER_VERSION, REPORT_FILE_SEPARATOR,
+      getAttemptPolicy)
+from simnetreport.batch import processSection
+
+# The upload page served at / by the report service.
+SERVICE_FORM = '''<!DOCTYPE html>
+<html><head><meta charset="utf-8"><title>SimNet Report Parser</title></head>
+<body><h1>SimNet Report Parser</h1>
+<form method="post" action="/jobs" enctype="multipart/form-data">
+<p>Lesson report: <input type="file" name="lesson" accept=".csv,.xlsx" multiple></p>
+<p>Exam report: <input type="file" name="exam" accept=".csv,.xlsx" multiple></p>
+<p>Project report: <input type="file" name="project" accept=".csv,.xlsx" multiple></p>
+<p>Exam attempts: <select name="exam-policy">{policies}</select>
+   Project attempts: <select name="project-policy">{policies}</select></p>
+<p><label><input type="checkbox" name="points" value="1"> Use points, not percents</label></p>
+<p>Missing scores: <input type="text" name="missing" size="4"></p>
+<p>Output: <select name="format"><option>csv</option><option>xlsx</option></select></p>
+<p><input type="submit" value="Combine"></p>
+</form></body></html>
+'''
+
+# How many recent request and job times the service keeps for its metrics.
+SERVICE_LATENCY_SAMPLES = 1000
+
+# Returns {'count', 'mean', 'p50', 'p95', 'max'} (in seconds) for a list of
+# times.
+def latencySummary(times):
+   if(len(times) == 0):
+      return {'count': 0}
+   times = sorted(times)
+   def percentile(p):
+      return round(times[min(int(p * len(times)), len(times) - 1)], 4)
+   return {'count': len(times), 'mean': round(sum(times) / len(times), 4),
+           'p50': percentile(0.5), 'p95': percentile(0.95), 'max': round(times[-1], 4)}
+
+# Tells the service which jobs have started; set in each pool worker by the
+# pool initializer (initServiceWorker).
+startedJobs = None
+
+def initServiceWorker(queue):
+   global startedJobs
+   startedJobs = queue
+
+# The pool task for one service job: reports that it has started (and on
+# which worker), then runs it with processSection.
+def runServiceJob(job):
+   if(startedJobs != None):
+      startedJobs.put((job['section'], os.getpid()))
+   return processSection(job)
+
+# The state behind the report service: the jobs it knows about, the pool
+# that runs them, and its metrics.  Uploaded reports are kept in workDir
+# under the SHA-1 of their contents, and a job's id is the hash of its
+# reports and options, so submitting the same reports with the same options
+# again gives back the existing job (and its output) instead of a new one.
+# Jobs are run with processSection on a pool of workers processes, so the
+# threads serving requests never parse anything themselves.  A job is
+# 'queued' until a worker starts it, then 'running', then 'done' or
+# 'failed'.  A monitor thread follows the jobs: it marks them running as
+# workers report in, and finished as their results arrive -- failed if the
+# pool call itself failed (say, the job couldn't be sent to a worker) or the
+# worker running it died.
+class ReportService(object):
+   def __init__(self, workDir, workers=None, useCache=True, cacheDir=None):
+      self.workDir  = workDir
+      self.useCache = useCache
+      self.cacheDir = cacheDir
+      for directory in ('uploads', 'jobs'):
+         if(not os.path.isdir(os.path.join(workDir, directory))):
+            os.makedirs(os.path.join(workDir, directory))
+      self.startedJobs = multiprocessing.Queue()
+      self.pool     = multiprocessing.Pool(workers or multiprocessing.cpu_count(), initServiceWorker, (self.startedJobs,))
+      self.lock     = threading.Lock()
+      self.jobs     = {}   # {id: job status dict}
+      self.done     = {}   # {id: threading.Event set when the job finishes}
+      self.results  = {}   # {id: AsyncResult} for the jobs not yet finished
+      self.workerPids = {}   # {id: pid of the worker running the job}
+      self.stopping = threading.Event()
+      self.started = time.time()
+      self.counts   = {'submitted': 0, 'deduplicated': 0, 'completed': 0, 'failed': 0}
+      self.requests = {}   # {route: [recent request times]}
+      self.jobTimes = []
+      self.monitor  = threading.Thread(target=self.monitorJobs, name='job monitor')
+      self.monitor.daemon = True
+      self.monitor.start()
+
+   # Copies an uploaded file into the uploads directory under the hash of its
+   # contents.  Returns the stored path.
+   def saveUpload(self, upload, ext):
+      digest = hashlib.sha1()
+      fd, temp = tempfile.mkstemp(dir=os.path.join(self.workDir, 'uploads'))
+      with os.fdopen(fd, 'wb') as f:
+         for block in iter(lambda: upload.read(1 << 20), ''):
+            digest.update(block)
+            f.write(block)
+      path = os.path.join(self.workDir, 'uploads', digest.hexdigest() + ext)
+      os.rename(temp, path)
+      return path
+
+   # Submits a job for the given reports ({slot: list of stored paths, merged
+   # by loadReports}) and options.  Returns (job status, True if it is a new
+   # job).
+   def submit(self, reports, options):
+      key = hashlib.sha1(repr((sorted((slot, [os.path.basename(path) for path in paths]) for slot, paths in reports.items()),
+                               sorted(options.items())))).hexdigest()[:20]
+      with self.lock:
+         status = self.jobs.get(key)
+         if(status != None and status['status'] != 'failed'):
+            self.counts['deduplicated'] += 1
+            return dict(status), False
+         output = os.path.join(self.workDir, 'jobs', key + ('.xlsx' if options['format'] == 'xlsx' else '.csv'))
+         job    = {'section': key, 'output': output, 'useCache': self.useCache, 'cacheDir': self.cacheDir}
+         for slot in ('lesson', 'exam', 'project'):
+            job[slot] = REPORT_FILE_SEPARATOR.join(reports.get(slot, []))
+         job.update((name, options[name]) for name in
+                    ('examPolicy', 'projectPolicy', 'usePctPoints', 'missingScoreMark', 'usePoints'))
+         status = {'id': key, 'status': 'queued', 'submitted': time.time(), 'error': None,
+                   'reports': sorted(reports), 'format': options['format']}
+         self.jobs[key] = status
+         self.done[key] = threading.Event()
+         self.counts['submitted'] += 1
+         self.results[key] = self.pool.apply_async(runServiceJob, (job,))
+      return dict(status), True
+
+   # Follows the submitted jobs (on the monitor thread) until close().
+   def monitorJobs(self):
+      while(not self.stopping.is_set()):
+         try:
+            key, pid = self.startedJobs.get(timeout=0.1)
+         except Queue.Empty:
+            pass
+         else:
+            with self.lock:
+               if(key in self.results and self.jobs[key]['status'] == 'queued'):
+                  self.jobs[key]['status'] = 'running'
+                  self.workerPids[key] = pid
+         self.collectJobs()
+
+   # Finishes the jobs whose results have arrived, and fails the running
+   # jobs whose worker has died (the pool starts a new worker, but the job
+   # is lost).
+   def collectJobs(self):
+      with self.lock:
+         results = self.results.items()
+         running = dict(self.workerPids)
+      alive = None
+      for key, result in results:
+         if(result.ready()):
+            if(result.successful()):
+               self.finished(result.get())
+            else:
+               try:
+                  result.get()
+               except Exception as e:
+                  self.failed(key, "{0}: {1}".format(type(e).__name__, e))
+         elif(key in running):
+            if(alive == None):
+               alive = set(process.pid for process in multiprocessing.active_children())
+            if(not running[key] in alive):
+               self.failed(key, "The worker process running the job exited.")
+
+   # Called when a job finishes, with processSection's result.
+   def finished(self, result):
+      if(result['error'] == None):
+         self.finish(result['section'], 'done', None, result['elapsed'])
+      else:
+         self.finish(result['section'], 'failed', result['error'].strip().splitlines()[-1], result['elapsed'])
+
+   # Called when a job could not be run at all.
+   def failed(self, key, error):
+      self.finish(key, 'failed', error)
+
+   def finish(self, key, outcome, error, elapsed=None):
+      with self.lock:
+         if(self.results.pop(key, None) == None):
+            return   # Already finished.
+         self.workerPids.pop(key, None)
+         status = self.jobs[key]
+         status['status'] = outcome
+         status['error']  = error
+         if(elapsed != None):
+            status['elapsed'] = round(elapsed, 4)
+         self.counts['completed' if outcome == 'done' else 'failed'] += 1
+         self.jobTimes.append(time.time() - status['submitted'])
+         del self.jobTimes[:-SERVICE_LATENCY_SAMPLES]
+         self.done[key].set()
+
+   # Returns a copy of a job's status dict, or None for an unknown job.  If
+   # wait is given, first waits up to that many seconds for it to finish.
+   def status(self, key, wait=None):
+      with self.lock:
+         done = self.done.get(key)
+      if(done == None):
+         return None
+      if(wait != None):
+         done.wait(wait)
+      with self.lock:
+         return dict(self.jobs[key])
+
+   def outputFile(self, key):
+      return os.path.join(self.workDir, 'jobs', key + ('.xlsx' if self.jobs[key]['format'] == 'xlsx' else '.csv'))
+
+   def recordRequest(self, route, seconds):
+      with self.lock:
+         times = self.requests.setdefault(route, [])
+         times.append(seconds)
+         del times[:-SERVICE_LATENCY_SAMPLES]
+
+   def metrics(self):
+      with self.lock:
+         statuses = [job['status'] for job in self.jobs.values()]
+         return {'uptime': round(time.time() - self.started, 1),
+                 'queueDepth': statuses.count('queued'),
+                 'jobs': dict((name, statuses.count(name)) for name in ('queued', 'running', 'done', 'failed')),
+                 'counts': dict(self.counts),
+                 'jobLatency': latencySummary(self.jobTimes),
+                 'requestLatency': dict((route, latencySummary(times)) for route, times in self.requests.items())}
+
+   def close(self):
+      self.pool.close()
+      self.pool.join()
+      self.stopping.set()
+      self.monitor.join()
+      self.collectJobs()
+
+# Handles the report service's HTTP API:
+#  GET  /                      upload form
+#  POST /jobs                  multipart upload (fields lesson, exam, project,
+#                              each of which may be repeated to merge several
+#                              exports, and optionally exam-policy, project-policy,
+#                              points, pct-points, missing, format); answers
+#                              303 See Other to the job's output, with the
+#                              job status as JSON
+#  GET  /jobs/ID               job status (JSON)
+#  GET  /jobs/ID/output        the combined output, once the job is done
+#                              (waits up to ?wait=SECONDS, default 60)
+#  GET  /metrics               queue depth (jobs not yet started), job counts
+#                              by status, and latencies (JSON)
+class ReportRequestHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+   server_version = "SimNetReportParser/" + str(PARSER_VERSION)
+
+   def sendJSON(self, code, value, headers=()):
+      body = json.dumps(value, indent=2, sort_keys=True) + "\n"
+      self.send_response(code)
+      self.send_header('Content-Type', 'application/json')
+      self.send_header('Content-Length', str(len(body)))
+      for name, header in headers:
+         self.send_header(name, header)
+      self.end_headers()
+      self.wfile.write(body)
+
+   def sendError(self, code, message):
+      self.sendJSON(code, {'error': message})
+
+   def timed(self, route, handler, *args):
+      start = time.time()
+      try:
+         handler(*args)
+      finally:
+         self.server.service.recordRequest(route, time.time() - start)
+
+   def do_GET(self):
+      url   = urlparse.urlparse(self.path)
+      parts = [part for part in url.path.split('/') if part != '']
+      query = urlparse.parse_qs(url.query)
+      if(len(parts) == 0):
+         self.timed('form', self.getForm)
+      elif(parts == ['metrics']):
+         self.timed('metrics', self.sendJSON, 200, self.server.service.metrics())
+      elif(len(parts) == 2 and parts[0] == 'jobs'):
+         self.timed('status', self.getStatus, parts[1])
+      elif(len(parts) == 3 and parts[0] == 'jobs' and parts[2] == 'output'):
+         self.timed('output', self.getOutput, parts[1], query)
+      else:
+         self.sendError(404, "Not found.")
+
+   def do_POST(self):
+      if(urlparse.urlparse(self.path).path.rstrip('/') == '/jobs'):
+         self.timed('submit', self.postJob)
+      else:
+         self.sendError(404, "Not found.")
+
+   def getForm(self):
+      options = ''.join('<option>{0}</option>'.format(choice) for choice in ATTEMPT_POLICY_CHOICES)
+      body    = SERVICE_FORM.format(policies=options)
+      self.send_response(200)
+      self.send_header('Content-Type', 'text/html; charset=utf-8')
+      self.send_header('Content-Length', str(len(body)))
+      self.end_headers()
+      self.wfile.write(body)
+
+   def getStatus(self, key):
+      status = self.server.service.status(key)
+      if(status == None):
+         self.sendError(404, "No such job.")
+      else:
+         self.sendJSON(200, status)
+
+   def getOutput(self, key, query):
+      try:
+         wait = float(query.get('wait', ['60'])[0])
+      except ValueError:
+         return self.sendError(400, "wait must be a number of seconds.")
+      status = self.server.service.status(key, wait)
+      if(status == None):
+         return self.sendError(404, "No such job.")
+      if(status['status'] in ('queued', 'running')):
+         return self.sendJSON(202, status)
+      if(status['status'] == 'failed'):
+         return self.sendJSON(500, status)
+      file = self.server.service.outputFile(key)
+      if(status['format'] == 'xlsx'):
+         contentType = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+      else:
+         contentType = 'text/csv'
+      try:
+         f = open(file, 'rb')
+      except IOError:
+         # Done, but the output has since been removed from the work directory.
+         return self.sendJSON(410, dict(status, error="The job's output is no longer available; submit it again."))
+      with f:
+         self.send_response(200)
+         self.send_header('Content-Type', contentType)
+         self.send_header('Content-Length', str(os.fstat(f.fileno()).st_size))
+         self.send_header('Content-Disposition', 'attachment; filename="combined{0}"'.format(os.path.splitext(file)[1]))
+         self.end_headers()
+         shutil.copyfileobj(f, self.wfile, OUTPUT_BUFFER_SIZE)
+
+   def postJob(self):
+      form = cgi.FieldStorage(fp=self.rfile, headers=self.headers,
+                              environ={'REQUEST_METHOD': 'POST', 'CONTENT_TYPE': self.headers.getheader('Content-Type', '')})
+      def field(name, default=''):
+         return form.getfirst(name, default).strip()
+      try:
+         options = {'examPolicy':       getAttemptPolicy(field('exam-policy', 'all')).spec,
+                    'projectPolicy':    getAttemptPolicy(field('project-policy', 'all')).spec,
+                    'usePoints':        field('points') in ('1', 'true', 'on'),
+                    'usePctPoints':     field('pct-points') in ('1', 'true', 'on'),
+                    'missingScoreMark': field('missing'),
+                    'format':           field('format', 'csv').lower()}
+      except ValueError as e:
+         return self.sendError(400, str(e))
+      if(not options['format'] in ('csv', 'xlsx')):
+         return self.sendError(400, "format must be csv or xlsx.")
+      reports = {}
+      for slot in ('lesson', 'exam', 'project'):
+         uploads = form[slot] if slot in form else []
+         if(not isinstance(uploads, list)):
+            uploads = [uploads]
+         for upload in uploads:
+            if(not upload.filename):
+               continue
+            ext = os.path.splitext(upload.filename)[1].lower()
+            if(not ext in ('.csv', '.xlsx')):
+               return self.sendError(400, "The {0} report must be a .csv or .xlsx file.".format(slot))
+            reports.setdefault(slot, []).append(self.server.service.saveUpload(upload.file, ext))
+      if(len(reports) == 0):
+         return self.sendError(400, "Upload at least one of lesson, exam, and project.")
+      status, new = self.server.service.submit(reports, options)
+      self.sendJSON(303, status, [('Location', '/jobs/{0}/output'.format(status['id']))])
+
+   # Clients such as curl send larger uploads only after "100 Continue".
+   def parse_request(self):
+      if(not BaseHTTPServer.BaseHTTPRequestHandler.parse_request(self)):
+         return False
+      if(self.headers.get('Expect', '').lower() == '100-continue' and self.request_version != 'HTTP/1.0'):
+         self.wfile.write("HTTP/1.1 100 Continue\r\n\r\n")
+      return True
+
+   # Requests are logged to stderr only with --verbose.
+   def log_message(self, format, *args):
+      if(self.server.verbose):
+         BaseHTTPServer.BaseHTTPRequestHandler.log_message(self, format, *args)
+
+# An HTTP server that serves each request on its own thread.
+class ReportServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+   daemon_threads = True
+
+   def __init__(self, address, service, verbose=False):
+      BaseHTTPServer.HTTPServer.__init__(self, address, ReportRequestHandler)
+      self.service = service
+      self.verbose = verbose
+
+# Entry point for:  SimNetReportParser.py serve [options]
+def serveMain(argv):
+   parser = argparse.ArgumentParser(prog="SimNetReportParser.py serve",
+         description="Serve the report parser over HTTP: upload reports, then download the combined output.")
+   parser.add_argument("--host", default='127.0.0.1', help="address to listen on (default: %(default)s, this machine only)")
+   parser.add_argument("-p", "--port", type=int, default=8250, help="port to listen on (default: %(default)s)")
+   parser.add_argument("-j", "--workers", type=int, default=None, help="worker processes for parsing (default: one per core)")
+   parser.add_argument("--work-dir", default=None, help="where to keep uploads and outputs (default: a new temporary directory)")
+   parser.add_argument("--no-cache", action="store_true", help="always parse reports; don't use the parse cache")
+   parser.add_argument("--cache-dir", default=None, help="parse cache directory (default: $SNR_CACHE_DIR or ~/.simnet-report-parser/cache)")
+   parser.add_argument("-v", "--verbose", action="store_true", help="log every request")
+   args = parser.parse_args(argv)
+
+   workDir = args.work_dir or tempfile.mkdtemp(prefix='snrserve')
+   service = ReportService(workDir, args.workers, not args.no_cache and not os.environ.get('SNR_NO_CACHE'),
+                           args.cache_dir)
+   server  = ReportServer((args.host, args.port), service, args.verbose)
+   print("Serving on http://{0}:{1}/ (work directory {2}).  Press Ctrl-C to stop.".format(args.host,
+         server.server_address[1], workDir))
+   signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+   try:
+      server.serve_forever()
+   except KeyboardInterrupt:
+      pass
+   finally:
+      server.server_close()
+      service.close()
+   return 0
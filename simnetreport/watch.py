@@ -0,0 +1,353 @@
+#
+# simnetreport/watch.py
+#
+# Watch mode: regenerates a section's combined output whenever its reports
+# in a watched directory change.
+################################################################################
+
+
+import sys
+import os.path
+import re
+import time
+import argparse
+import multiprocessing
+import select
+import signal
+import struct
+import ctypes
+import ctypes.util
+
+from simnetreport.core import REPORT_FILE_SEPARATOR
+from simnetreport.batch import addOutputArguments, outputPolicies, processSection
+
+
+# Report files in a watched directory belong to a section by name: the kind
+# of report (lesson, exam, or project) is a word of the file name and the
+# section is the part of the name before it, e.g. "ENG101-01 Exam.xlsx" or
+# "ENG101-01_lessons.csv".  A file named just "exam.csv" (and so on) belongs
+# to the section named after its directory.  Subdirectories are part of the
+# section name ("fall/ENG101_exam.csv" is section "fall-ENG101").
+WATCH_REPORT_NAME = re.compile(r'^(?P<section>.*?)[\s_.-]*(?<![a-z])(?P<kind>lesson|exam|project)s?(?![a-z]).*\.(csv|xlsx)$',
+                               re.IGNORECASE)
+
+# Returns (section, kind) for a report file (given relative to the watched
+# directory), or None if it doesn't look like a report.  Hidden files and
+# Excel's "~$" lock files are ignored.
+def watchedReport(relPath):
+   directory, name = os.path.split(relPath)
+   if(name.startswith('.') or name.startswith('~$')):
+      return None
+   match = WATCH_REPORT_NAME.match(name)
+   if(match == None):
+      return None
+   parts = [part for part in directory.split(os.sep) if part != '']
+   if(match.group('section') != ''):
+      parts.append(match.group('section'))
+   if(len(parts) == 0):
+      return None
+   return '-'.join(parts), match.group('kind').lower()
+
+# Returns {path: (mtime, size)} for every report file under root, skipping
+# the directories in exclude (such as the output directory).  The
+# directories scanned are added to the list directories, if given.
+def scanReportTree(root, exclude=(), directories=None):
+   exclude  = set(os.path.abspath(path) for path in exclude)
+   snapshot = {}
+   for directory, subdirs, files in os.walk(root):
+      if(directories != None):
+         directories.append(directory)
+      subdirs[:] = [d for d in subdirs if not d.startswith('.')
+                    and not os.path.abspath(os.path.join(directory, d)) in exclude]
+      for name in files:
+         path = os.path.join(directory, name)
+         if(watchedReport(os.path.relpath(path, root)) == None):
+            continue
+         try:
+            info = os.stat(path)
+         except OSError:
+            continue   # Removed while we were looking.
+         snapshot[path] = (info.st_mtime, info.st_size)
+   return snapshot
+
+# Waits for changes to a directory tree by checking it every interval
+# seconds.  wait() returns True if the tree should be scanned again.
+class PollingWatcher(object):
+   def __init__(self, interval=2.0):
+      self.interval = interval
+      self.lastScan = time.time()
+
+   # Nothing to set up: every scan covers the whole tree.
+   def watch(self, directories):
+      pass
+
+   def wait(self, timeout):
+      delay = self.lastScan + self.interval - time.time()
+      if(delay > timeout):
+         time.sleep(max(timeout, 0))
+         return False
+      time.sleep(max(delay, 0))
+      self.lastScan = time.time()
+      return True
+
+   def close(self):
+      pass
+
+# Waits for changes to a directory tree with Linux inotify (through ctypes,
+# so no extra package is needed).  Each directory of the tree is watched;
+# wait() returns True once something in one of them changed, so the tree is
+# only scanned after a change.  Raises OSError (or AttributeError, without
+# inotify in the C library) if inotify can't be used.
+class InotifyWatcher(object):
+   IN_CLOSE_WRITE = 0x00000008
+   IN_MOVED_FROM  = 0x00000040
+   IN_MOVED_TO    = 0x00000080
+   IN_CREATE      = 0x00000100
+   IN_DELETE      = 0x00000200
+   IN_IGNORED     = 0x00008000
+   MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+   def __init__(self):
+      self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+      self.fd   = self.libc.inotify_init()
+      if(self.fd < 0):
+         raise OSError(ctypes.get_errno(), "inotify_init failed")
+      self.watches = {}   # Watch descriptor by directory, and the reverse.
+      self.paths   = {}
+
+   def watch(self, directories):
+      for directory in directories:
+         if(directory in self.watches):
+            continue
+         wd = self.libc.inotify_add_watch(self.fd, directory, self.MASK)
+         if(wd >= 0):
+            self.watches[directory] = wd
+            self.paths[wd] = directory
+
+   def wait(self, timeout):
+      try:
+         readable = select.select([self.fd], [], [], max(timeout, 0))[0]
+      except select.error:
+         return False   # Interrupted by a signal.
+      if(len(readable) == 0):
+         return False
+      events = os.read(self.fd, 65536)
+      offset = 0
+      while(offset < len(events)):
+         wd, mask, cookie, length = struct.unpack_from('iIII', events, offset)
+         offset += struct.calcsize('iIII') + length
+         if(mask & self.IN_IGNORED and wd in self.paths):
+            # The directory is gone; watch it again if it comes back.
+            del self.watches[self.paths.pop(wd)]
+      return True
+
+   def close(self):
+      os.close(self.fd)
+
+# Returns an InotifyWatcher where inotify is available (unless poll is True),
+# and a PollingWatcher otherwise.
+def newWatcher(interval=2.0, poll=False):
+   if(not poll):
+      try:
+         return InotifyWatcher()
+      except (OSError, AttributeError, TypeError):
+         pass
+   return PollingWatcher(interval)
+
+# Keeps the combined output of every section in a watched directory up to
+# date.  Each change to a section's reports restarts that section's debounce
+# delay; once its reports have been left alone for debounce seconds, the
+# section is regenerated (with processSection) on a pool of at most workers
+# processes.  A section is never regenerated twice at once, and changes that
+# arrive while it is running are picked up by another run afterwards.  A
+# section with several reports of one kind (say, an exam export per month)
+# merges them all, oldest first, so the newest export wins where they
+# disagree (see loadReports).  options holds the job settings that batchMain
+# would give each section.
+class SectionWatcher(object):
+   def __init__(self, root, outputDir, options, workers=None, debounce=5.0, outputExt='.csv', out=sys.stdout):
+      self.root      = os.path.abspath(root)
+      self.outputDir = os.path.abspath(outputDir)
+      self.options   = options
+      self.workers   = max(workers or multiprocessing.cpu_count(), 1)
+      self.debounce  = debounce
+      self.outputExt = outputExt
+      self.out       = out
+      self.snapshot  = None
+      self.directories = []
+      self.sections  = {}   # {section: {kind: [report paths, oldest first]}}
+      self.pending   = {}   # {section: time of the last change}
+      self.running   = {}   # {section: AsyncResult}
+      self.results   = []
+
+   # Scans the tree and marks the sections whose reports changed.  On the
+   # first scan, the sections whose output is missing or older than one of
+   # their reports are marked.
+   def scan(self, now=None):
+      now      = now or time.time()
+      first    = self.snapshot == None
+      previous = self.snapshot or {}
+      self.directories = []
+      snapshot = scanReportTree(self.root, [self.outputDir], self.directories)
+      changed  = set(path for path in set(snapshot) | set(previous)
+                     if snapshot.get(path) != previous.get(path))
+      self.snapshot = snapshot
+      sections = {}
+      for path in sorted(snapshot, key=lambda path: snapshot[path][0]):
+         section, kind = watchedReport(os.path.relpath(path, self.root))
+         sections.setdefault(section, {}).setdefault(kind, []).append(path)
+      for path in changed:
+         section = watchedReport(os.path.relpath(path, self.root))[0]
+         if(first and section in sections and not self.isStale(section, sections[section])):
+            continue
+         self.pending[section] = now
+      self.sections = sections
+
+   def outputFile(self, section):
+      return os.path.join(self.outputDir, section + self.outputExt)
+
+   def isStale(self, section, reports):
+      try:
+         written = os.stat(self.outputFile(section)).st_mtime
+      except OSError:
+         return True
+      return any(self.snapshot[path][0] > written for paths in reports.values() for path in paths)
+
+   # The batch job for a section, as readBatchManifest and batchMain make it.
+   def job(self, section):
+      reports = self.sections[section]
+      job     = {'section': section, 'output': self.outputFile(section)}
+      for kind in ('lesson', 'exam', 'project'):
+         job[kind] = REPORT_FILE_SEPARATOR.join(reports.get(kind, []))
+      job.update(self.options)
+      return job
+
+   # Starts the sections whose debounce delay is over, while there are free
+   # workers.  Returns the time until the next pending section is due (or
+   # None if none are waiting).
+   def dispatch(self, pool, now=None):
+      now  = now or time.time()
+      wait = None
+      for section, changed in sorted(self.pending.items(), key=lambda item: item[1]):
+         due = changed + self.debounce
+         if(section in self.running):
+            continue
+         if(not section in self.sections):
+            del self.pending[section]   # Every report of the section was removed.
+            continue
+         if(due > now or len(self.running) >= self.workers):
+            if(due > now):
+               wait = min(wait, due - now) if wait != None else due - now
+            continue
+         del self.pending[section]
+         self.running[section] = pool.apply_async(processSection, (self.job(section),))
+      return wait
+
+   # Reports the sections that have finished.
+   def collect(self):
+      for section, result in self.running.items():
+         if(not result.ready()):
+            continue
+         del self.running[section]
+         result = result.get()
+         self.results.append(result)
+         if(result['error'] == None):
+            status = "ok"
+            if(result.get('findings')):
+               status += " ({0} validation finding(s))".format(result['findings'])
+         else:
+            status = "FAILED: " + result['error'].strip().splitlines()[-1]
+         self.out.write("{0} {1:<24} {2:>8.2f}s  {3}\n".format(time.strftime('%H:%M:%S'),
+               section, result['elapsed'], status))
+         self.out.flush()
+
+   def busy(self):
+      return len(self.pending) > 0 or len(self.running) > 0
+
+# Watches root and regenerates sections as their reports change, until
+# interrupted (or, with once, until every stale section has been
+# regenerated).  On SIGTERM, sections already running are finished before
+# returning.  Returns the list of results.
+def runWatch(sectionWatcher, watcher, interval=2.0, once=False):
+   if(not os.path.isdir(sectionWatcher.outputDir)):
+      os.makedirs(sectionWatcher.outputDir)
+   pool = multiprocessing.Pool(processes=sectionWatcher.workers)
+   # Set after the pool starts, so its workers keep the default handler.
+   stopping = []
+   previous = signal.signal(signal.SIGTERM, lambda signum, frame: stopping.append(signum))
+   try:
+      rescan = True
+      while(len(stopping) == 0):
+         if(rescan):
+            sectionWatcher.scan()
+            watcher.watch(sectionWatcher.directories)
+         sectionWatcher.collect()
+         due = sectionWatcher.dispatch(pool)
+         if(once and not sectionWatcher.busy()):
+            break
+         # Wake up for the next debounced section, finished work, or a change.
+         timeout = interval
+         if(due != None):
+            timeout = min(timeout, due)
+         if(len(sectionWatcher.running) > 0):
+            timeout = min(timeout, 0.5)
+         rescan = watcher.wait(timeout) and not once
+      pool.close()
+      pool.join()
+      sectionWatcher.collect()
+   except:
+      pool.terminate()
+      raise
+   finally:
+      pool.join()
+      watcher.close()
+      signal.signal(signal.SIGTERM, previous)
+   return sectionWatcher.results
+
+# Entry point for:  SimNetReportParser.py watch directory [options]
+def watchMain(argv):
+   parser = argparse.ArgumentParser(prog="SimNetReportParser.py watch",
+         description="Watch a directory of SimNet reports and keep each section's combined output up to date.")
+   parser.add_argument("directory", help="directory (tree) that SimNet exports are saved to")
+   parser.add_argument("-o", "--output-dir", default=None, help="where to write combined outputs (default: DIRECTORY/combined)")
+   parser.add_argument("--output-ext", default='.csv', help="output file extension, e.g. .xlsx or .csv.gz (default: %(default)s)")
+   parser.add_argument("-j", "--workers", type=int, default=None, help="most sections regenerated at once (default: one per core)")
+   parser.add_argument("--debounce", type=float, default=5.0, help="seconds a section's reports must be left alone before it is regenerated (default: %(default)s)")
+   parser.add_argument("--interval", type=float, default=2.0, help="seconds between scans when polling (default: %(default)s)")
+   parser.add_argument("--poll", action="store_true", help="poll the directory even if inotify is available")
+   parser.add_argument("--once", action="store_true", help="regenerate out-of-date sections and exit")
+   addOutputArguments(parser)
+   parser.add_argument("--no-cache", action="store_true", help="always parse reports; don't use the parse cache")
+   parser.add_argument("--cache-dir", default=None, help="parse cache directory (default: $SNR_CACHE_DIR or ~/.simnet-report-parser/cache)")
+   parser.add_argument("--state-dir", default=None, help="keep incremental exam state here and only parse new rows of grown exam exports")
+   parser.add_argument("--store", default=None, help="also import every regenerated section's reports into this gradebook database")
+   args = parser.parse_args(argv)
+
+   if(not os.path.isdir(args.directory)):
+      parser.error("no such directory: " + args.directory)
+   if(args.state_dir != None and not os.path.isdir(args.state_dir)):
+      os.makedirs(args.state_dir)
+   examPolicy, projectPolicy = outputPolicies(parser, args)
+   options = {'examPolicy':       examPolicy,
+              'usePctPoints':     args.pct_points,
+              'projectPolicy':    projectPolicy,
+              'missingScoreMark': args.missing,
+              'useCache':         not args.no_cache and not os.environ.get('SNR_NO_CACHE'),
+              'cacheDir':         args.cache_dir,
+              'stateDir':         args.state_dir,
+              'usePoints':        args.points,
+              'store':            args.store,
+              'validate':         args.validation_format if args.validate else None,
+              'stats':            args.stats}
+   outputDir = args.output_dir or os.path.join(args.directory, 'combined')
+   sections  = SectionWatcher(args.directory, outputDir, options, args.workers,
+                              0 if args.once else args.debounce, args.output_ext)
+   watcher   = newWatcher(args.interval, args.poll or args.once)
+   if(not args.once):
+      print("Watching {0} ({1}); combined outputs go to {2}.  Press Ctrl-C to stop.".format(args.directory,
+            "inotify" if isinstance(watcher, InotifyWatcher) else "polling", outputDir))
+   try:
+      results = runWatch(sections, watcher, args.interval, args.once)
+   except KeyboardInterrupt:
+      return 0
+   return 1 if any(result['error'] != None for result in results) else 0
@@ -0,0 +1,140 @@
+#
+# tests/reportFixtures.py
+#
+# Small SimNet reports for the tests, written in the standard layouts (see
+# REPORT_LAYOUTS), and a test case base class that gives each test its own
+# scratch directory.
+################################################################################
+
+
+import os
+import re
+import csv
+import datetime
+import shutil
+import tempfile
+import unittest
+import zipfile
+from xml.sax.saxutils import escape
+
+from simnetreport import REPORT_LAYOUTS, combinedRows
+
+# One row of an exam report.  points defaults to percent (out of 100).
+def examRow(SID, title, attempt, percent, date='9/1/2016', points=None, total='100', questions='10'):
+   if(points == None):
+      points = percent
+   return [SID, 'Last' + SID, 'First' + SID, title, str(attempt), '12', date,
+           date + ' 9:00', '0.00:12:00', date + ' 9:12', '', questions, str(percent), str(points),
+           total, str(percent), 'Completed']
+
+# One row of a project report.  points defaults to percent (out of 100).
+def projectRow(SID, title, attempt, percent, date='9/1/2016', points=None, total='100'):
+   if(points == None):
+      points = percent
+   return [SID, 'Last' + SID, 'First' + SID, title, str(attempt), '30', date,
+           str(points), total, str(percent), 'Completed']
+
+# One row of a lesson report.
+def lessonRow(SID, title, percent, complete='5', tasks='5', date='9/1/2016'):
+   return [SID, 'Last' + SID, 'First' + SID, title, '20', date, date, complete, tasks, str(percent)]
+
+# Writes a report of the given kind (with the standard header row) to path.
+def writeReport(path, kind, rows, header=None, delimiter=','):
+   with open(path, 'wb') as f:
+      writer = csv.writer(f, delimiter=delimiter)
+      writer.writerow(header or REPORT_LAYOUTS[kind])
+      writer.writerows(rows)
+   return path
+
+# The cell styles of writeXlsxReport's workbooks: General, a date (built-in
+# format 14), and a date and time (a custom format, as Excel writes it).
+XLSX_STYLES = ('<?xml version="1.0"?><styleSheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main">'
+               '<numFmts count="1"><numFmt numFmtId="164" formatCode="m/d/yyyy\\ h:mm"/></numFmts>'
+               '<cellXfs count="3"><xf numFmtId="0"/><xf numFmtId="14" applyNumberFormat="1"/>'
+               '<xf numFmtId="164" applyNumberFormat="1"/></cellXfs></styleSheet>')
+
+DATE_PATTERN = re.compile(r'(\d+)/(\d+)/(\d{4})(?: (\d+):(\d\d))?$')
+
+# Returns the serial number Excel keeps for a date such as "9/1/2016" or
+# "9/1/2016 9:00", and the XLSX_STYLES style that shows it; None for a value
+# that isn't a date.
+def excelDate(value):
+   match = DATE_PATTERN.match(value)
+   if(match == None):
+      return None
+   month, day, year, hour, minute = match.groups()
+   delta = datetime.datetime(int(year), int(month), int(day), int(hour or 0), int(minute or 0)) - \
+           datetime.datetime(1899, 12, 30)
+   return delta.days + delta.seconds / 86400.0, 2 if hour else 1
+
+# Writes a report as a native .xlsx export, the way Excel saves one: text in
+# the shared strings table, numbers as numeric cells (whole ones as floats,
+# such as "80.0"), dates as styled serial numbers, and blank cells left out.
+# The worksheet is deliberately not named sheet1.xml, so it must be found
+# through the workbook.
+def writeXlsxReport(path, kind, rows, header=None):
+   strings = []
+   sheet   = []
+   for rowNo, row in enumerate([list(header or REPORT_LAYOUTS[kind])] + rows, 1):
+      cells = []
+      for col, value in enumerate(row):
+         ref = chr(ord('A') + col) + str(rowNo)
+         if(value == ''):
+            continue
+         try:
+            number = float(value)
+         except ValueError:
+            number = None
+         date = excelDate(value) if rowNo > 1 else None
+         if(date != None):
+            cells.append('<c r="{0}" s="{2}"><v>{1!r}</v></c>'.format(ref, *date))
+         elif(number != None and rowNo > 1):
+            cells.append('<c r="{0}"><v>{1!r}</v></c>'.format(ref, number))
+         else:
+            cells.append('<c r="{0}" t="s"><v>{1}</v></c>'.format(ref, len(strings)))
+            strings.append(value)
+      sheet.append('<row r="{0}">{1}</row>'.format(rowNo, ''.join(cells)))
+   main = 'xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"'
+   with zipfile.ZipFile(path, 'w') as workbook:
+      workbook.writestr('[Content_Types].xml', '<?xml version="1.0"?><Types '
+            'xmlns="http://schemas.openxmlformats.org/package/2006/content-types"/>')
+      workbook.writestr('xl/workbook.xml', '<?xml version="1.0"?><workbook {0} '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships"><sheets>'
+            '<sheet name="Report" sheetId="1" r:id="rId7"/></sheets></workbook>'.format(main))
+      workbook.writestr('xl/_rels/workbook.xml.rels', '<?xml version="1.0"?><Relationships '
+            'xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId7" Target="worksheets/report.xml" Type="worksheet"/></Relationships>')
+      workbook.writestr('xl/styles.xml', XLSX_STYLES)
+      workbook.writestr('xl/sharedStrings.xml', '<?xml version="1.0"?><sst {0}>{1}</sst>'.format(main,
+            ''.join('<si><t>{0}</t></si>'.format(escape(value)) for value in strings)))
+      workbook.writestr('xl/worksheets/report.xml', '<?xml version="1.0"?><worksheet {0}><sheetData>{1}'
+            '</sheetData></worksheet>'.format(main, ''.join(sheet)))
+   return path
+
+# Reads a CSV file back as a list of rows.
+def readRows(path):
+   with open(path, 'rb') as f:
+      return list(csv.reader(f))
+
+# The rows of the combined output for the given reports, with policy for
+# both exams and projects.
+def combined(lessonInfo, examInfo, projectInfo, policy='all', **options):
+   return list(combinedRows(lessonInfo, examInfo, projectInfo, False, False, False,
+                            examPolicy=policy, projectPolicy=policy, **options))
+
+class ReportTestCase(unittest.TestCase):
+   def setUp(self):
+      self.directory = tempfile.mkdtemp(prefix='snr-test-')
+
+   def tearDown(self):
+      shutil.rmtree(self.directory, ignore_errors=True)
+
+   # A path in this test's scratch directory.
+   def path(self, *names):
+      return os.path.join(self.directory, *names)
+
+   def writeReport(self, name, kind, rows, **options):
+      return writeReport(self.path(name), kind, rows, **options)
+
+   def writeXlsxReport(self, name, kind, rows, **options):
+      return writeXlsxReport(self.path(name), kind, rows, **options)
@@ -0,0 +1,54 @@
+#
+# tests/testAtomicOutput.py
+#
+# The combined output only replaces an earlier file once it is complete, so
+# a cancelled or failed write leaves the earlier file as it was.
+################################################################################
+
+
+import os
+import gzip
+import unittest
+
+from simnetreport import GenerationCancelled, readExamFile, writeCombinedFile
+from reportFixtures import ReportTestCase, examRow
+
+def cancel(stage, count, total=None):
+   if(stage == 'write'):
+      raise GenerationCancelled()
+
+class AtomicOutputTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.examInfo = readExamFile(self.writeReport('exam.csv', 'exam', [examRow('S1', 'Quiz', 1, 80)]))
+
+   def write(self, name, progress=None):
+      return writeCombinedFile(self.path(name), {}, self.examInfo, {}, False, False, False, progress=progress)
+
+   def testCancelKeepsEarlierOutput(self):
+      for name in ('out.csv', 'out.csv.gz', 'out.xlsx'):
+         with open(self.path(name), 'w') as f:
+            f.write('earlier output')
+         self.assertRaises(GenerationCancelled, self.write, name, cancel)
+         with open(self.path(name)) as f:
+            self.assertEqual(f.read(), 'earlier output', name)
+      self.assertEqual(sorted(os.listdir(self.directory)), ['exam.csv', 'out.csv', 'out.csv.gz', 'out.xlsx'])
+
+   def testReplacesEarlierOutput(self):
+      with open(self.path('out.csv'), 'w') as f:
+         f.write('earlier output')
+      self.assertTrue(self.write('out.csv'))
+      with open(self.path('out.csv')) as f:
+         self.assertTrue(f.read().startswith('"Student ID"'))
+      self.assertEqual(sorted(os.listdir(self.directory)), ['exam.csv', 'out.csv'])
+
+   def testGzipKeepsItsName(self):
+      # The name in the header is the output's, not the temporary file's.
+      self.write('out.csv.gz')
+      with open(self.path('out.csv.gz'), 'rb') as f:
+         self.assertEqual(f.read(18)[10:], 'out.csv\x00')
+      with gzip.open(self.path('out.csv.gz')) as f:
+         self.assertTrue(f.read().startswith('"Student ID"'))
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,124 @@
+#
+# tests/testAttemptPolicies.py
+#
+# The attempt-aggregation policies: their results, merge(), and lookup.
+################################################################################
+
+
+import unittest
+
+from simnetreport import (ALL_ATTEMPTS, ATTEMPT_POLICIES, ATTEMPT_POLICY_CHOICES, AttemptReducer,
+      getAttemptPolicy, readExamFile, reduceAttempts, writeCombinedFile)
+from reportFixtures import ReportTestCase, examRow, readRows
+
+# Attempt cells with one score field each; '' is a blank score.
+CELLS = [('70',), ('',), ('95',), ('80',), ('95',)]
+
+# Feeds the cells to a fresh reducer for the policy.
+def reduced(spec, cells):
+   reducer = getAttemptPolicy(spec).reducer()
+   for attempt, cell in enumerate(cells):
+      reducer.add(attempt + 1, cell)
+   return reducer
+
+class ReducerResultTest(unittest.TestCase):
+   def testResults(self):
+      self.assertEqual(reduced('best', CELLS).result(0), '95')
+      self.assertEqual(reduced('latest', CELLS).result(0), '95')
+      self.assertEqual(reduced('mean', CELLS).result(0), '85')
+      self.assertEqual(reduced('best-n:2', CELLS).result(0), '95')
+      self.assertEqual(reduced('best-n:3', CELLS).result(0), '90')
+      self.assertEqual(reduced('drop-lowest:1', CELLS).result(0), '90')
+
+   def testBlankAndMissing(self):
+      for spec in ATTEMPT_POLICY_CHOICES[1:]:
+         # Only blank attempts give '', no attempts at all give None.
+         self.assertEqual(reduced(spec, [('',), ('',)]).result(0), '', spec)
+         self.assertEqual(reduced(spec, []).result(0), None, spec)
+
+   def testBestKeepsOriginalText(self):
+      self.assertEqual(reduced('best', [('90.0',), ('90',)]).result(0), '90.0')
+
+   def testDropLowestWithFewAttempts(self):
+      # With no more attempts than are dropped, the best one counts.
+      self.assertEqual(reduced('drop-lowest:2', [('60',), ('75',)]).result(0), '75')
+
+   def testLatestIgnoresOrder(self):
+      reducer = getAttemptPolicy('latest').reducer()
+      reducer.add(3, ('30',))
+      reducer.add(1, ('10',))
+      self.assertEqual(reducer.result(0), '30')
+
+   def testReduceAttemptsSkipsMissingAttempts(self):
+      policy = getAttemptPolicy('mean')
+      self.assertEqual(reduceAttempts(policy, [('50',), None, ('70',)], 0), '60')
+      self.assertEqual(reduceAttempts(policy, None, 0), None)
+
+   def testRepeatedAttemptReplacesEarlierCell(self):
+      reducer = getAttemptPolicy('mean').reducer()
+      for attempt, cell in [(1, ('60',)), (1, ('60',)), (2, ('90',))]:
+         reducer.add(attempt, cell)
+      self.assertEqual(reducer.result(0), '75')
+      reducer.add(2, ('70',))
+      self.assertEqual(reducer.result(0), '65')
+
+class ReducerMergeTest(unittest.TestCase):
+   # Merging reducers fed with any split of the cells must give the same
+   # result as one reducer fed with all of them.
+   def testMergeMatchesAdd(self):
+      for spec in ATTEMPT_POLICY_CHOICES[1:] + ['best-n:3', 'drop-lowest:2']:
+         expected = reduced(spec, CELLS).result(0)
+         for split in range(len(CELLS) + 1):
+            first  = getAttemptPolicy(spec).reducer()
+            second = getAttemptPolicy(spec).reducer()
+            for attempt, cell in enumerate(CELLS):
+               (first if attempt < split else second).add(attempt + 1, cell)
+            first.merge(second)
+            self.assertEqual(first.result(0), expected, "{0} split at {1}".format(spec, split))
+
+   def testMergeIntoEmpty(self):
+      for spec in ATTEMPT_POLICY_CHOICES[1:]:
+         empty = getAttemptPolicy(spec).reducer()
+         empty.merge(reduced(spec, CELLS))
+         self.assertEqual(empty.result(0), reduced(spec, CELLS).result(0), spec)
+
+   def testMergeReplacesRepeatedAttempts(self):
+      first  = reduced('mean', [('90',), ('60',)])
+      second = getAttemptPolicy('mean').reducer()
+      second.add(1, ('50',))
+      first.merge(second)
+      self.assertEqual(first.result(0), '55')
+
+# A report holding the same attempt twice gives the same output whether the
+# policy is applied while it is read or when the output is written.
+class DuplicateRowTest(ReportTestCase):
+   def testReadTimeMatchesWriteTime(self):
+      exam = self.writeReport('exam.csv', 'exam', [examRow('S1', 'Quiz', 1, 60), examRow('S1', 'Quiz', 1, 60),
+                                                   examRow('S1', 'Quiz', 2, 90)])
+      for spec, expected in [('mean', '75'), ('drop-lowest:1', '90'), ('best-n:2', '75'), ('best', '90')]:
+         writeCombinedFile(self.path('read.csv'), {}, readExamFile(exam, spec), {}, False, False, False,
+                           examPolicy=spec)
+         writeCombinedFile(self.path('write.csv'), {}, readExamFile(exam), {}, False, False, False,
+                           examPolicy=spec)
+         self.assertEqual(readRows(self.path('read.csv'))[1][3], expected, spec)
+         self.assertEqual(readRows(self.path('read.csv')), readRows(self.path('write.csv')), spec)
+
+class PolicyLookupTest(unittest.TestCase):
+   def testAllAttemptsIsNotAReducer(self):
+      policy = getAttemptPolicy(ALL_ATTEMPTS)
+      self.assertTrue(policy.perAttempt)
+      self.assertFalse(ALL_ATTEMPTS in ATTEMPT_POLICIES)
+      self.assertRaises(ValueError, policy.reducer)
+
+   def testReducerBaseIsAbstract(self):
+      self.assertRaises(TypeError, AttemptReducer)
+
+   def testSpecs(self):
+      self.assertEqual(getAttemptPolicy(' Best-N ').spec, 'best-n:2')
+      self.assertEqual(getAttemptPolicy('drop-lowest:3').n, 3)
+      self.assertEqual(getAttemptPolicy('best-n:4').label, 'Mean of best 4')
+      for spec in ('worst', 'best:2', 'best-n:0', 'best-n:x', 'all:2'):
+         self.assertRaises(ValueError, getAttemptPolicy, spec)
+
+if __name__ == "__main__":
+   unittest.main()
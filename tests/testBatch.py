@@ -0,0 +1,65 @@
+#
+# tests/testBatch.py
+#
+# Batch mode: reading a manifest and combining each section in a pool.
+################################################################################
+
+
+import os
+import unittest
+from StringIO import StringIO
+
+from simnetreport.batch import printBatchSummary, processSection, readBatchManifest, runBatch
+from reportFixtures import ReportTestCase, examRow, lessonRow, readRows
+
+# The job settings batchMain adds to each manifest entry.
+JOB_OPTIONS = {'examPolicy': 'all', 'projectPolicy': 'all', 'usePctPoints': False,
+               'missingScoreMark': '', 'usePoints': False}
+
+class BatchTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      os.mkdir(self.path('reports'))
+      self.writeReport('reports/exam.csv', 'exam', [examRow('S1', 'Quiz', 1, 80)])
+      self.writeReport('reports/lesson.csv', 'lesson', [lessonRow('S1', 'Lesson', 100)])
+      with open(self.path('reports', 'manifest.csv'), 'w') as f:
+         f.write(" Section ,Lesson,Exam,Project,Output\n"
+                 "A,lesson.csv,exam.csv,,\n"
+                 "B,,missing.csv,,b-out.csv\n"
+                 ",lesson.csv,,,\n")
+
+   def jobs(self, outputDir=''):
+      jobs = readBatchManifest(self.path('reports', 'manifest.csv'), outputDir)
+      for job in jobs:
+         job.update(JOB_OPTIONS)
+      return jobs
+
+   def testManifest(self):
+      jobs = self.jobs()
+      # Rows without a section are skipped; paths are relative to the manifest.
+      self.assertEqual([job['section'] for job in jobs], ['A', 'B'])
+      self.assertEqual(jobs[0]['lesson'], self.path('reports', 'lesson.csv'))
+      self.assertEqual(jobs[0]['project'], '')
+      self.assertEqual(jobs[0]['output'], self.path('reports', 'A.csv'))
+      self.assertEqual(jobs[1]['output'], self.path('reports', 'b-out.csv'))
+      self.assertEqual(self.jobs(self.directory)[0]['output'], self.path('A.csv'))
+
+   def testProcessSection(self):
+      result = processSection(self.jobs()[0])
+      self.assertEqual(result['error'], None)
+      self.assertEqual(readRows(self.path('reports', 'A.csv'))[1], ['S1', 'LastS1', 'FirstS1', '100', '80'])
+
+   def testFailedSectionDoesNotRaise(self):
+      result = processSection(self.jobs()[1])
+      self.assertTrue('missing.csv' in result['error'])
+
+   def testRunBatch(self):
+      out     = StringIO()
+      results = runBatch(self.jobs(), workers=2, out=out)
+      self.assertEqual(sorted(r['section'] for r in results), ['A', 'B'])
+      self.assertEqual(printBatchSummary(results, 1.0, out=out), 1)
+      self.assertTrue("2 section(s) processed" in out.getvalue())
+      self.assertTrue("  B: IOError" in out.getvalue())
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,69 @@
+#
+# tests/testBenchmarks.py
+#
+# The synthetic report generator and the benchmark suite built on it (both
+# in benchmarks/).
+################################################################################
+
+
+import os
+import sys
+import unittest
+from StringIO import StringIO
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, 'benchmarks'))
+from SimNetReportGenerator import (EXAM_HEADERS, LESSON_HEADERS, PROJECT_HEADERS, generateReports,
+      studentsForRows)
+from SimNetBenchmark import STEPS, compareResults, runBenchmarks
+from simnetreport import readExamFile, readLessonFile, readProjectFile
+from reportFixtures import ReportTestCase, readRows
+
+class GeneratorTest(ReportTestCase):
+   def testReports(self):
+      files = generateReports(self.path('reports'), students=20, titles=3, maxAttempts=2, blankRate=0.2)
+      for kind, headers, width in (('lesson', LESSON_HEADERS, 10), ('exam', EXAM_HEADERS, 17),
+                                   ('project', PROJECT_HEADERS, 11)):
+         file, count = files[kind]
+         rows = readRows(file)
+         self.assertEqual(rows[0], headers)
+         self.assertEqual(len(rows) - 1, count, kind)
+         self.assertEqual(set(len(row) for row in rows), set([width]), kind)
+      # The readers take every row.
+      self.assertEqual(len(readLessonFile(files['lesson'][0])['students']), 20)
+      examInfo = readExamFile(files['exam'][0])
+      self.assertEqual(sum(examInfo['attemptCounts'].values()), files['exam'][1])
+      self.assertTrue(max(examInfo['attempts'].values()) <= 2)
+      projectInfo = readProjectFile(files['project'][0])
+      self.assertEqual(sum(projectInfo['attemptCounts'].values()), files['project'][1])
+
+   def testSeedRepeats(self):
+      first  = generateReports(self.path('first'), students=5, titles=2, seed=4)
+      second = generateReports(self.path('second'), students=5, titles=2, seed=4)
+      for kind in ('lesson', 'exam', 'project'):
+         self.assertEqual(readRows(first[kind][0]), readRows(second[kind][0]), kind)
+
+   def testStudentsForRows(self):
+      self.assertEqual(studentsForRows(1000, 10), 100)
+      self.assertEqual(studentsForRows(1000, 10, 3), 50)
+      self.assertEqual(studentsForRows(1, 10, 3), 1)
+
+class BenchmarkTest(ReportTestCase):
+   def testRunAndCompare(self):
+      out     = StringIO()
+      results = runBenchmarks([60], titles=2, maxAttempts=2, workDir=self.path('work'), out=out)
+      self.assertEqual([result['step'] for result in results], [name for name, step, unit in STEPS])
+      for result in results:
+         self.assertTrue(result['count'] > 0, result['step'])
+         self.assertEqual(result['size'], 60)
+      # The work directory is made if missing, and the reports removed after.
+      self.assertEqual(os.listdir(self.path('work')), [])
+      self.assertEqual(len(out.getvalue().splitlines()), len(STEPS))
+      out = StringIO()
+      slower = [dict(result, seconds=result['seconds'] + 1.0) for result in results]
+      compareResults({'results': slower}, {'results': results}, out)
+      timed  = [result for result in results if result['seconds'] > 0]
+      self.assertEqual(len(out.getvalue().strip().splitlines()), 1 + len(timed))
+      self.assertTrue(out.getvalue().rstrip().endswith('x'))
+
+if __name__ == "__main__":
+   unittest.main()
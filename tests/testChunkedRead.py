@@ -0,0 +1,46 @@
+#
+# tests/testChunkedRead.py
+#
+# readExamFileChunked reads a report in byte ranges on several processes and
+# gives the same result as reading it serially.
+################################################################################
+
+
+import unittest
+
+from simnetreport import readExamFile, readExamFileChunked
+from reportFixtures import ReportTestCase, combined, examRow
+
+class ChunkedReadTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.rows = []
+      for n in range(40):
+         SID = 'S{0:02d}'.format(n % 13)
+         self.rows.append(examRow(SID, 'Quiz {0}'.format(n % 3), n // 13 + 1, (n * 7) % 101))
+      # The same attempt again, far from the first, so it lands in another chunk.
+      self.rows.append(self.rows[0])
+      self.exam = self.writeReport('exam.csv', 'exam', self.rows)
+
+   def testSameAsSerial(self):
+      for streaming in (False, True):
+         self.assertEqual(readExamFileChunked(self.exam, workers=3, streaming=streaming, chunkBytes=300),
+                          readExamFile(self.exam, streaming=streaming), streaming)
+
+   def testSameOutputWithPolicies(self):
+      for policy in ('best', 'latest', 'mean', 'best-n:2', 'drop-lowest:1'):
+         examInfo = readExamFileChunked(self.exam, policy, workers=3, streaming=True, chunkBytes=300)
+         self.assertEqual(combined({}, examInfo, {}, policy), combined({}, readExamFile(self.exam), {}, policy), policy)
+
+   def testOtherDelimiter(self):
+      exam = self.writeReport('exam-semicolon.csv', 'exam', self.rows, delimiter=';')
+      self.assertEqual(readExamFileChunked(exam, workers=2, chunkBytes=300), readExamFile(self.exam))
+
+   def testProgress(self):
+      counts = []
+      readExamFileChunked(self.exam, workers=2, chunkBytes=300,
+                          progress=lambda stage, count, total=None: counts.append(count))
+      self.assertEqual(counts[-1], len(self.rows))
+
+if __name__ == "__main__":
+   unittest.main()
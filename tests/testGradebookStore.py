@@ -0,0 +1,76 @@
+#
+# tests/testGradebookStore.py
+#
+# The term gradebook store: reports imported for several sections read back
+# the same as one export holding all of their rows.
+################################################################################
+
+
+import unittest
+
+from simnetreport import AggregatedAttempts, GradebookStore, readExamFile, readLessonFile, readProjectFile
+from reportFixtures import ReportTestCase, combined, examRow, lessonRow, projectRow
+
+LESSONS  = {'01': [lessonRow('S1', 'Lesson A', 80)], '02': [lessonRow('S2', 'Lesson A', 60), lessonRow('S2', 'Lesson B', 100)]}
+EXAMS    = {'01': [examRow('S1', 'Quiz', 1, 60), examRow('S1', 'Quiz', 2, 90), examRow('S1', 'Quiz', 3, 90.0),
+                   examRow('S1', 'Test', 1, '')],
+            '02': [examRow('S2', 'Quiz', 1, 75), examRow('S2', 'Quiz', 2, ''), examRow('S2', 'Quiz', 3, 70)]}
+PROJECTS = {'01': [projectRow('S1', 'Proj', 1, 50)], '02': [projectRow('S2', 'Proj', 1, 85), projectRow('S2', 'Proj', 2, 95)]}
+
+class GradebookStoreTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.store = GradebookStore(self.path('term.db'))
+      for section in ('01', '02'):
+         self.importSection(section)
+
+   def tearDown(self):
+      self.store.close()
+      ReportTestCase.tearDown(self)
+
+   def importSection(self, section):
+      return self.store.importReports(self.writeReport('lesson-' + section + '.csv', 'lesson', LESSONS[section]),
+                                      self.writeReport('exam-' + section + '.csv', 'exam', EXAMS[section]),
+                                      self.writeReport('project-' + section + '.csv', 'project', PROJECTS[section]),
+                                      section)
+
+   # Reads the given sections' rows as one export of each report.
+   def readExports(self, sections, examPolicy=None, projectPolicy=None):
+      rows = lambda reports: sum((reports[section] for section in sections), [])
+      return (readLessonFile(self.writeReport('lesson.csv', 'lesson', rows(LESSONS))),
+              readExamFile(self.writeReport('exam.csv', 'exam', rows(EXAMS)), examPolicy),
+              readProjectFile(self.writeReport('project.csv', 'project', rows(PROJECTS)), projectPolicy))
+
+   def testSections(self):
+      self.assertEqual(self.store.sections(), {'01': {'lesson': 1, 'exam': 4, 'project': 1},
+                                               '02': {'lesson': 2, 'exam': 3, 'project': 2}})
+
+   def testReadMatchesExports(self):
+      for policy in ('all', 'best', 'latest', 'mean', 'best-n:2', 'drop-lowest:1'):
+         self.assertEqual(combined(*self.store.read(None, policy, policy), policy=policy),
+                          combined(*self.readExports(['01', '02'], policy, policy), policy=policy), policy)
+      self.assertEqual(combined(*self.store.read(['02'])), combined(*self.readExports(['02'])))
+
+   def testImportIsIdempotent(self):
+      before = combined(*self.store.read())
+      self.assertEqual(self.importSection('01'), 6)
+      self.assertEqual(self.store.sections()['01'], {'lesson': 1, 'exam': 4, 'project': 1})
+      self.assertEqual(combined(*self.store.read()), before)
+
+   def testPolicyInQuery(self):
+      # The policies are applied by the query: one result per (student, title).
+      lessonInfo, examInfo, projectInfo = self.store.read(None, 'mean', 'best')
+      self.assertEqual(examInfo['attempts'], {'quiz': 3, 'test': 1})
+      self.assertEqual(examInfo['attemptCounts'], {'quiz': 6, 'test': 1})
+      quiz, test = examInfo['titleIndex']['quiz'], examInfo['titleIndex']['test']
+      self.assertTrue(isinstance(examInfo['scores']['S1'][quiz], AggregatedAttempts))
+      self.assertEqual(examInfo['scores']['S1'][quiz].result(0), '80')
+      self.assertEqual(examInfo['scores']['S1'][test].result(0), '')
+      self.assertEqual(examInfo['scores']['S2'][quiz].result(0), '72.5')
+      self.assertEqual(projectInfo['scores']['S2'][0].result(0), '95')
+
+   def testUnknownSection(self):
+      self.assertEqual(self.store.read(['03']), ({}, {}, {}))
+
+if __name__ == "__main__":
+   unittest.main()
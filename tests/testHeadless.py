@@ -0,0 +1,61 @@
+#
+# tests/testHeadless.py
+#
+# The parser core, and every mode but the GUI, import and run without Tk --
+# on a server with no display, and in process-pool workers that should start
+# quickly.  Each check runs in a fresh interpreter, so what this process has
+# already imported doesn't count.
+################################################################################
+
+
+import os
+import sys
+import json
+import subprocess
+import unittest
+
+from reportFixtures import ReportTestCase, examRow, lessonRow, readRows
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir)
+
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
+from SimNetStartup import timeImport
+
+# Run in the child with Tk made unimportable: combines a section through the
+# batch command, then prints which of the heavy modules were loaded.
+HEADLESS = '''
+import sys, json
+sys.modules['Tkinter'] = None   # "import Tkinter" now raises ImportError.
+import SimNetReportParser, simnetreport, simnetreport.batch, simnetreport.watch, simnetreport.service
+assert SimNetReportParser.readExamFile is simnetreport.readExamFile
+status = SimNetReportParser.main(['batch', %(manifest)r, '--workers', '1', '--no-cache'])
+print(json.dumps({'status': status, 'loaded': [name for name in ('ttk', 'tkMessageBox', 'numpy')
+                                               if sys.modules.get(name) != None]}))
+'''
+
+class HeadlessTest(ReportTestCase):
+   def testBatchWithoutTk(self):
+      self.writeReport('exam.csv', 'exam', [examRow('S1', 'Quiz', 1, 80)])
+      self.writeReport('lesson.csv', 'lesson', [lessonRow('S1', 'Lesson', 100)])
+      with open(self.path('manifest.csv'), 'w') as f:
+         f.write("Section,Lesson,Exam,Project,Output\nA,lesson.csv,exam.csv,,a.csv\n")
+      child  = subprocess.Popen([sys.executable, '-c', HEADLESS % {'manifest': self.path('manifest.csv')}],
+                                cwd=ROOT, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+      output = child.communicate()[0]
+      self.assertEqual(child.returncode, 0)
+      self.assertEqual(json.loads(output.splitlines()[-1]), {'status': 0, 'loaded': []})
+      self.assertEqual(readRows(self.path('a.csv'))[1], ['S1', 'LastS1', 'FirstS1', '100', '80'])
+
+   def testStartupImports(self):
+      seconds, elapsed, loaded = timeImport('simnetreport')
+      self.assertFalse('Tkinter' in loaded)
+      self.assertFalse('numpy' in loaded)   # Only loaded when the writer needs it.
+      self.assertTrue(0 <= seconds <= elapsed)
+      try:
+         import Tkinter
+      except ImportError:
+         return
+      self.assertTrue('Tkinter' in timeImport('simnetreport.gui')[2])
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,89 @@
+#
+# tests/testIncremental.py
+#
+# Incremental exam reads: a grown export is read from where the last read
+# stopped, and always gives the same output as reading it in full.
+################################################################################
+
+
+import csv
+import unittest
+
+from simnetreport import readExamFile, readExamFileIncremental
+from reportFixtures import ReportTestCase, combined, examRow
+
+ROWS = [examRow('S1', 'Quiz', 1, 60), examRow('S2', 'Quiz', 1, 70)]
+NEW  = [examRow('S1', 'Quiz', 2, 90, date='10/1/2016'), examRow('S3', 'Test', 1, 40)]
+
+class IncrementalTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.exam  = self.writeReport('exam.csv', 'exam', ROWS)
+      self.state = self.path('exam.state')
+
+   def append(self, rows):
+      with open(self.exam, 'ab') as f:
+         csv.writer(f).writerows(rows)
+
+   # Reads the export incrementally and checks it against a full read.
+   def check(self, expectedMode, policy=None):
+      examInfo, mode = readExamFileIncremental(self.exam, self.state, policy)
+      self.assertEqual(mode, expectedMode)
+      spec = policy or 'all'
+      self.assertEqual(combined({}, examInfo, {}, spec), combined({}, readExamFile(self.exam, policy), {}, spec))
+
+   def testAppend(self):
+      for policy in (None, 'best', 'mean'):
+         self.writeReport('exam.csv', 'exam', ROWS)
+         self.check('full', policy)
+         self.check('append', policy)   # Nothing new.
+         self.append(NEW[:1])
+         self.check('append', policy)
+         self.append(NEW[1:])
+         self.check('append', policy)
+
+   def testReexportMerges(self):
+      # The same rows, reordered, with new ones: only the new rows are added.
+      self.check('full')
+      self.writeReport('exam.csv', 'exam', [NEW[0], ROWS[1], ROWS[0], NEW[1]])
+      self.check('merge')
+
+   def testRemovedRowsReadInFull(self):
+      self.check('full')
+      self.writeReport('exam.csv', 'exam', ROWS[1:] + NEW)
+      self.check('full')
+
+   def testTruncatedLastRow(self):
+      # Read while the export is still being written: cut inside PercentPoints.
+      self.append(NEW[:1])
+      with open(self.exam, 'rb') as f:
+         text = f.read()
+      cut = text.rindex(',100,9') + len(',100,9')   # TotalPoints, then half of PercentPoints.
+      for policy in (None, 'mean'):
+         with open(self.exam, 'wb') as f:
+            f.write(text[:cut])
+         examInfo, mode = readExamFileIncremental(self.exam, self.state, policy)
+         spec  = policy or 'all'
+         whole = self.writeReport('whole.csv', 'exam', ROWS)
+         self.assertEqual(combined({}, examInfo, {}, spec), combined({}, readExamFile(whole, policy), {}, spec))
+         with open(self.exam, 'wb') as f:
+            f.write(text)
+         self.check('append', policy)
+
+   def testLastRowWithoutLineBreak(self):
+      with open(self.exam, 'rb') as f:
+         text = f.read()
+      with open(self.exam, 'wb') as f:
+         f.write(text.rstrip('\r\n'))
+      self.check('full')
+      self.check('append')
+      self.append([[]] + NEW)   # Ends the last row, then adds more.
+      self.check('append')
+
+   def testPolicyChangeReadsInFull(self):
+      self.check('full', 'best')
+      self.append(NEW)
+      self.check('full', 'mean')
+
+if __name__ == "__main__":
+   unittest.main()
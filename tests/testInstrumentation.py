@@ -0,0 +1,75 @@
+#
+# tests/testInstrumentation.py
+#
+# Phase timing and cProfile output: what a run records when instrumentation
+# is on, and that nothing is recorded when it is off.
+################################################################################
+
+
+import os
+import unittest
+from StringIO import StringIO
+
+from simnetreport import core, enableInstrumentation, readExamFile, readLessonFile, writeCombinedFile
+from reportFixtures import ReportTestCase, examRow, lessonRow
+
+class InstrumentationTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.previous = core.INSTRUMENTATION
+      self.exam     = self.writeReport('exam.csv', 'exam', [examRow('S1', 'Quiz', 1, 60), examRow('S1', 'Quiz', 2, 90),
+                                                            examRow('S2', 'Quiz', 1, 75)])
+      self.lesson   = self.writeReport('lesson.csv', 'lesson', [lessonRow('S1', 'Lesson', 80)])
+
+   def tearDown(self):
+      core.INSTRUMENTATION = self.previous
+      ReportTestCase.tearDown(self)
+
+   def combine(self):
+      writeCombinedFile(self.path('out.csv'), readLessonFile(self.lesson), readExamFile(self.exam), {},
+                        True, False, False)
+
+   def testOffByDefault(self):
+      core.INSTRUMENTATION = core.NullInstrumentation()
+      self.combine()
+      self.assertFalse(core.INSTRUMENTATION.enabled)
+      self.assertEqual(core.INSTRUMENTATION.startProfile(), None)
+
+   def testPhases(self):
+      instrumentation = enableInstrumentation()
+      self.assertTrue(core.INSTRUMENTATION is instrumentation)
+      self.combine()
+      phases = dict((record[0], record[1:]) for record in instrumentation.records())
+      for name in ('lesson: sniff', 'lesson: parse', 'exam: sniff', 'exam: parse', 'write: index students',
+                   'write: students'):
+         self.assertTrue(name in phases, name)
+      calls, wall, cpu, count, unit = phases['exam: parse']
+      self.assertEqual((calls, count, unit), (1, 3, 'rows'))
+      self.assertTrue(wall >= 0 and cpu >= 0)
+      self.assertEqual(phases['write: students'][3:], (2, 'students'))
+      self.assertEqual(phases['lesson: parse'][3:], (1, 'rows'))
+
+   def testMergeAndReport(self):
+      instrumentation = enableInstrumentation()
+      self.combine()
+      total = core.Instrumentation()
+      total.merge(instrumentation.records())
+      total.merge(instrumentation.records())
+      calls, wall, cpu, count, unit = dict((record[0], record[1:]) for record in total.records())['exam: parse']
+      self.assertEqual((calls, count), (2, 6))
+      out = StringIO()
+      total.report(out, peakMemory=12.5)
+      lines = out.getvalue().splitlines()
+      self.assertTrue(lines[1].startswith('Phase'))
+      self.assertEqual(len([line for line in lines if line.startswith('exam: parse')]), 1)
+      self.assertEqual(lines[-1], 'Peak memory: 12.5 MB')
+
+   def testProfileFiles(self):
+      instrumentation = enableInstrumentation(self.path('profiles'))
+      profiler = instrumentation.startProfile()
+      self.combine()
+      instrumentation.stopProfile(profiler, 'section A/1')
+      self.assertEqual(os.listdir(self.path('profiles')), ['section_A_1-{0}.prof'.format(os.getpid())])
+
+if __name__ == "__main__":
+   unittest.main()
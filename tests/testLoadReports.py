@@ -0,0 +1,41 @@
+#
+# tests/testLoadReports.py
+#
+# loadReports gives the same reports whether they are read serially, on
+# threads, or in worker processes.
+################################################################################
+
+
+import unittest
+
+from simnetreport import loadReports, readExamFile, readLessonFile, readProjectFile
+from reportFixtures import ReportTestCase, examRow, lessonRow, projectRow
+
+class LoadReportsTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.lesson  = self.writeReport('lesson.csv', 'lesson', [lessonRow('S1', 'Lesson', 80)])
+      self.exam    = self.writeReport('exam.csv', 'exam', [examRow('S1', 'Quiz', 1, 60), examRow('S1', 'Quiz', 2, 70)])
+      self.project = self.writeReport('project.csv', 'project', [projectRow('S2', 'Proj', 1, 50)])
+
+   def testModes(self):
+      expected = (readLessonFile(self.lesson), readExamFile(self.exam, streaming=True), readProjectFile(self.project))
+      for mode in ('serial', 'thread', 'process'):
+         self.assertEqual(loadReports(self.lesson, self.exam, self.project, mode=mode), expected, mode)
+
+   def testBlankReports(self):
+      lessonInfo, examInfo, projectInfo = loadReports('', self.exam, '', mode='process')
+      self.assertEqual((lessonInfo, projectInfo), ({}, {}))
+      self.assertEqual(examInfo['attempts'], {'quiz': 2})
+
+   def testProgress(self):
+      seen = set()
+      loadReports(self.lesson, self.exam, self.project, mode='process',
+            progress=lambda stage, count, total=None: seen.add((stage, count)))
+      self.assertEqual(seen, set([('lesson', 1), ('exam', 2), ('project', 1)]))
+
+   def testUnknownMode(self):
+      self.assertRaises(ValueError, loadReports, self.lesson, self.exam, '', mode='fibers')
+
+if __name__ == "__main__":
+   unittest.main()
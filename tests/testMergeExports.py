@@ -0,0 +1,79 @@
+#
+# tests/testMergeExports.py
+#
+# Several exports of one report are merged into one, with the attempts found
+# in more than one of them counted once.
+################################################################################
+
+
+import unittest
+
+from simnetreport import REPORT_FILE_SEPARATOR, loadReports, readExamFile, readProjectFile, reportFiles
+from reportFixtures import ReportTestCase, combined, examRow, projectRow
+
+class ReportFilesTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      for name in ('exam-b.csv', 'exam-a.csv'):
+         self.writeReport(name, 'exam', [])
+
+   def testSpecs(self):
+      a, b = self.path('exam-a.csv'), self.path('exam-b.csv')
+      self.assertEqual(reportFiles(''), [])
+      self.assertEqual(reportFiles(b), [b])
+      self.assertEqual(reportFiles(b + REPORT_FILE_SEPARATOR + ' ' + a + REPORT_FILE_SEPARATOR), [b, a])
+      self.assertEqual(reportFiles([b, a, b]), [b, a])
+      # A pattern's matches are taken in name order.
+      self.assertEqual(reportFiles(self.path('exam-*.csv')), [a, b])
+      self.assertRaises(ValueError, reportFiles, self.path('lesson-*.csv'))
+
+class MergeExportsTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      # September's and October's exports overlap in S1's first attempt.
+      self.exams = [self.writeReport('exam-sep.csv', 'exam',
+                                     [examRow('S1', 'Quiz', 1, 60), examRow('S2', 'Quiz', 1, 70)]),
+                    self.writeReport('exam-oct.csv', 'exam',
+                                     [examRow('S1', 'Quiz', 1, 60), examRow('S1', 'Quiz', 2, 90, date='10/1/2016'),
+                                      examRow('S3', 'Test', 1, 40, date='10/2/2016')])]
+      # The same attempts in one export.
+      self.union = self.writeReport('exam-all.csv', 'exam',
+                                    [examRow('S1', 'Quiz', 1, 60), examRow('S2', 'Quiz', 1, 70),
+                                     examRow('S1', 'Quiz', 2, 90, date='10/1/2016'),
+                                     examRow('S3', 'Test', 1, 40, date='10/2/2016')])
+
+   def testSameAsOneExport(self):
+      for policy in ('all', 'best', 'mean', 'drop-lowest:1'):
+         for mode in ('serial', 'process'):
+            examInfo = loadReports('', self.exams, '', policy, mode=mode)[1]
+            self.assertEqual(combined({}, examInfo, {}, policy), combined({}, readExamFile(self.union, policy), {}, policy),
+                             "{0} ({1})".format(policy, mode))
+
+   def testDuplicatesCounted(self):
+      examInfo = loadReports('', REPORT_FILE_SEPARATOR.join(self.exams), '', mode='serial')[1]
+      self.assertEqual(examInfo['duplicates'], 1)
+      self.assertEqual(examInfo['attempts'], {'quiz': 2, 'test': 1})
+      self.assertEqual(examInfo['attemptCounts'], {'quiz': 3, 'test': 1})
+
+   def testDifferentDateReplacesAttempt(self):
+      # A later export's attempt with another date is a re-export: it wins.
+      later = self.writeReport('exam-nov.csv', 'exam', [examRow('S2', 'Quiz', 1, 85, date='11/1/2016')])
+      examInfo = loadReports('', self.exams + [later], '', mode='serial')[1]
+      self.assertEqual(examInfo['duplicates'], 1)
+      rows = combined({}, examInfo, {})
+      self.assertEqual(rows[2][:4], ['S2', 'LastS2', 'FirstS2', '85'])
+      self.assertEqual(examInfo['attemptCounts'], {'quiz': 3, 'test': 1})
+
+   def testProjects(self):
+      projects = [self.writeReport('project-1.csv', 'project', [projectRow('S1', 'Proj', 1, 50)]),
+                  self.writeReport('project-2.csv', 'project',
+                                   [projectRow('S1', 'Proj', 1, 50), projectRow('S1', 'Proj', 2, 75)])]
+      union    = self.writeReport('project-all.csv', 'project',
+                                  [projectRow('S1', 'Proj', 1, 50), projectRow('S1', 'Proj', 2, 75)])
+      for policy in ('all', 'latest'):
+         projectInfo = loadReports('', '', projects, projectPolicy=policy, mode='serial')[2]
+         self.assertEqual(projectInfo['duplicates'], 1)
+         self.assertEqual(combined({}, {}, projectInfo, policy), combined({}, {}, readProjectFile(union, policy), policy), policy)
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,36 @@
+#
+# tests/testNumpyBest.py
+#
+# The NumPy best-attempt engine must give exactly what BestAttempt does.
+################################################################################
+
+
+import random
+import unittest
+
+from simnetreport import loadNumpy, readExamFile, writeCombinedFile
+from reportFixtures import ReportTestCase, examRow
+
+@unittest.skipIf(loadNumpy() == None, "NumPy is not installed")
+class NumpyBestTest(ReportTestCase):
+   def testSameOutputAsReducer(self):
+      rand = random.Random(3)
+      rows = []
+      for student in range(40):
+         for title in ('Quiz A', 'Quiz B', 'Quiz C'):
+            for attempt in range(1, rand.randint(0, 4) + 1):
+               # Blanks, ties, and scores written differently ("90" and "90.0").
+               percent = rand.choice(['', '', '90', '90.0', '75.5', '100', '0', str(rand.randint(0, 100))])
+               rows.append(examRow('S%02d' % student, title, attempt, percent))
+      examInfo = readExamFile(self.writeReport('exam.csv', 'exam', rows))
+      outputs  = []
+      for useNumpy in (False, True):
+         outputs.append(self.path('out-{0}.csv'.format(useNumpy)))
+         writeCombinedFile(outputs[-1], {}, examInfo, {}, True, False, False, '-', useNumpy=useNumpy)
+      with open(outputs[0]) as f:
+         expected = f.read()
+      with open(outputs[1]) as f:
+         self.assertEqual(f.read(), expected)
+
+if __name__ == "__main__":
+   unittest.main()
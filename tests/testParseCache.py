@@ -0,0 +1,62 @@
+#
+# tests/testParseCache.py
+#
+# The parse cache: a cached report reads the same as a parsed one, and a
+# cache that can't be written never fails the read.
+################################################################################
+
+
+import os
+import sys
+import threading
+import unittest
+from StringIO import StringIO
+
+from simnetreport import ParseCache, readExamFile
+from reportFixtures import ReportTestCase, examRow
+
+class ParseCacheTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.exam = self.writeReport('exam.csv', 'exam', [examRow('S1', 'Quiz', 1, 80), examRow('S1', 'Quiz', 2, 90)])
+
+   def testHitGivesSameInfo(self):
+      cache = ParseCache(self.path('cache'))
+      first = readExamFile(self.exam, cache=cache)
+      self.assertEqual((cache.hits, cache.misses), (0, 1))
+      self.assertEqual(readExamFile(self.exam, cache=cache), first)
+      self.assertEqual((cache.hits, cache.misses), (1, 1))
+      self.assertEqual(first, readExamFile(self.exam))
+
+   def testConcurrentStores(self):
+      # Workers that all miss on an empty cache directory make it (and store
+      # the same entry) at once.
+      cache   = ParseCache(self.path('cache'))
+      errors  = []
+      def store():
+         try:
+            cache.store('key', {'S1': 'info'})
+         except Exception as e:
+            errors.append(e)
+      threads = [threading.Thread(target=store) for i in range(8)]
+      for thread in threads:
+         thread.start()
+      for thread in threads:
+         thread.join()
+      self.assertEqual(errors, [])
+      self.assertEqual(os.listdir(self.path('cache')), ['key.pickle'])
+
+   def testUnwritableCacheIsSkipped(self):
+      with open(self.path('cache'), 'w') as f:
+         f.write('not a directory')
+      stderr, sys.stderr = sys.stderr, StringIO()
+      try:
+         info = readExamFile(self.exam, cache=ParseCache(self.path('cache')))
+         message = sys.stderr.getvalue()
+      finally:
+         sys.stderr = stderr
+      self.assertEqual(info, readExamFile(self.exam))
+      self.assertTrue(message.startswith("Skipped writing parse cache entry"))
+
+if __name__ == "__main__":
+   unittest.main()
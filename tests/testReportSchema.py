@@ -0,0 +1,63 @@
+#
+# tests/testReportSchema.py
+#
+# Column mapping from the header row: reports with reordered, extra, or
+# missing columns, and headerless-looking exports in the standard layout.
+################################################################################
+
+
+import random
+import unittest
+
+from simnetreport import (REPORT_COLUMNS, REPORT_LAYOUTS, ReportSchema, readExamFile, readLessonFile,
+      readProjectFile)
+from reportFixtures import ReportTestCase, combined, examRow, lessonRow, projectRow
+
+REPORTS = {'lesson':  ([lessonRow('S1', 'Lesson', 80), lessonRow('S2', 'Lesson', 60, complete='3')], readLessonFile),
+           'exam':    ([examRow('S1', 'Quiz', 1, 60, points=6, total='10'), examRow('S1', 'Quiz', 2, 90)], readExamFile),
+           'project': ([projectRow('S1', 'Proj', 1, 50), projectRow('S2', 'Proj', 2, 75)], readProjectFile)}
+
+class ReportSchemaTest(unittest.TestCase):
+   def testExtract(self):
+      row    = examRow('S1', 'Quiz', 2, 87.5, points=35, total='40', questions='20')
+      fields = ReportSchema('exam', REPORT_LAYOUTS['exam']).extract(row)
+      self.assertEqual(fields, ('S1', 'LastS1', 'FirstS1', 'Quiz', '2', '20', '87.5', '35', '87.5', '40'))
+      self.assertEqual(len(fields), len(REPORT_COLUMNS['exam']))
+
+   def testHeaderNames(self):
+      header = ['\xef\xbb\xbfStudentID'] + [' ' + name + ' ' for name in REPORT_LAYOUTS['lesson'][1:]]
+      schema = ReportSchema('lesson', header)
+      self.assertEqual(schema.positions, (0, 1, 2, 3, 8, 9, 7))
+      self.assertEqual(schema.date, 5)   # The first of the two Date columns.
+
+   def testMissingColumns(self):
+      header = [name for name in REPORT_LAYOUTS['project'] if not name in ('Percent', 'Points')]
+      try:
+         ReportSchema('project', header)
+         self.fail("no ValueError")
+      except ValueError as e:
+         self.assertEqual(str(e), "The project report has no Percent, Points columns.")
+
+   def testStandardLayoutWithoutStudentID(self):
+      header = ['ID'] + list(REPORT_LAYOUTS['exam'][1:])
+      self.assertEqual(ReportSchema('exam', header).positions,
+                       ReportSchema('exam', REPORT_LAYOUTS['exam']).positions)
+
+class ReorderedReportTest(ReportTestCase):
+   def testReorderedAndExtraColumns(self):
+      rand = random.Random(5)
+      for kind, (rows, read) in REPORTS.items():
+         order  = range(len(REPORT_LAYOUTS[kind])) + [None]   # None: an extra column.
+         rand.shuffle(order)
+         header = [REPORT_LAYOUTS[kind][i] if i != None else 'Section' for i in order]
+         moved  = [[row[i] if i != None else '001' for i in order] for row in rows]
+         moved  = read(self.writeReport(kind + '-moved.csv', kind, moved, header=header))
+         self.assertEqual(combined(*self.infos(kind, moved)),
+                          combined(*self.infos(kind, read(self.writeReport(kind + '.csv', kind, rows)))), kind)
+
+   # (lessonInfo, examInfo, projectInfo) with info in kind's place.
+   def infos(self, kind, info):
+      return [info if other == kind else {} for other in ('lesson', 'exam', 'project')]
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,68 @@
+#
+# tests/testReportSource.py
+#
+# Report ingestion: the dialect found from the header row, and the rows a
+# ReportSource gives for each kind of line ending and delimiter.
+################################################################################
+
+
+import csv
+import unittest
+
+from simnetreport import REPORT_LAYOUTS, ReportSource, detectDialect, readExamFile
+from reportFixtures import ReportTestCase, combined, examRow
+
+ROWS = [examRow('S1', 'Quiz, "Part 1"', 1, 60), examRow('S1', 'Quiz, "Part 1"', 2, 90),
+        examRow('S2', 'Final', 1, '')]
+
+class DetectDialectTest(unittest.TestCase):
+   def testDelimiters(self):
+      for delimiter in (',', '\t', ';', '|'):
+         header = delimiter.join(REPORT_LAYOUTS['exam']) + '\r\n'
+         self.assertEqual(detectDialect(header)['delimiter'], delimiter)
+
+   def testQuotedHeader(self):
+      dialect = detectDialect("'StudentID';'LastName';'FirstName';'Title';'Attempt'\n")
+      self.assertEqual((dialect['delimiter'], dialect['quotechar']), (';', "'"))
+      dialect = detectDialect('\xef\xbb\xbf"StudentID", "LastName", "FirstName", "Title"\n')
+      self.assertEqual((dialect['delimiter'], dialect['quotechar'], dialect['skipinitialspace']), (',', '"', True))
+
+   def testLongTitlesDontMatter(self):
+      # Only the header decides, however many delimiters the titles hold.
+      sample = 'StudentID\tLastName\tFirstName\tTitle\n' + 'S1\tL\tF\tA, b, c, d, e, f, g, h\n' * 20
+      self.assertEqual(detectDialect(sample.splitlines(True)[0], sample)['delimiter'], '\t')
+
+   def testUnknownHeaderIsSniffed(self):
+      sample = 'ID;Name;Score\nS1;Smith;80\nS2;Jones;90\n'
+      self.assertEqual(detectDialect('ID;Name;Score\n', sample)['delimiter'], ';')
+
+class ReportSourceTest(ReportTestCase):
+   def rows(self, file):
+      source = ReportSource(file)
+      try:
+         return list(source.rows())
+      finally:
+         source.close()
+
+   def testLineEndings(self):
+      expected = [list(REPORT_LAYOUTS['exam'])] + ROWS
+      for name, ending in (('crlf', '\r\n'), ('lf', '\n'), ('cr', '\r')):
+         with open(self.path(name + '.csv'), 'wb') as f:
+            writer = csv.writer(f, lineterminator=ending)
+            writer.writerows(expected)
+         self.assertEqual(self.rows(self.path(name + '.csv')), expected, name)
+
+   def testEmptyFile(self):
+      open(self.path('empty.csv'), 'wb').close()
+      self.assertEqual(self.rows(self.path('empty.csv')), [])
+      self.assertEqual(readExamFile(self.path('empty.csv'))['titles'], {})
+
+   def testDelimitedExportsReadAlike(self):
+      comma = readExamFile(self.writeReport('comma.csv', 'exam', ROWS))
+      for name, delimiter in (('tab.csv', '\t'), ('semicolon.csv', ';')):
+         examInfo = readExamFile(self.writeReport(name, 'exam', ROWS, delimiter=delimiter))
+         self.assertEqual(combined({}, examInfo, {}), combined({}, comma, {}), name)
+      self.assertEqual(comma['titles']['quiz,"part1"'], 'Quiz, "Part 1"')
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,59 @@
+#
+# tests/testScoreMatrix.py
+#
+# The per-student attempt score matrix built while exam and project reports
+# are read, and the all-attempts output written from it.
+################################################################################
+
+
+import unittest
+
+from simnetreport import (EXAM_PCT_CORRECT, addAttemptScore, attemptCells, readExamFile, readLessonFile,
+      readProjectFile, writeCombinedFile)
+from reportFixtures import ReportTestCase, examRow, lessonRow, projectRow, readRows
+
+class ScoreMatrixTest(ReportTestCase):
+   def testExamMatrix(self):
+      examInfo = readExamFile(self.writeReport('exam.csv', 'exam',
+            [examRow('S1', 'Quiz A', 2, 90), examRow('S1', 'Quiz B', 1, 50),
+             examRow('S2', 'Quiz B', 1, 70), examRow('S1', 'Quiz A', 1, 60)]))
+      self.assertEqual(examInfo['titleIndex'], {'quiza': 0, 'quizb': 1})
+      self.assertEqual(examInfo['attempts'], {'quiza': 2, 'quizb': 1})
+      row = examInfo['scores']['S1']
+      self.assertEqual([cell[EXAM_PCT_CORRECT] for cell in attemptCells(row, 0)], ['60', '90'])
+      # S2 never took Quiz A; the title index comes first.
+      self.assertEqual(attemptCells(examInfo['scores']['S2'], 0), [])
+      self.assertEqual(attemptCells(examInfo['scores']['S2'], 2), None)
+      self.assertEqual(attemptCells(None, 0), None)
+
+   def testMissingAttemptsAndAttemptZero(self):
+      scores, titleIndex = {}, {}
+      addAttemptScore(scores, titleIndex, 'S1', 'quiz', 3, ('30',))
+      addAttemptScore(scores, titleIndex, 'S2', 'quiz', 0, ('99',))
+      self.assertEqual(scores['S1'], [[None, None, ('30',)]])
+      self.assertFalse('S2' in scores)
+      self.assertEqual(titleIndex, {'quiz': 0})
+
+   def testAllAttemptsOutput(self):
+      lessonInfo  = readLessonFile(self.writeReport('lesson.csv', 'lesson',
+            [lessonRow('S1', 'Lesson 1', 100), lessonRow('S3', 'Lesson 1', 50)]))
+      examInfo    = readExamFile(self.writeReport('exam.csv', 'exam',
+            [examRow('S1', 'Quiz A', 1, 60), examRow('S1', 'Quiz A', 2, 90), examRow('S2', 'Quiz A', 1, '')]))
+      projectInfo = readProjectFile(self.writeReport('project.csv', 'project', [projectRow('S2', 'Proj', 1, 70)]))
+      self.assertTrue(writeCombinedFile(self.path('out.csv'), lessonInfo, examInfo, projectInfo,
+            False, False, False, '-'))
+      self.assertEqual(readRows(self.path('out.csv')),
+            [['Student ID', 'Last Name', 'First Name', 'Lesson 1', 'Proj', 'Quiz A [Attempt 1]', 'Quiz A [Attempt 2]'],
+             ['S1', 'LastS1', 'FirstS1', '100', '-', '60', '90'],
+             ['S2', 'LastS2', 'FirstS2', '-', '70', '', '-'],
+             ['S3', 'LastS3', 'FirstS3', '50', '-', '-', '-']])
+
+   def testBestAttemptPointsOutput(self):
+      examInfo = readExamFile(self.writeReport('exam.csv', 'exam',
+            [examRow('S1', 'Quiz A', 1, 60, points=6, total=10), examRow('S1', 'Quiz A', 2, 90, points=9, total=10)]))
+      writeCombinedFile(self.path('out.csv'), {}, examInfo, {}, True, False, False, '-', True)
+      self.assertEqual(readRows(self.path('out.csv'))[1:],
+            [['Pts. Possible', '', '', '10'], ['S1', 'LastS1', 'FirstS1', '9']])
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,78 @@
+#
+# tests/testService.py
+#
+# The report service: jobs run on its pool, a job the pool can't run is
+# marked failed instead of staying queued, and the HTTP server answers for
+# an output that is gone.
+################################################################################
+
+
+import os
+import json
+import threading
+import unittest
+import urllib2
+
+from simnetreport.service import ReportServer, ReportService
+from reportFixtures import ReportTestCase, examRow, readRows
+
+# The options the service's upload form gives a job.
+FORM_OPTIONS = {'examPolicy': 'all', 'projectPolicy': 'all', 'usePoints': False,
+                'usePctPoints': False, 'missingScoreMark': '', 'format': 'csv'}
+
+class ReportServiceTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.exam    = self.writeReport('exam.csv', 'exam', [examRow('S1', 'Quiz', 1, 80)])
+      self.service = ReportService(self.path('work'), workers=1, useCache=False)
+
+   def tearDown(self):
+      self.service.close()
+      ReportTestCase.tearDown(self)
+
+   def testJobRuns(self):
+      status, new = self.service.submit({'exam': [self.exam]}, FORM_OPTIONS)
+      self.assertTrue(new)
+      self.assertTrue(status['status'] in ('queued', 'running'))
+      status = self.service.status(status['id'], wait=30)
+      self.assertEqual(status['status'], 'done')
+      self.assertEqual(readRows(self.service.outputFile(status['id']))[1], ['S1', 'LastS1', 'FirstS1', '80'])
+      self.assertEqual(self.service.submit({'exam': [self.exam]}, FORM_OPTIONS)[1], False)
+      metrics = self.service.metrics()
+      self.assertEqual(metrics['queueDepth'], 0)
+      self.assertEqual(metrics['jobs'], {'queued': 0, 'running': 0, 'done': 1, 'failed': 0})
+
+   def testFailedPoolCall(self):
+      # A job that can't be sent to a worker fails, and can be submitted again.
+      options = dict(FORM_OPTIONS, missingScoreMark=lambda: '')
+      status  = self.service.submit({'exam': [self.exam]}, options)[0]
+      status  = self.service.status(status['id'], wait=30)
+      self.assertEqual(status['status'], 'failed')
+      self.assertTrue(status['error'])
+      self.assertEqual(self.service.metrics()['counts']['failed'], 1)
+      self.assertTrue(self.service.submit({'exam': [self.exam]}, options)[1])
+
+   def testRemovedOutput(self):
+      server = ReportServer(('127.0.0.1', 0), self.service)
+      thread = threading.Thread(target=server.serve_forever)
+      thread.daemon = True
+      thread.start()
+      try:
+         key = self.service.submit({'exam': [self.exam]}, FORM_OPTIONS)[0]['id']
+         url = 'http://127.0.0.1:{0}/jobs/{1}/output?wait=30'.format(server.server_address[1], key)
+         self.assertEqual(urllib2.urlopen(url).read().splitlines()[1], '"S1","LastS1","FirstS1","80"')
+         os.remove(self.service.outputFile(key))
+         try:
+            urllib2.urlopen(url)
+            self.fail("no HTTPError")
+         except urllib2.HTTPError as e:
+            self.assertEqual(e.code, 410)
+            body = json.load(e)
+         self.assertEqual((body['id'], body['status']), (key, 'done'))
+         self.assertTrue('no longer available' in body['error'])
+      finally:
+         server.shutdown()
+         server.server_close()
+
+if __name__ == "__main__":
+   unittest.main()
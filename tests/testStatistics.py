@@ -0,0 +1,95 @@
+#
+# tests/testStatistics.py
+#
+# Class statistics worked out while the combined output is written.
+################################################################################
+
+
+import math
+import random
+import unittest
+
+from simnetreport import (ClassStatistics, P2Median, P2_EXACT_LIMIT, readExamFile, readLessonFile,
+      statisticsFileName, writeCombinedFile, writeStatisticsFile)
+from reportFixtures import ReportTestCase, examRow, lessonRow, readRows
+
+class StatisticsTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.lessonInfo = readLessonFile(self.writeReport('lesson.csv', 'lesson',
+            [lessonRow('S1', 'Lesson', 80), lessonRow('S2', 'Lesson', 60), lessonRow('S3', 'Lesson', 100)]))
+      self.examInfo   = readExamFile(self.writeReport('exam.csv', 'exam',
+            [examRow('S1', 'Quiz', 1, 60), examRow('S1', 'Quiz', 2, 90), examRow('S2', 'Quiz', 1, 75),
+             examRow('S2', 'Quiz', 2, '')]))
+
+   def statistics(self, policy):
+      stats = ClassStatistics()
+      writeCombinedFile(self.path('out.csv'), self.lessonInfo, self.examInfo, {}, False, False, False, '-',
+                        examPolicy=policy, stats=stats)
+      return stats
+
+   # The statistics of each score column, worked out from the output itself.
+   def expected(self):
+      rows = readRows(self.path('out.csv'))
+      for col in range(3, len(rows[0])):
+         scores = []
+         for row in rows[1:]:
+            try:
+               scores.append(float(row[col]))
+            except ValueError:
+               pass
+         scores.sort()
+         n      = len(scores)
+         mean   = sum(scores) / n
+         stdev  = math.sqrt(sum((x - mean) ** 2 for x in scores) / (n - 1)) if n > 1 else None
+         median = (scores[(n - 1) // 2] + scores[n // 2]) / 2.0
+         yield rows[0][col], len(scores), mean, stdev, median, min(scores), max(scores)
+
+   def testColumns(self):
+      for policy in ('all', 'best'):
+         stats = self.statistics(policy)
+         self.assertEqual(stats.students, 3)
+         for column, expected in zip(stats.columns, self.expected()):
+            found = (column.header, column.count, column.mean, column.stdev(), column.median.result(),
+                     column.low, column.high)
+            self.assertEqual(found[:2], expected[:2], policy)
+            for value, want in zip(found[2:], expected[2:]):
+               if(want == None):
+                  self.assertEqual(value, None)
+               else:
+                  self.assertAlmostEqual(value, want)
+         self.assertEqual(len(stats.columns), len(list(self.expected())))
+
+   def testAttempts(self):
+      stats = self.statistics('best')
+      self.assertEqual(stats.attempts['exam'], {'quiz': 4})
+      self.assertEqual(stats.attempted['exam'], {'quiz': 2})
+
+   def testStatisticsFile(self):
+      stats = self.statistics('best')
+      self.assertEqual(statisticsFileName('grades.csv.gz'), 'grades-stats.csv')
+      writeStatisticsFile(self.path('stats.csv'), stats)
+      rows = readRows(self.path('stats.csv'))
+      self.assertEqual(rows[1], ['Lesson', 'Lesson', 'Lesson', '3', '3', '100', '80', '20', '80', '60', '100', '', '', ''])
+      self.assertEqual(rows[2], ['Exam', 'Quiz', 'Quiz', '3', '2', '66.67', '82.5', '10.61', '82.5', '75', '90', '4', '2', '2'])
+
+class P2MedianTest(unittest.TestCase):
+   def testExactForFewScores(self):
+      median = P2Median()
+      self.assertEqual(median.result(), None)
+      for x in (5, 1, 4, 2):
+         median.add(x)
+      self.assertEqual(median.result(), 3)
+      median.add(3)
+      self.assertEqual(median.result(), 3)
+
+   def testEstimateForManyScores(self):
+      rng    = random.Random(7)
+      scores = [rng.uniform(0, 100) for i in range(P2_EXACT_LIMIT * 5)]
+      median = P2Median()
+      for x in scores:
+         median.add(x)
+      self.assertTrue(abs(median.result() - sorted(scores)[len(scores) // 2]) < 2.0)
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,95 @@
+#
+# tests/testStreaming.py
+#
+# readExamFile's streaming mode keeps only what the writer needs, and the
+# output is the same either way.  combinedRows yields the output row by row,
+# and writeCombinedFile writes it plain or compressed.
+################################################################################
+
+
+import gzip
+import unittest
+
+from simnetreport import combinedRows, core, loadNumpy, readExamFile, readLessonFile, writeCombinedFile
+from reportFixtures import ReportTestCase, examRow, lessonRow, readRows
+
+class StreamingTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.exam = self.writeReport('exam.csv', 'exam',
+            [examRow('S1', 'Quiz A', 1, 60), examRow('S1', 'Quiz A', 2, 90),
+             examRow('S2', 'Quiz A', 1, 75), examRow('S2', 'Quiz B', 1, '')])
+
+   def testNoRecords(self):
+      self.assertTrue('records' in readExamFile(self.exam))
+      examInfo = readExamFile(self.exam, streaming=True)
+      self.assertFalse('records' in examInfo)
+      self.assertEqual(examInfo['students']['S1'], ('S1', 'LastS1', 'FirstS1'))
+
+   def testSameOutput(self):
+      for policy in ('all', 'best', 'mean'):
+         outputs = []
+         for streaming in (False, True):
+            outputs.append(self.path('out-{0}.csv'.format(streaming)))
+            writeCombinedFile(outputs[-1], {}, readExamFile(self.exam, policy, streaming), {},
+                  False, False, False, '-', examPolicy=policy)
+         self.assertEqual(open(outputs[0]).read(), open(outputs[1]).read(), policy)
+
+class CombinedRowsTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.lessonInfo = readLessonFile(self.writeReport('lesson.csv', 'lesson',
+            [lessonRow('S%d' % student, 'Lesson', 50 + student) for student in range(5)]))
+      self.examInfo   = readExamFile(self.writeReport('exam.csv', 'exam',
+            [examRow('S%d' % student, 'Quiz', attempt, 60 + student * attempt)
+             for student in range(5) for attempt in range(1, student % 3 + 2)]))
+
+   def rows(self, useNumpy=True, usePoints=False):
+      return combinedRows(self.lessonInfo, self.examInfo, {}, True, False, False, '-', usePoints, useNumpy)
+
+   def testRowByRow(self):
+      # With NumPy (when installed) and without, the rows are the written output.
+      written = readRows(self.write('out.csv'))
+      for useNumpy in (False, True):
+         rows = self.rows(useNumpy)
+         self.assertEqual(next(rows), written[0])
+         self.assertEqual(next(rows), written[1], useNumpy)
+         self.assertEqual(list(rows), written[2:], useNumpy)
+      rows = self.rows(usePoints=True)
+      self.assertEqual(next(rows)[3:], ['Lesson', 'Quiz'])
+      self.assertEqual(next(rows)[0], 'Pts. Possible')
+
+   @unittest.skipIf(loadNumpy() == None, "NumPy is not installed")
+   def testNumpyBlocks(self):
+      # Best attempts are found a block of students at a time, as rows are taken.
+      blocks = []
+      def recordBlock(rows, columns, col):
+         blocks.append(len(rows))
+         return bestScoresNumpy(rows, columns, col)
+      bestScoresNumpy = core.bestScoresNumpy
+      block           = core.NUMPY_BLOCK
+      core.bestScoresNumpy = recordBlock
+      core.NUMPY_BLOCK     = 2
+      try:
+         rows = self.rows()
+         next(rows)
+         next(rows)
+         self.assertEqual(blocks, [2])
+         list(rows)
+         self.assertEqual(blocks, [2, 2, 1])
+      finally:
+         core.bestScoresNumpy = bestScoresNumpy
+         core.NUMPY_BLOCK     = block
+
+   def testCompressedOutput(self):
+      with open(self.write('out.csv'), 'rb') as f:
+         plain = f.read()
+      with gzip.open(self.write('out.csv.gz')) as f:
+         self.assertEqual(f.read(), plain)
+
+   def write(self, name):
+      writeCombinedFile(self.path(name), self.lessonInfo, self.examInfo, {}, True, False, False, '-')
+      return self.path(name)
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,57 @@
+#
+# tests/testStudentIndex.py
+#
+# The student index shared by the three reports: students are keyed by ID,
+# so namesakes stay apart, and rows come out in name order.
+################################################################################
+
+
+import unittest
+
+from simnetreport import StudentIndex, readExamFile, readLessonFile, readProjectFile, writeCombinedFile
+from reportFixtures import ReportTestCase, examRow, lessonRow, projectRow, readRows
+
+# Gives a report row a student's names.
+def named(row, lastName, firstName):
+   row[1:3] = [lastName, firstName]
+   return row
+
+class StudentIndexTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.lessonInfo  = readLessonFile(self.writeReport('lesson.csv', 'lesson',
+            [named(lessonRow('S3', 'Lesson', 70), 'Smith', 'Ann'), named(lessonRow('S4', 'Lesson', 40), 'Adams', 'Zoe')]))
+      self.examInfo    = readExamFile(self.writeReport('exam.csv', 'exam',
+            [named(examRow('S2', 'Quiz', 1, 80), 'Smith', 'Ann'), named(examRow('S1', 'Quiz', 1, 90), 'Smith', 'Ann'),
+             named(examRow('S3', 'Quiz', 1, 60), 'Smith', 'Ann')]))
+      self.projectInfo = readProjectFile(self.writeReport('project.csv', 'project',
+            [named(projectRow('S5', 'Proj', 1, 50), 'Jones', 'Bo'), named(projectRow('S3', 'Proj', 1, 75), 'Smyth', 'Ann')]))
+
+   def testIndex(self):
+      index = StudentIndex(self.lessonInfo, self.examInfo, self.projectInfo)
+      self.assertEqual(len(index), 5)
+      self.assertEqual([entry.SID for entry in index], ['S4', 'S5', 'S1', 'S2', 'S3'])
+      self.assertTrue('S5' in index)
+      self.assertFalse('S6' in index)
+      self.assertEqual(index.get('S6'), None)
+      # The exam report's names win; each report's scores are the student's own.
+      entry = index.get('S3')
+      self.assertEqual(list(entry.student), ['S3', 'Smith', 'Ann'])
+      self.assertEqual(entry.lessonPercent, {'lesson': '70'})
+      self.assertTrue(entry.examScores is self.examInfo['scores']['S3'])
+      self.assertTrue(entry.projectScores is self.projectInfo['scores']['S3'])
+      self.assertEqual(index.get('S4').examScores, None)
+
+   def testNamesakesGetARowEach(self):
+      seen = []
+      writeCombinedFile(self.path('out.csv'), self.lessonInfo, self.examInfo, self.projectInfo, False, False, False,
+                        '-', progress=lambda stage, count, total=None: seen.append((stage, count, total)))
+      rows = readRows(self.path('out.csv'))
+      self.assertEqual(rows[0], ['Student ID', 'Last Name', 'First Name', 'Lesson', 'Proj', 'Quiz'])
+      self.assertEqual(rows[1:], [['S4', 'Adams', 'Zoe', '40', '-', '-'], ['S5', 'Jones', 'Bo', '-', '50', '-'],
+                                  ['S1', 'Smith', 'Ann', '-', '-', '90'], ['S2', 'Smith', 'Ann', '-', '-', '80'],
+                                  ['S3', 'Smith', 'Ann', '70', '75', '60']])
+      self.assertEqual(seen[-1], ('write', 5, 5))
+
+if __name__ == "__main__":
+   unittest.main()
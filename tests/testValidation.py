@@ -0,0 +1,65 @@
+#
+# tests/testValidation.py
+#
+# The score checks: validateReports' findings, and the validation report.
+################################################################################
+
+
+import csv
+import json
+import unittest
+
+from simnetreport import (VALIDATION_FIELDS, readExamFile, readLessonFile, readProjectFile, validateReports,
+      validationFileName, writeValidationReport)
+from reportFixtures import ReportTestCase, examRow, lessonRow, projectRow
+
+class ValidationTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.lesson  = self.writeReport('lesson.csv', 'lesson',
+            [lessonRow('S1', 'Lesson', 80, complete='4'), lessonRow('S2', 'Lesson', 80, complete='2'),
+             lessonRow('S3', 'Lesson', '', complete='0')])
+      self.project = self.writeReport('project.csv', 'project',
+            [projectRow('S1', 'Proj', 1, 50), projectRow('S1', 'Proj', 3, 60), projectRow('S2', 'Proj', 1, 'n/a')])
+      self.exam    = self.writeReport('exam.csv', 'exam',
+            [examRow('S1', 'Quiz', 1, 80), examRow('S2', 'Quiz', 1, 80, points=40, total='50'),
+             examRow('S3', 'Quiz', 1, 90, points=70), examRow('S3', 'Quiz', 2, 70), examRow('S4', 'Quiz', 1, '')])
+
+   def findings(self):
+      return validateReports(readLessonFile(self.lesson), readExamFile(self.exam), readProjectFile(self.project))
+
+   def testFindings(self):
+      found = [tuple(finding[field] for field in VALIDATION_FIELDS) for finding in self.findings()]
+      self.assertEqual(found, [
+            ('lesson', 'points', 'S2', 'Lesson', '', '2', '4'),
+            ('lesson', 'blank score', 'S3', 'Lesson', '', '', ''),
+            ('project', 'attempt gap', 'S1', 'Proj', 2, '', ''),
+            ('project', 'bad score', 'S2', 'Proj', 1, 'n/a', ''),
+            ('exam', 'possible points', 'S2', 'Quiz', 1, '50', '100'),
+            ('exam', 'points', 'S3', 'Quiz', 1, '70', '90'),
+            ('exam', 'blank score', 'S4', 'Quiz', 1, '', '')])
+
+   def testCleanReports(self):
+      exam = self.writeReport('clean.csv', 'exam', [examRow('S1', 'Quiz', 1, 80), examRow('S1', 'Quiz', 2, 85.3, points=85)])
+      self.assertEqual(validateReports({}, readExamFile(exam), {}), [])
+
+   def testNeedsEveryAttempt(self):
+      self.assertRaises(ValueError, validateReports, {}, readExamFile(self.exam, 'best'), {})
+
+   def testReportFiles(self):
+      findings = self.findings()
+      self.assertEqual(validationFileName('grades.csv.gz'), 'grades-validation.csv')
+      self.assertEqual(validationFileName('grades.xlsx', 'json'), 'grades-validation.json')
+      writeValidationReport(self.path('v.csv'), findings)
+      with open(self.path('v.csv'), 'rb') as f:
+         rows = list(csv.DictReader(f))
+      self.assertEqual([row['check'] for row in rows], [finding['check'] for finding in findings])
+      writeValidationReport(self.path('v.json'), findings)
+      with open(self.path('v.json')) as f:
+         report = json.load(f)
+      self.assertEqual(report['counts'], {'blank score': 2, 'points': 2, 'attempt gap': 1, 'bad score': 1,
+                                          'possible points': 1})
+      self.assertEqual(len(report['findings']), len(findings))
+
+if __name__ == "__main__":
+   unittest.main()
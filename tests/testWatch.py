@@ -0,0 +1,59 @@
+#
+# tests/testWatch.py
+#
+# Watch mode: grouping a directory's reports into sections and regenerating
+# each section's combined output.
+################################################################################
+
+
+import os
+import time
+import unittest
+from StringIO import StringIO
+
+from simnetreport.watch import PollingWatcher, SectionWatcher, runWatch, watchedReport
+from reportFixtures import ReportTestCase, examRow, readRows
+
+# The job settings watchMain gives each section.
+WATCH_OPTIONS = {'examPolicy': 'all', 'projectPolicy': 'all', 'usePctPoints': False,
+                 'missingScoreMark': '', 'usePoints': False}
+
+class WatchTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      os.mkdir(self.path('exports'))
+
+   # Regenerates every out-of-date section once; returns (results, log).
+   def runOnce(self):
+      out      = StringIO()
+      sections = SectionWatcher(self.path('exports'), self.path('combined'), WATCH_OPTIONS,
+                                workers=1, debounce=0, out=out)
+      return runWatch(sections, PollingWatcher(0.01), 0.01, once=True), out.getvalue()
+
+   def testReportNames(self):
+      self.assertEqual(watchedReport('ENG101-01 Exam.xlsx'), ('ENG101-01', 'exam'))
+      self.assertEqual(watchedReport('ENG101-01_lessons.csv'), ('ENG101-01', 'lesson'))
+      self.assertEqual(watchedReport(os.path.join('fall', 'ENG101_exam.CSV')), ('fall-ENG101', 'exam'))
+      self.assertEqual(watchedReport('~$ENG101_exam.xlsx'), None)
+      self.assertEqual(watchedReport('notes.csv'), None)
+
+   def testUpperCaseExtension(self):
+      self.writeReport('exports/CIS_exam.CSV', 'exam', [examRow('S1', 'Quiz', 1, 80)])
+      results, log = self.runOnce()
+      self.assertEqual([result['error'] for result in results], [None])
+      self.assertEqual(readRows(self.path('combined', 'CIS.csv')),
+                       [['Student ID', 'Last Name', 'First Name', 'Quiz'], ['S1', 'LastS1', 'FirstS1', '80']])
+
+   def testSeveralExportsOfOneKindAreMerged(self):
+      older = self.writeReport('exports/ENG101_exam-sep.csv', 'exam',
+                               [examRow('S1', 'Quiz', 1, 60), examRow('S2', 'Quiz', 1, 70)])
+      self.writeReport('exports/ENG101_exam-oct.csv', 'exam', [examRow('S1', 'Quiz', 1, 80, date='10/1/2016')])
+      past = time.time() - 60
+      os.utime(older, (past, past))
+      results, log = self.runOnce()
+      self.assertEqual([result['error'] for result in results], [None])
+      rows = readRows(self.path('combined', 'ENG101.csv'))
+      self.assertEqual([row[3] for row in rows[1:]], ['80', '70'])
+
+if __name__ == "__main__":
+   unittest.main()
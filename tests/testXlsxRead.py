@@ -0,0 +1,76 @@
+#
+# tests/testXlsxRead.py
+#
+# Native .xlsx exports read the same as the exports saved as CSV.
+################################################################################
+
+
+import unittest
+
+from simnetreport import (XlsxSource, loadReports, readExamFile, readLessonFile, readProjectFile, xlsxDate,
+      xlsxDateStyle)
+from reportFixtures import ReportTestCase, combined, examRow, lessonRow, projectRow
+
+LESSONS  = [lessonRow('S1', 'Lesson A', 80), lessonRow('S2', 'Lesson A', 62.5, complete='3')]
+EXAMS    = [examRow('S1', 'Quiz', 1, 60), examRow('S1', 'Quiz', 2, 87.5),
+            examRow('S2', 'Quiz', 1, ''), examRow('S2', 'Test & Review', 1, 75)]
+PROJECTS = [projectRow('S1', 'Proj', 1, 50), projectRow('S2', 'Proj', 1, 92.25)]
+
+class XlsxReadTest(ReportTestCase):
+   def rows(self, file):
+      source = XlsxSource(file)
+      try:
+         return list(source.rows())
+      finally:
+         source.close()
+
+   def testRows(self):
+      rows = self.rows(self.writeXlsxReport('exam.xlsx', 'exam', EXAMS))
+      # Numbers as CSV would hold them, blank cells filled in.
+      self.assertEqual(rows[2][12:16], ['87.5', '87.5', '100', '87.5'])
+      self.assertEqual(rows[3][12:17], ['', '', '100', '', 'Completed'])
+      self.assertEqual(rows[4][3], 'Test & Review')
+
+   def testDates(self):
+      # Date cells are serial numbers; their styles say how CSV shows them.
+      rows = self.rows(self.writeXlsxReport('exam.xlsx', 'exam', [examRow('S1', 'Quiz', 1, 60, date='10/31/2016')]))
+      self.assertEqual(rows[1][6:10], ['10/31/2016', '10/31/2016 9:00', '0.00:12:00', '10/31/2016 9:12'])
+      self.assertEqual(xlsxDate('42614.6', xlsxDateStyle('[$-409]m/d/yy h:mm:ss AM/PM;@')), '9/1/2016 2:24:00 PM')
+      self.assertEqual(xlsxDate('41152', xlsxDateStyle('m/d/yyyy'), date1904=True), '9/1/2016')
+      self.assertEqual(xlsxDate('0.5', xlsxDateStyle('h:mm')), '12:00')
+      for code in ('General', '0.00', '[Red]0.00', '"days"0'):
+         self.assertEqual(xlsxDateStyle(code), None, code)
+
+   def testSameAsCsv(self):
+      for kind, rows, read in (('lesson', LESSONS, readLessonFile), ('exam', EXAMS, readExamFile),
+                               ('project', PROJECTS, readProjectFile)):
+         self.assertEqual(read(self.writeXlsxReport(kind + '.xlsx', kind, rows)),
+                          read(self.writeReport(kind + '.csv', kind, rows)), kind)
+      for policy in ('best', 'mean'):
+         self.assertEqual(combined({}, readExamFile(self.path('exam.xlsx'), policy), {}, policy),
+                          combined({}, readExamFile(self.path('exam.csv'), policy), {}, policy), policy)
+
+   def testMixedExports(self):
+      # An .xlsx export merges with a CSV one like two CSV exports do.
+      exams = [self.writeXlsxReport('exam-sep.xlsx', 'exam', EXAMS[:2]), self.writeReport('exam-oct.csv', 'exam', EXAMS[1:])]
+      for mode in ('serial', 'process'):
+         lessonInfo, examInfo, projectInfo = loadReports(self.writeXlsxReport('lesson.xlsx', 'lesson', LESSONS),
+                                                         exams, '', mode=mode)
+         self.assertEqual(examInfo['duplicates'], 1)
+         self.assertEqual(combined(lessonInfo, examInfo, projectInfo),
+                          combined(readLessonFile(self.writeReport('lesson.csv', 'lesson', LESSONS)),
+                                   readExamFile(self.writeReport('exam.csv', 'exam', EXAMS)), {}), mode)
+
+   def testMixedExportDates(self):
+      # Merged exports match attempts on their dates: the same attempt with the
+      # same date in both is a duplicate, and a new date replaces it.
+      october = [examRow('S1', 'Quiz', 2, 87.5), examRow('S2', 'Quiz', 1, 70, date='10/3/2016')]
+      exams   = [self.writeXlsxReport('exam-sep.xlsx', 'exam', EXAMS), self.writeReport('exam-oct.csv', 'exam', october)]
+      lessonInfo, examInfo, projectInfo = loadReports('', exams, '')
+      self.assertEqual(examInfo['duplicates'], 1)
+      self.assertEqual(examInfo['attemptCounts'], {'quiz': 3, 'test&review': 1})
+      merged = EXAMS[:2] + [october[1], EXAMS[3]]
+      self.assertEqual(combined({}, examInfo, {}), combined({}, readExamFile(self.writeReport('exam.csv', 'exam', merged)), {}))
+
+if __name__ == "__main__":
+   unittest.main()
@@ -0,0 +1,55 @@
+#
+# tests/testXlsxWrite.py
+#
+# Combined output written as an .xlsx workbook holds the same rows as the
+# CSV output, with scores as numbers and the header rows frozen.
+################################################################################
+
+
+import re
+import zipfile
+import unittest
+
+from simnetreport import XlsxSource, readExamFile, readLessonFile, writeCombinedFile
+from reportFixtures import ReportTestCase, examRow, lessonRow, readRows
+
+class XlsxWriteTest(ReportTestCase):
+   def setUp(self):
+      ReportTestCase.setUp(self)
+      self.lessonInfo = readLessonFile(self.writeReport('lesson.csv', 'lesson',
+            [lessonRow('00123', 'Lesson A', 80), lessonRow('S2', 'Lesson A', 62.5)]))
+      self.examInfo   = readExamFile(self.writeReport('exam.csv', 'exam',
+            [examRow('00123', 'Quiz', 1, 60), examRow('00123', 'Quiz', 2, 87.5),
+             examRow('S2', 'Test & Review', 1, 75), examRow('S2', 'Quiz', 1, '')]))
+
+   def write(self, name, usePoints=False):
+      writeCombinedFile(self.path(name), self.lessonInfo, self.examInfo, {}, False, False, False, '-', usePoints)
+      return self.path(name)
+
+   def sheet(self, file):
+      with zipfile.ZipFile(file) as workbook:
+         return workbook.read('xl/worksheets/sheet1.xml')
+
+   def testSameRowsAsCsv(self):
+      for usePoints in (False, True):
+         source = XlsxSource(self.write('out.xlsx', usePoints))
+         try:
+            rows = list(source.rows())
+         finally:
+            source.close()
+         self.assertEqual(rows, readRows(self.write('out.csv', usePoints)), usePoints)
+
+   def testCellTypes(self):
+      sheet = self.sheet(self.write('out.xlsx'))
+      # IDs and names stay text; scores are numbers; missing marks are text.
+      self.assertTrue('<c r="A2" t="inlineStr"><is><t>00123</t></is></c>' in sheet)
+      self.assertTrue('<c r="D2"><v>80</v></c>' in sheet)
+      self.assertTrue('<t>Test &amp; Review</t>' in sheet)
+      self.assertTrue(re.search(r'<c r="[A-Z]+3" t="inlineStr"><is><t>-</t></is></c>', sheet))
+
+   def testFrozenRows(self):
+      self.assertTrue('ySplit="1" topLeftCell="D2"' in self.sheet(self.write('out.xlsx')))
+      self.assertTrue('ySplit="2" topLeftCell="D3"' in self.sheet(self.write('points.xlsx', usePoints=True)))
+
+if __name__ == "__main__":
+   unittest.main()